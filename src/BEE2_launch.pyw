@@ -33,12 +33,14 @@ DEFAULT_SETTINGS = {
 }
 
 import srctools.logger
-from app import localisation, on_error, TK_ROOT
 import utils
 
+# Spawned worker processes import this as __mp_main__, so only import the app here.
+# Otherwise, each worker would create its own Tk root.
 if __name__ == '__main__':
     # Forking doesn't really work right, stick to spawning a fresh process.
     set_start_method('spawn')
+    from app import localisation, on_error, TK_ROOT
 
     if len(sys.argv) > 1:
         log_name = app_name = sys.argv[1].lower()
@@ -472,6 +472,10 @@ def quit_application() -> None:
         GEN_OPTS.save_check()
     except Exception:
         LOGGER.exception('Saving GEN_OPTS:')
+    try:
+        img.save_thumbnails()
+    except Exception:
+        LOGGER.exception('Saving image cache:')
 
     item_opts.save_check()
     CompilerPane.COMPILE_CFG.save_check()
@@ -4,22 +4,30 @@
 from tkinter import filedialog, ttk
 import tkinter as tk
 import atexit
+import lzma
 import os
+import pickle
 import shutil
 import string
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO, TextIOWrapper
-from typing import List, TYPE_CHECKING, Dict, Any, Optional, cast
+from pathlib import Path
+from typing import IO, List, TYPE_CHECKING, Dict, Any, Optional, Set, Tuple, cast
 from zipfile import ZipFile, ZIP_LZMA
 
+import trio
+
+import backup_store
 import loadScreen
 import srctools.logger
 from app import tk_tools, img, TK_ROOT
 import utils
 from app.CheckDetails import CheckDetails, Item as CheckItem
 from FakeZip import FakeZip, zip_names, zip_open_bin
-from srctools import Property, KeyValError
+from srctools import KeyValError
+from srctools.tokenizer import Token, Tokenizer
 from app.tooltip import add_tooltip
 from app.localisation import TransToken, set_text, set_menu_text, set_win_title
 if TYPE_CHECKING:
@@ -39,8 +47,21 @@ AUTO_BACKUP_STAGE = 'BACKUP_ZIP'
 
 # Characters allowed in the backup filename
 BACKUP_CHARS = set(string.ascii_letters + string.digits + '_-.')
-# Format for the backup filename
-AUTO_BACKUP_FILE = 'back_{game}{ind}.zip'
+# Format for the backup manifest filename
+AUTO_BACKUP_FILE = 'back_{game}{ind}' + backup_store.MANIFEST_EXT
+# Number of files to compress simultaneously.
+AUTO_BACKUP_THREADS = 4
+
+# The keys read from P2C files, which are all at the start of the file.
+P2C_HEADER_KEYS = frozenset({
+    'title', 'description', 'coop',
+    'timestamp_created', 'timestamp_modified',
+})
+# Number of P2C files to read simultaneously.
+P2C_READ_THREADS = 8
+# Cache of P2C headers, in the config folder.
+P2C_CACHE_LOC = 'backup_p2c.pickle'
+P2C_CACHE_VERSION = 1
 
 HEADERS = [TransToken.ui('Name'), TransToken.ui('Mode'), TransToken.ui('Date')]
 
@@ -61,6 +82,7 @@ TRANS_FAIL_PARSE = TransToken.ui('Failed to parse this puzzle file. It can still
 TRANS_NO_DESC = TransToken.ui('No description found.')
 TRANS_UNSAVED = TransToken.ui('Unsaved Backup')
 TRANS_FILETYPE = TransToken.ui('Backup ZIP archive')
+TRANS_AUTO_FILETYPE = TransToken.ui('Automatic backup')
 
 # The game subfolder where puzzles are located
 PUZZLE_FOLDERS = {
@@ -134,33 +156,20 @@ class P2C:
         path is the file path for the map inside the zip, without extension.
         zip_file is either a ZipFile or FakeZip object.
         """
-        # Some P2Cs may have non-ASCII characters in descriptions, so we
-        # need to read it as bytes and convert to utf-8 ourselves - zips
-        # don't convert encodings automatically for us.
-        try:
-            with zip_open_bin(zip_file, path + '.p2c') as file:
-                # Decode the P2C as UTF-8, and skip unknown characters.
-                # We're only using it for display purposes, so that should
-                # be sufficient.
-                with TextIOWrapper(
-                    file,
-                    encoding='utf-8',
-                    errors='replace',
-                ) as textfile:
-                    props = Property.parse(textfile, path)
-        except KeyValError:
-            # Silently fail if we can't parse the file. That way it's still
-            # possible to back up.
-            LOGGER.warning('Failed parsing puzzle file!', path, exc_info=True)
-            props = Property('portal2_puzzle', [])
+        return cls.from_header(path, zip_file, read_p2c_header(zip_file, path))
+
+    @classmethod
+    def from_header(cls, path, zip_file, header: Optional[Dict[str, str]]):
+        """Initialise from the header keys of a file, or None if it failed to parse."""
+        if header is None:
+            header = {}
             title = None
             desc = TRANS_FAIL_PARSE
         else:
-            props = props.find_key('portal2_puzzle', or_blank=True)
-            title = props['title', None]
+            title = header.get('title')
             try:
-                desc = TransToken.untranslated(props['description'])
-            except LookupError:
+                desc = TransToken.untranslated(header['description'])
+            except KeyError:
                 desc = TRANS_NO_DESC
 
         if title is None:
@@ -171,9 +180,9 @@ class P2C:
             zip_file=zip_file,
             title=title,
             desc=desc,
-            is_coop=srctools.conv_bool(props['coop', '0']),
-            create_time=Date(props['timestamp_created', '']),
-            mod_time=Date(props['timestamp_modified', '']),
+            is_coop=srctools.conv_bool(header.get('coop', '0')),
+            create_time=Date(header.get('timestamp_created', '')),
+            mod_time=Date(header.get('timestamp_modified', '')),
         )
 
     def copy(self):
@@ -261,6 +270,151 @@ class Date:
         return NotImplemented
 
 
+def parse_p2c_header(file: IO[str], filename: str) -> Dict[str, str]:
+    """Read the metadata keys from the start of a P2C file.
+
+    This stops once all the keys are found, or at the first subkey block, since
+    the large voxel and item blocks always come after the metadata.
+    """
+    tok = Tokenizer(file, filename, KeyValError, string_bracket=True)
+    tok_type, tok_value = tok()
+    while tok_type is Token.NEWLINE:
+        tok_type, tok_value = tok()
+    if tok_type is not Token.STRING or tok_value.casefold() != 'portal2_puzzle':
+        raise tok.error(tok_type, tok_value)
+    tok.expect(Token.BRACE_OPEN)
+
+    header: Dict[str, str] = {}
+    while not header.keys() >= P2C_HEADER_KEYS:
+        tok_type, key = tok()
+        if tok_type is Token.NEWLINE:
+            continue
+        elif tok_type is Token.BRACE_CLOSE or tok_type is Token.EOF:
+            break
+        elif tok_type is not Token.STRING:
+            raise tok.error(tok_type, key)
+        tok_type, value = tok()
+        while tok_type is Token.NEWLINE:
+            tok_type, value = tok()
+        if tok_type is Token.BRACE_OPEN:
+            break  # Reached the map data.
+        elif tok_type is not Token.STRING:
+            raise tok.error(tok_type, value)
+        key = key.casefold()
+        if key in P2C_HEADER_KEYS:
+            header[key] = value
+    return header
+
+
+def read_p2c_header(zip_file, path: str) -> Optional[Dict[str, str]]:
+    """Read the header of a P2C file in a zip, or None if it could not be parsed.
+
+    path is the file path for the map inside the zip, without extension.
+    """
+    # Some P2Cs may have non-ASCII characters in descriptions, so we
+    # need to read it as bytes and convert to utf-8 ourselves - zips
+    # don't convert encodings automatically for us.
+    try:
+        with zip_open_bin(zip_file, path + '.p2c') as file:
+            # Decode the P2C as UTF-8, and skip unknown characters.
+            # We're only using it for display purposes, so that should
+            # be sufficient.
+            with TextIOWrapper(
+                file,
+                encoding='utf-8',
+                errors='replace',
+            ) as textfile:
+                return parse_p2c_header(textfile, path)
+    except KeyValError:
+        # Silently fail if we can't parse the file. That way it's still
+        # possible to back up.
+        LOGGER.warning('Failed parsing puzzle file "{}"!', path, exc_info=True)
+        return None
+
+
+class HeaderCache:
+    """Caches the P2C headers read from puzzle folders on disk.
+
+    Files are reread if their size or modification time changes. Zips aren't
+    cached, since those are usually only opened once.
+    """
+    def __init__(self, filename: Path) -> None:
+        self.filename = filename
+        # Path -> (size, modification time, header)
+        self._cached: Dict[str, Tuple[int, int, Optional[Dict[str, str]]]] = {}
+        # The entries used for the folders read this time.
+        self._used: Dict[str, Tuple[int, int, Optional[Dict[str, str]]]] = {}
+        self._folders: Set[str] = set()
+        self.hits = self.misses = 0
+
+    def load(self) -> None:
+        """Load the existing cache from disk."""
+        try:
+            with self.filename.open('rb') as f:
+                version, cached = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception:
+            LOGGER.warning('Could not read puzzle header cache:', exc_info=True)
+            return
+        if version == P2C_CACHE_VERSION:
+            self._cached = cached
+
+    def save(self) -> None:
+        """Write the cache back to disk.
+
+        Puzzles in the folders read which weren't found are discarded.
+        """
+        cache = {
+            path: entry
+            for path, entry in self._cached.items()
+            if os.path.dirname(path) not in self._folders
+        }
+        cache.update(self._used)
+        self._cached = cache
+        try:
+            with srctools.AtomicWriter(self.filename, is_bytes=True) as f:
+                pickle.dump((P2C_CACHE_VERSION, cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            LOGGER.warning('Could not write puzzle header cache:', exc_info=True)
+
+    def read(self, zip_file, path: str) -> Optional[Dict[str, str]]:
+        """Read the header of a P2C, using the cache if possible.
+
+        This is called from worker threads.
+        """
+        if not isinstance(zip_file, FakeZip):
+            return read_p2c_header(zip_file, path)
+        filename = os.path.abspath(os.path.join(zip_file.folder, path + '.p2c'))
+        self._folders.add(os.path.dirname(filename))
+        stat = os.stat(filename)
+        try:
+            size, mtime, header = self._cached[filename]
+        except KeyError:
+            pass
+        else:
+            if size == stat.st_size and mtime == stat.st_mtime_ns:
+                self.hits += 1
+                self._used[filename] = (size, mtime, header)
+                return header
+        self.misses += 1
+        header = read_p2c_header(zip_file, path)
+        self._used[filename] = (stat.st_size, stat.st_mtime_ns, header)
+        return header
+
+
+_header_cache: Optional[HeaderCache] = None
+
+
+def get_header_cache() -> HeaderCache:
+    """Return the header cache, loading it the first time."""
+    global _header_cache
+    if _header_cache is None:
+        _header_cache = HeaderCache(utils.conf_location(P2C_CACHE_LOC))
+        _header_cache.load()
+    return _header_cache
+
+
 # Note: All the backup functions use zip files, but also work on FakeZip
 # directories.
 
@@ -274,21 +428,34 @@ def load_backup(zip_file):
         zip_names(zip_file)
         if file.endswith('.p2c')
     ]
-    # Each P2C init requires reading in the properties file, so this may take
-    # some time. Use a loading screen.
+    cache = get_header_cache()
+    cache.hits = cache.misses = 0
+    # Each P2C requires reading in the start of the file, so this may take
+    # some time. Read them in parallel, and use a loading screen.
     reading_loader.set_length('READ', len(puzzles))
     LOGGER.info('Loading {} maps..', len(puzzles))
-    with reading_loader:
-        for file in puzzles:
-            new_map = P2C.from_file(file, zip_file)
-            maps.append(new_map)
-            LOGGER.debug(
-                'Loading {} map "{}"',
-                'coop' if new_map.is_coop else 'sp',
-                new_map.title,
-            )
-            reading_loader.step('READ')
-    LOGGER.info('Done!')
+    start = time.perf_counter()
+    with reading_loader, ThreadPoolExecutor(P2C_READ_THREADS) as pool:
+        futures = [pool.submit(cache.read, zip_file, file) for file in puzzles]
+        try:
+            for file, future in zip(puzzles, futures):
+                new_map = P2C.from_header(file, zip_file, future.result())
+                maps.append(new_map)
+                LOGGER.debug(
+                    'Loading {} map "{}"',
+                    'coop' if new_map.is_coop else 'sp',
+                    new_map.title,
+                )
+                reading_loader.step('READ')
+        finally:
+            # If cancelled, don't wait for the remaining files.
+            for future in futures:
+                future.cancel()
+    cache.save()
+    LOGGER.info(
+        'Done in {:.2f}s, {} cached, {} read.',
+        time.perf_counter() - start, cache.hits, cache.misses,
+    )
 
     # It takes a while before the detail headers update positions,
     # so delay a refresh call.
@@ -365,10 +532,11 @@ def backup_maps(maps: List[P2C]) -> None:
     refresh_back_details()
 
 
-def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
+async def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
     """Perform an automatic backup for the given game.
 
     We do this seperately since we don't need to read the property files.
+    Files are added to the backup store, so only changed puzzles are compressed.
     """
     from BEE2_config import GEN_OPTS
     if not GEN_OPTS.get_bool('General', 'enable_auto_backup'):
@@ -388,6 +556,7 @@ def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
     backup_dir = GEN_OPTS.get_val('Directories', 'backup_loc', 'backups/')
 
     os.makedirs(backup_dir, exist_ok=True)
+    store = backup_store.BackupStore(backup_dir)
 
     # A version of the name stripped of special characters
     # Allowed: a-z, A-Z, 0-9, '_-.'
@@ -398,6 +567,25 @@ def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
 
     loader.set_length(AUTO_BACKUP_STAGE, len(to_backup))
 
+    files: Dict[str, str] = {}
+    limiter = trio.CapacityLimiter(AUTO_BACKUP_THREADS)
+
+    async def add_file(file: str) -> None:
+        """Hash and compress a file in a worker thread."""
+        files[file] = await trio.to_thread.run_sync(
+            store.add_file, os.path.join(folder, file),
+            limiter=limiter,
+        )
+        loader.step(AUTO_BACKUP_STAGE)
+
+    start = time.perf_counter()
+    async with trio.open_nursery() as nursery:
+        for file in to_backup:
+            if os.path.isfile(os.path.join(folder, file)):
+                nursery.start_soon(add_file, file)
+            else:
+                loader.step(AUTO_BACKUP_STAGE)
+
     if extra_back_count:
         back_files = [
             AUTO_BACKUP_FILE.format(game=safe_name, ind='')
@@ -406,7 +594,7 @@ def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
             for i in range(extra_back_count)
         ]
         # Move each file over by 1 index, ignoring missing ones
-        # We need to reverse to ensure we don't overwrite any zips
+        # We need to reverse to ensure we don't overwrite any manifests
         for old_name, new_name in reversed(
                 list(zip(back_files, back_files[1:]))
                 ):
@@ -427,15 +615,15 @@ def auto_backup(game: 'gameMan.Game', loader: loadScreen.LoadScreen) -> None:
         AUTO_BACKUP_FILE.format(game=safe_name, ind=''),
     )
     LOGGER.info('Writing backup to "{}"', final_backup)
-    with open(final_backup, 'wb') as f:
-        with ZipFile(f, mode='w', compression=ZIP_LZMA) as zip_file:
-            for file in to_backup:
-                zip_file.write(
-                    os.path.join(folder, file),
-                    file,
-                    ZIP_LZMA,
-                )
-                loader.step(AUTO_BACKUP_STAGE)
+    backup_store.Snapshot(files).write(final_backup)
+    # Remove blobs which are no longer used by any game's backups.
+    removed = await trio.to_thread.run_sync(
+        store.collect_garbage, backup_store.find_snapshots(backup_dir),
+    )
+    LOGGER.info(
+        'Backed up {} files in {:.2f}s, removed {} old files.',
+        len(files), time.perf_counter() - start, removed,
+    )
 
 
 def save_backup() -> None:
@@ -567,16 +755,36 @@ def ui_load_backup() -> None:
     """Prompt and load in a backup file."""
     file = filedialog.askopenfilename(
         title=str(TransToken.ui('Load Backup')),
-        filetypes=[(str(TRANS_FILETYPE), '.zip')],
+        filetypes=[
+            (str(TRANS_FILETYPE), '.zip'),
+            (str(TRANS_AUTO_FILETYPE), backup_store.MANIFEST_EXT),
+        ],
     )
     if not file:
         return
 
-    BACKUPS['backup_path'] = file
-    with open(file, 'rb') as f:
-        # Read the backup zip into memory!
-        data = f.read()
-        BACKUPS['unsaved_file'] = unsaved = BytesIO(data)
+    if file.casefold().endswith(backup_store.MANIFEST_EXT):
+        # An automatic backup, rebuild the zip from the store. This has to be saved as a new zip.
+        BACKUPS['backup_path'] = None
+        BACKUPS['unsaved_file'] = unsaved = BytesIO()
+        try:
+            backup_store.BackupStore(os.path.dirname(file)).write_zip(
+                backup_store.Snapshot.read(file),
+                unsaved,
+            )
+        except (OSError, ValueError, KeyError, lzma.LZMAError):
+            LOGGER.exception('Could not read automatic backup "{}":', file)
+            tk_tools.showerror(
+                TransToken.ui('BEE2 Backup'),
+                TransToken.ui('Could not read this automatic backup!'),
+            )
+            return
+    else:
+        BACKUPS['backup_path'] = file
+        with open(file, 'rb') as f:
+            # Read the backup zip into memory!
+            data = f.read()
+            BACKUPS['unsaved_file'] = unsaved = BytesIO(data)
 
     zip_file = ZipFile(
         unsaved,
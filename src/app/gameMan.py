@@ -18,8 +18,6 @@ import io
 import json
 import math
 import os
-import pickle
-import pickletools
 import re
 import shutil
 import urllib.error
@@ -34,14 +32,17 @@ from srctools import (
 )
 import srctools.logger
 import srctools.fgd
+from srctools.filesys import File, RawFileSystem, ZipFileSystem
 import trio
 import attrs
 
 from BEE2_config import ConfigFile
-from app import backup, tk_tools, resource_gen, TK_ROOT, DEV_MODE, background_run
+from app import backup, tk_tools, resource_gen, lazy_conf, TK_ROOT, DEV_MODE, background_run
 from config.gen_opts import GenOptions
 from transtoken import TransToken
 import transtoken
+import compiler_server
+import config_snapshot
 import loadScreen
 import packages
 import packages.template_brush
@@ -148,6 +149,12 @@ EXE_SUFFIX = (
 
 # The systems we need to copy to ingame resources
 res_system = FileSystemChain()
+# Records the resources we copied into the game, so only changed files need to be copied.
+RES_MANIFEST_LOC = 'bin/bee2/resources.json'
+RES_MANIFEST_VERSION = 2
+# The maximum number of resources to copy simultaneously.
+RES_COPY_THREADS = 8
+COPY_CHUNK_SIZE = 64 * 1024
 
 # We search for Tag and Mel's music files, and copy them to games on export.
 # That way they can use the files.
@@ -232,6 +239,55 @@ def load_filesystems(package_sys: Iterable[FileSystem]) -> None:
         res_system.add_sys(system, prefix='resources/')
 
 
+@attrs.frozen
+class ResourceEntry:
+    """A resource file we copied into the game, stored in the manifest.
+
+    The key is the file's cache key - the CRC for zips and VPKs, or the
+    modification time for folders. If that is -1, the file is always copied.
+    """
+    package: str
+    size: int
+    key: int
+
+    @classmethod
+    def from_file(cls, file: File, package: str) -> ResourceEntry:
+        """Compute the size and cache key for a file in one of the package filesystems.
+
+        Zips and folders already store the size, so we don't need to read those files.
+        """
+        filesys = file.sys
+        if isinstance(filesys, ZipFileSystem):
+            size = filesys.zip.getinfo(file.path).file_size
+        elif isinstance(filesys, RawFileSystem):
+            size = os.path.getsize(os.path.join(filesys.path, file.path))
+        else:
+            size = 0
+            with file.open_bin() as f:
+                for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+                    size += len(chunk)
+        return cls(package, size, file.cache_key())
+
+    def matches(self, other: ResourceEntry) -> bool:
+        """Check if this is the same file as another, so it doesn't need to be copied."""
+        return self.key != -1 and self == other
+
+
+def _copy_resource(file: File, dest: str) -> None:
+    """Copy a resource into the game. This runs in a thread."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with file.open_bin() as fsrc, open(dest, 'wb') as fdest:
+        shutil.copyfileobj(fsrc, fdest, COPY_CHUNK_SIZE)
+
+
+def _file_size(path: str) -> int:
+    """Return the size of a file, or -1 if it is missing."""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return -1
+
+
 def quit_application() -> NoReturn:
     """Command run to quit the application.
 
@@ -552,59 +608,161 @@ class Game:
             packages.LOADED.packages.items()
         )
 
-    def refresh_cache(self, already_copied: set[str]) -> None:
+    def load_res_manifest(self) -> Optional[dict[str, ResourceEntry]]:
+        """Load the manifest of resources previously copied into the game.
+
+        If it is missing or invalid, None is returned.
+        """
+        try:
+            with open(self.abs_path(RES_MANIFEST_LOC), encoding='utf8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            LOGGER.warning('Could not read resource manifest:', exc_info=True)
+            return None
+        if not isinstance(data, dict) or data.get('version') != RES_MANIFEST_VERSION:
+            return None
+        try:
+            return {
+                path: ResourceEntry(package, size, key)
+                for path, (package, size, key) in data['files'].items()
+            }
+        except (KeyError, TypeError, ValueError):
+            LOGGER.warning('Invalid resource manifest!', exc_info=True)
+            return None
+
+    def save_res_manifest(self, manifest: dict[str, ResourceEntry]) -> None:
+        """Write the manifest of resources copied into the game."""
+        path = self.abs_path(RES_MANIFEST_LOC)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with AtomicWriter(path) as f:
+            json.dump({
+                'version': RES_MANIFEST_VERSION,
+                'files': {
+                    dest: [entry.package, entry.size, entry.key]
+                    for dest, entry in manifest.items()
+                },
+            }, f)
+
+    async def refresh_cache(self, already_copied: set[str]) -> None:
         """Copy over the resource files into this game.
 
         already_copied is passed from copy_mod_music(), to
         indicate which files should remain. It is the full path to the files.
+
+        A manifest records the size and cache key of each file we copied, so only
+        added or changed files are copied, and only removed files are deleted.
         """
         screen_func = export_screen.step
+        old_manifest = self.load_res_manifest()
+        manifest: dict[str, ResourceEntry] = {}
+        to_copy: list[tuple[File, str, int]] = []
+        sys_to_pack = {
+            id(filesys): pak_id
+            for pak_id, filesys in packages.PACKAGE_SYS.items()
+        }
 
         with res_system:
-            for file in res_system.walk_folder_repeat():
-                try:
-                    start_folder, path = file.path.split('/', 1)
-                except ValueError:
-                    LOGGER.warning('File in resources root: "{}"!', file.path)
-                    continue
+            # Walk each package directly, so we have the files from the original systems.
+            for filesys, prefix in res_system.systems:
+                pak_id = sys_to_pack.get(id(filesys), '')
+                for file in filesys.walk_folder(prefix):
+                    res_path = os.path.relpath(file.path, prefix).replace('\\', '/')
+                    try:
+                        start_folder, path = res_path.split('/', 1)
+                    except ValueError:
+                        LOGGER.warning('File in resources root: "{}"!', res_path)
+                        continue
 
-                start_folder = start_folder.casefold()
+                    start_folder = start_folder.casefold()
 
-                if start_folder == 'instances':
-                    dest = self.abs_path(INST_PATH + '/' + path.casefold())
-                elif start_folder in ('bee2', 'music_samp'):
-                    screen_func('RES', start_folder)
-                    continue  # Skip app icons and music samples.
-                else:
-                    # Preserve original casing.
-                    dest = self.abs_path(os.path.join('bee2', file.path))
+                    if start_folder == 'instances':
+                        rel_dest = INST_PATH + '/' + path.casefold()
+                    elif start_folder in ('bee2', 'music_samp'):
+                        screen_func('RES', start_folder)
+                        continue  # Skip app icons and music samples.
+                    else:
+                        # Preserve original casing.
+                        rel_dest = os.path.join('bee2', res_path)
+                    dest = self.abs_path(rel_dest)
 
-                # Already copied from another package.
-                if dest.casefold() in already_copied:
-                    screen_func('RES', dest)
-                    continue
-                already_copied.add(dest.casefold())
+                    # Already copied from another package.
+                    if dest.casefold() in already_copied:
+                        screen_func('RES', dest)
+                        continue
+                    already_copied.add(dest.casefold())
+
+                    entry = manifest[rel_dest] = ResourceEntry.from_file(file, pak_id)
+                    # If the source is unchanged and the copy is intact, we don't need to copy.
+                    old_entry = old_manifest.get(rel_dest) if old_manifest is not None else None
+                    if (
+                        old_entry is not None
+                        and entry.matches(old_entry)
+                        and _file_size(dest) == entry.size
+                    ):
+                        screen_func('RES', res_path)
+                    else:
+                        to_copy.append((file, dest, entry.size))
 
-                os.makedirs(os.path.dirname(dest), exist_ok=True)
-                with file.open_bin() as fsrc, open(dest, 'wb') as fdest:
-                    shutil.copyfileobj(fsrc, fdest)
+            LOGGER.info(
+                'Copying {}/{} resources, {} unchanged.',
+                len(to_copy), len(manifest), len(manifest) - len(to_copy),
+            )
+            if to_copy:
+                # If we fail partway through, the manifest won't match the files.
+                # Remove it, so everything is checked again next time.
+                try:
+                    os.remove(self.abs_path(RES_MANIFEST_LOC))
+                except FileNotFoundError:
+                    pass
+
+            total_bytes = sum(size for _, _, size in to_copy)
+            copied_bytes = 0
+            export_screen.set_bytes('RES', 0, total_bytes)
+            limiter = trio.CapacityLimiter(RES_COPY_THREADS)
+
+            async def copy_file(file: File, dest: str, size: int) -> None:
+                """Copy a single file in a thread, then update the progress."""
+                nonlocal copied_bytes
+                await trio.to_thread.run_sync(_copy_resource, file, dest, limiter=limiter)
+                copied_bytes += size
                 screen_func('RES', file.path)
+                export_screen.set_bytes('RES', copied_bytes, total_bytes)
 
-        LOGGER.info('Cache copied.')
+            async with trio.open_nursery() as nursery:
+                for args in to_copy:
+                    nursery.start_soon(copy_file, *args)
 
-        for path in [INST_PATH, 'bee2']:
-            abs_path = self.abs_path(path)
-            for dirpath, dirnames, filenames in os.walk(abs_path):
-                for filename in filenames:
-                    # Keep VMX backups, disabled editor models, and the coop
-                    # gun instance.
-                    if filename.endswith(('.vmx', '.mdl_dis', 'tag_coop_gun.vmf')):
-                        continue
-                    path = os.path.join(dirpath, filename)
+        LOGGER.info('Cache copied.')
 
-                    if path.casefold() not in already_copied:
-                        LOGGER.info('Deleting: {}', path)
+        if old_manifest is not None:
+            # Only files we previously copied need to be removed.
+            for rel_dest in old_manifest.keys() - manifest.keys():
+                path = self.abs_path(rel_dest)
+                if path.casefold() not in already_copied:
+                    LOGGER.info('Deleting: {}', path)
+                    try:
                         os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        else:
+            # We don't know what was copied before, check everything.
+            for path in [INST_PATH, 'bee2']:
+                abs_path = self.abs_path(path)
+                for dirpath, dirnames, filenames in os.walk(abs_path):
+                    for filename in filenames:
+                        # Keep VMX backups, disabled editor models, and the coop
+                        # gun instance.
+                        if filename.endswith(('.vmx', '.mdl_dis', 'tag_coop_gun.vmf')):
+                            continue
+                        path = os.path.join(dirpath, filename)
+
+                        if path.casefold() not in already_copied:
+                            LOGGER.info('Deleting: {}', path)
+                            os.remove(path)
+
+        self.save_res_manifest(manifest)
 
         # Save the new cache modification date.
         self.mod_times.clear()
@@ -741,8 +899,10 @@ class Game:
                     vpk_success = False
 
                 export_screen.step('EXP', obj_type.__name__)
+            lazy_conf.PARSE_CACHE.log_stats()
 
-            packages.template_brush.write_templates(self)
+            # Parsing changed templates is slow, don't block the UI.
+            await trio.to_thread.run_sync(packages.template_brush.write_templates, self)
             export_screen.step('EXP', 'template_brush')
 
             vbsp_config.set_key(('Options', 'Game_ID'), self.steamID)
@@ -821,7 +981,7 @@ class Game:
                 export_screen.step('BACK', name)
 
             # Backup puzzles, if desired
-            backup.auto_backup(selected_game, export_screen)
+            await backup.auto_backup(selected_game, export_screen)
 
             # Special-case: implement the UnlockDefault stylevar here, so all items are modified.
             if selected_objects[packages.StyleVar]['UnlockDefault']:
@@ -856,8 +1016,7 @@ class Game:
 
             LOGGER.info('Writing Editoritems database...')
             with open(self.abs_path('bin/bee2/editor.bin'), 'wb') as inst_file:
-                pick = pickletools.optimize(pickle.dumps(all_items))
-                inst_file.write(pick)
+                editoritems.ItemDatabase.write(inst_file, all_items)
             export_screen.step('EXP', 'editoritems_db')
 
             LOGGER.info('Writing VBSP Config!')
@@ -865,9 +1024,17 @@ class Game:
             with open(self.abs_path('bin/bee2/vbsp_config.cfg'), 'w', encoding='utf8') as vbsp_file:
                 for line in vbsp_config.export():
                     vbsp_file.write(line)
+            # Parse it back to validate, then save a snapshot the compiler can load faster.
+            config_snapshot.write(
+                self.abs_path('bin/bee2/vbsp_config.cfg'),
+                self.abs_path('bin/bee2/vbsp_config.bin'),
+            )
             export_screen.step('EXP', 'vbsp_config')
 
             error_server_running = await terminate_error_server()
+            # The compiler server has the old config, and may be using the compiler files.
+            if await trio.to_thread.run_sync(compiler_server.stop, self.abs_path('bin')):
+                LOGGER.info('Stopped compiler server.')
 
             if num_compiler_files > 0:
                 LOGGER.info('Copying Custom Compiler!')
@@ -918,7 +1085,7 @@ class Game:
             if should_refresh:
                 LOGGER.info('Copying Resources!')
                 music_files = self.copy_mod_music()
-                self.refresh_cache(music_files)
+                await self.refresh_cache(music_files)
 
             LOGGER.info('Optimizing editor models...')
             self.clean_editor_models(all_items)
@@ -940,6 +1107,10 @@ class Game:
             self.exported_style = style.id
             save()
 
+            compiler_server.write_stamp(self.abs_path('bin'))
+            if config.APP.get_cur_conf(GenOptions).compiler_server:
+                compiler_server.start(self.abs_path('bin'))
+
             if self.steamID == utils.STEAM_IDS['APERTURE TAG']:
                 os.makedirs(self.abs_path('sdk_content/maps/instances/bee2/'), exist_ok=True)
                 with open(self.abs_path('sdk_content/maps/instances/bee2/tag_coop_gun.vmf'), 'w') as f2:
@@ -17,6 +17,9 @@ import tkinter as tk
 import itertools
 import logging
 import functools
+import os
+import statistics
+import time
 
 from PIL import ImageFont, ImageTk, Image, ImageDraw
 import attrs
@@ -27,7 +30,9 @@ from srctools.vtf import VTFFlags, VTF
 from srctools.filesys import FileSystem, RawFileSystem, FileSystemChain
 import srctools.logger
 
-from app import TK_ROOT
+from app import TK_ROOT, img_cache
+from config.gen_opts import GenOptions
+import config
 import utils
 
 # Widgets with an image attribute that can be set.
@@ -60,6 +65,17 @@ _unused_tk_img: dict[tuple[int, int], list[tk.PhotoImage]] = {}
 LOGGER = srctools.logger.get_logger('img')
 FSYS_BUILTIN = RawFileSystem(str(utils.install_path('images')))
 PACK_SYSTEMS: dict[str, FileSystem] = {}
+# Modification times of zipped packages, used to check the thumbnail cache is valid.
+_PACK_MTIMES: dict[str, int] = {}
+# Resized images from previous launches.
+THUMBNAILS: img_cache.ThumbnailCache | None = None
+THUMBNAIL_LOC = 'img_cache/'
+# Write new images to the cache this often.
+CACHE_SAVE_INTERVAL = 60.0
+# How often queued images are reordered by visibility.
+LOAD_RESORT_INTERVAL = 0.1
+# How often to log loading statistics.
+LOAD_METRICS_INTERVAL = 5.0
 
 # Silence DEBUG messages from Pillow, they don't help.
 logging.getLogger('PIL').setLevel(logging.INFO)
@@ -161,8 +177,25 @@ def _load_file(
     width: int, height: int,
     resize_algo: Literal[0, 1, 2, 3, 4, 5],
     check_other_packages: bool=False,
+    use_cache: bool=False,
 ) -> Image.Image:
-    """Load an image from a filesystem."""
+    """Load an image from a filesystem.
+
+    If use_cache is set, resized images are fetched from and stored in the thumbnail cache.
+    """
+    cache_key: img_cache.CacheKey | None = None
+    if use_cache and THUMBNAILS is not None and width > 0 and height > 0:
+        try:
+            # Folders aren't cached, since we can't cheaply check for changes.
+            pack_mtime = _PACK_MTIMES[uri.package]
+        except KeyError:
+            pass
+        else:
+            cache_key = (uri.package, uri.path.casefold(), pack_mtime, width, height)
+            cached = THUMBNAILS.get(cache_key)
+            if cached is not None:
+                return cached
+
     path = uri.path.casefold()
     if path[-4:-3] == '.':
         path, ext = path[:-4], path[-3:]
@@ -184,6 +217,7 @@ def _load_file(
         for pak_id, other_fsys in PACK_SYSTEMS.items():
             try:
                 img_file = other_fsys[f'{path}.{ext}']
+                cache_key = None  # Changes to the other package wouldn't be detected.
                 LOGGER.warning(
                     'Image "{}" was found in package "{}", '
                     'fix the reference.',
@@ -228,6 +262,8 @@ def _load_file(
 
     if width > 0 and height > 0 and (width, height) != image.size:
         image = image.resize((width, height), resample=resize_algo)
+    if cache_key is not None and THUMBNAILS is not None and image.mode == 'RGBA':
+        THUMBNAILS.add(cache_key, image)
     return image
 
 
@@ -549,6 +585,8 @@ class Handle:
         self._users.discard(ref)
         for child in self._children():
             child._decref(self)
+        if not self._users:
+            _scheduler.cancel(self)
         if _load_nursery is None:
             return  # Not loaded, can't unload.
         if not self._users and (self._cached_tk is not None or self._cached_pil is not None):
@@ -582,13 +620,31 @@ class Handle:
             if _load_nursery is None:
                 _early_loads.add(self)
             else:
-                _load_nursery.start_soon(self._load_task)
+                _scheduler.add(self)
         return Handle.ico_loading(self.width, self.height).get_tk()
 
+    def _is_visible(self) -> bool:
+        """Check if any widget using this image is currently displayed."""
+        for user in self._users:
+            if isinstance(user, WeakRef):
+                label: tkImgWidgets | None = user()
+                try:
+                    if label is not None and label.winfo_viewable():
+                        return True
+                except tk.TclError:
+                    pass  # Destroyed.
+            elif user._is_visible():
+                return True
+        return False
+
     async def _load_task(self) -> None:
         """Scheduled to load images then apply to the labels."""
         await trio.to_thread.run_sync(self._load_pil)
         self._loading = False
+        if not self.has_users():
+            # All the widgets were removed while loading, discard.
+            self._cached_pil = None
+            return
         tk_ico = self._load_tk()
         for label_ref in self._users:
             if isinstance(label_ref, WeakRef):
@@ -683,7 +739,7 @@ class ImgFile(Handle):
             LOGGER.warning('Unknown package for loading images: "{}"!', self.uri)
             return Handle.error(self.width, self.height).get_pil()
 
-        return _load_file(fsys, self.uri, self.width, self.height, Image.ANTIALIAS, True)
+        return _load_file(fsys, self.uri, self.width, self.height, Image.ANTIALIAS, True, True)
 
     def resize(self, width: int, height: int) -> ImgFile:
         """Return a copy with a different size."""
@@ -860,6 +916,97 @@ class ImgTextOverlay(Handle):
         return self._deduplicate(width, height, self.text, self.size)
 
 
+class LoadScheduler:
+    """Loads images in a fixed number of workers.
+
+    Images in widgets which are currently displayed are loaded first, then the
+    rest in the order they were requested. If all users of an image are removed
+    before it's loaded, it is skipped.
+    """
+    def __init__(self) -> None:
+        # Handle -> time it was requested.
+        self._pending: dict[Handle, float] = {}
+        # The order to load in, which may contain cancelled handles.
+        self._order: list[Handle] = []
+        self._next_sort = 0.0
+        self._wakeup = trio.Event()
+        # Statistics for the current period.
+        self.active = 0
+        self.cancelled = 0
+        self.latencies: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, handle: Handle) -> None:
+        """Queue a handle to be loaded."""
+        if handle not in self._pending:
+            self._pending[handle] = time.perf_counter()
+            self._order.append(handle)
+            self._wakeup.set()
+
+    def cancel(self, handle: Handle) -> None:
+        """Remove a handle from the queue, if it hasn't started loading."""
+        if self._pending.pop(handle, None) is not None:
+            handle._loading = False
+            self.cancelled += 1
+
+    def _pop(self) -> tuple[Handle, float] | None:
+        """Pick the next handle to load."""
+        now = time.perf_counter()
+        if now >= self._next_sort:
+            self._next_sort = now + LOAD_RESORT_INTERVAL
+            # Visible first, otherwise the order they were requested.
+            self._order = sorted(
+                self._pending,
+                key=lambda hand: (not hand._is_visible(), self._pending[hand]),
+                reverse=True,
+            )
+        while self._order:
+            handle = self._order.pop()
+            try:
+                return handle, self._pending.pop(handle)
+            except KeyError:
+                pass  # Cancelled.
+        return None
+
+    async def worker(self) -> None:
+        """Repeatedly load handles."""
+        while True:
+            res = self._pop()
+            if res is None:
+                if self._wakeup.is_set():
+                    self._wakeup = trio.Event()
+                await self._wakeup.wait()
+                continue
+            handle, queued = res
+            self.active += 1
+            try:
+                await handle._load_task()
+            finally:
+                self.active -= 1
+            self.latencies.append(time.perf_counter() - queued)
+
+    async def log_metrics(self) -> None:
+        """Periodically log the queue length and load times."""
+        while True:
+            await trio.sleep(LOAD_METRICS_INTERVAL)
+            if not self.latencies and not self.cancelled:
+                continue
+            latencies, self.latencies = self.latencies, []
+            cancelled, self.cancelled = self.cancelled, 0
+            LOGGER.info(
+                'Loaded {} images ({} cancelled), {} loading, {} queued. '
+                'Latency: median {:.0f}ms, max {:.0f}ms',
+                len(latencies), cancelled, self.active, len(self._pending),
+                1000 * statistics.median(latencies) if latencies else 0.0,
+                1000 * max(latencies, default=0.0),
+            )
+
+
+_scheduler = LoadScheduler()
+
+
 def _label_destroyed(ref: WeakRef[tkImgWidgetsT]) -> None:
     """Finaliser for _wid_tk keys.
 
@@ -894,6 +1041,35 @@ async def _spin_load_icons() -> None:
             # Otherwise, this isn't being used.
 
 
+def _load_thumbnails(filesystems: Mapping[str, FileSystem]) -> None:
+    """Find the package modification times, then load the thumbnail cache."""
+    global THUMBNAILS
+    _PACK_MTIMES.clear()
+    for pak_id, sys in filesystems.items():
+        if not isinstance(sys, RawFileSystem):
+            try:
+                _PACK_MTIMES[pak_id] = int(os.stat(sys.path).st_mtime)
+            except OSError:
+                pass
+    cache = img_cache.ThumbnailCache(utils.conf_location(THUMBNAIL_LOC))
+    cache.load()
+    LOGGER.info('Loaded {} cached images.', len(cache))
+    THUMBNAILS = cache
+
+
+def save_thumbnails() -> None:
+    """Write newly loaded images to the thumbnail cache."""
+    if THUMBNAILS is not None:
+        THUMBNAILS.save(_PACK_MTIMES)
+
+
+async def _save_thumbnails_task() -> None:
+    """Periodically write newly loaded images to the cache."""
+    while True:
+        await trio.sleep(CACHE_SAVE_INTERVAL)
+        await trio.to_thread.run_sync(save_thumbnails)
+
+
 # noinspection PyProtectedMember
 async def init(filesystems: Mapping[str, FileSystem]) -> None:
     """Load in the filesystems used in package and start the background loading."""
@@ -906,14 +1082,24 @@ async def init(filesystems: Mapping[str, FileSystem]) -> None:
             (sys, 'resources/materials/'),
             (sys, 'resources/materials/models/props_map_editor/'),
         )
+    # Without packages, saving would discard the whole cache.
+    if filesystems:
+        await trio.to_thread.run_sync(_load_thumbnails, filesystems)
 
     async with trio.open_nursery() as _load_nursery:
         LOGGER.debug('Early loads: {}', _early_loads)
         while _early_loads:
             handle = _early_loads.pop()
             if handle._users:
-                _load_nursery.start_soon(Handle._load_task, handle)
+                _scheduler.add(handle)
+            else:
+                handle._loading = False
+        for _ in range(max(1, config.APP.get_cur_conf(GenOptions).img_load_workers)):
+            _load_nursery.start_soon(_scheduler.worker)
+        _load_nursery.start_soon(_scheduler.log_metrics)
         _load_nursery.start_soon(_spin_load_icons)
+        if THUMBNAILS is not None:
+            _load_nursery.start_soon(_save_thumbnails_task)
         await trio.sleep_forever()
 
 
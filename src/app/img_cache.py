@@ -0,0 +1,170 @@
+"""A persistent cache of resized package images, so they don't need to be decoded each launch.
+
+Images are stored as zlib-compressed RGBA data in a single data file, which is
+memory-mapped for reading. A separate index maps each image's key to its location.
+New images are appended when the cache is saved. Images from packages which have
+been modified or removed are discarded then, rewriting the data file.
+"""
+from __future__ import annotations
+from typing import Dict, Mapping, Optional, Tuple
+from typing_extensions import TypeAlias
+from pathlib import Path
+import mmap
+import pickle
+import threading
+import zlib
+
+from PIL import Image
+from srctools import AtomicWriter
+import srctools.logger
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+CACHE_VERSION = 1
+INDEX_NAME = 'thumbnails.idx'
+DATA_NAME = 'thumbnails.bin'
+# Package ID, image path, package modification time, width, height.
+CacheKey: TypeAlias = Tuple[str, str, int, int, int]
+# Offset, compressed size in the data file.
+CacheLoc: TypeAlias = Tuple[int, int]
+
+
+class ThumbnailCache:
+    """Stores resized RGBA images on disk.
+
+    Images can be fetched and added from any thread.
+    """
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+        self._index: Dict[CacheKey, CacheLoc] = {}
+        # Images added since the last save.
+        self._pending: Dict[CacheKey, bytes] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._index) + len(self._pending)
+
+    def load(self) -> None:
+        """Read the index, and map the data file."""
+        try:
+            with open(self.folder / INDEX_NAME, 'rb') as f:
+                version, index = pickle.load(f)
+            if version != CACHE_VERSION:
+                return
+            data_file = open(self.folder / DATA_NAME, 'rb')
+        except FileNotFoundError:
+            return
+        except Exception:
+            LOGGER.warning('Could not read image cache:', exc_info=True)
+            return
+        with data_file:
+            try:
+                data_map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty file.
+                return
+        with self._lock:
+            self._index = index
+            self._map = data_map
+
+    def get(self, key: CacheKey) -> Optional[Image.Image]:
+        """Fetch an image, if present."""
+        with self._lock:
+            try:
+                data = self._pending[key]
+            except KeyError:
+                try:
+                    offset, size = self._index[key]
+                except KeyError:
+                    self.misses += 1
+                    return None
+                assert self._map is not None
+                data = self._map[offset:offset + size]
+            self.hits += 1
+        try:
+            return Image.frombytes('RGBA', key[3:], zlib.decompress(data))
+        except (zlib.error, ValueError):
+            LOGGER.warning('Cached image {} is corrupt!', key, exc_info=True)
+            return None
+
+    def add(self, key: CacheKey, image: Image.Image) -> None:
+        """Add an image to the cache, which will be written when saved."""
+        if image.mode != 'RGBA' or image.size != key[3:]:
+            raise ValueError(f'Image {image} does not match key {key}!')
+        data = zlib.compress(image.tobytes(), 1)
+        with self._lock:
+            self._pending[key] = data
+
+    def save(self, pack_mtimes: Mapping[str, int]) -> None:
+        """Write new images to disk.
+
+        Images for packages not in the mapping or with a different modification time are discarded.
+        """
+        with self._lock:
+            stale = [
+                key for key in self._index
+                if pack_mtimes.get(key[0]) != key[2]
+            ]
+            if not stale and not self._pending:
+                return
+            self.folder.mkdir(parents=True, exist_ok=True)
+            index = {
+                key: loc for key, loc in self._index.items()
+                if pack_mtimes.get(key[0]) == key[2]
+            }
+            new_data = b''
+            if stale or self._map is None:
+                # Rewrite the whole file, dropping old images.
+                if stale:
+                    LOGGER.info('Discarding {} outdated cached images.', len(stale))
+                offset = 0
+                chunks = []
+                for key, (old_offset, size) in index.items():
+                    assert self._map is not None, "Index present, but not data?"
+                    chunks.append(self._map[old_offset:old_offset + size])
+                    index[key] = (offset, size)
+                    offset += size
+                old_size = 0
+                new_data = b''.join(chunks)
+                mode = 'wb'
+            else:
+                old_size = len(self._map)
+                mode = 'ab'
+            chunks = [new_data]
+            offset = old_size + len(new_data)
+            for key, data in self._pending.items():
+                chunks.append(data)
+                index[key] = (offset, len(data))
+                offset += len(data)
+
+            # The map must be closed before the file can be replaced.
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            try:
+                # Write the data first, so the index never refers to missing data.
+                with open(self.folder / DATA_NAME, mode) as f:
+                    if mode == 'ab' and f.tell() != old_size:
+                        raise OSError('Image cache was modified while in use!')
+                    f.writelines(chunks)
+                with AtomicWriter(self.folder / INDEX_NAME, is_bytes=True) as f:
+                    pickle.dump((CACHE_VERSION, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                LOGGER.warning('Could not write image cache:', exc_info=True)
+                self._index.clear()
+                return
+            self._index = index
+            self._pending.clear()
+            if offset > 0:  # Empty files can't be mapped.
+                with open(self.folder / DATA_NAME, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        LOGGER.info('Saved image cache, {} images.', len(index))
+
+    def close(self) -> None:
+        """Close the data file."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._index.clear()
@@ -1,6 +1,7 @@
 """Implements callables which lazily parses and combines config files."""
 from __future__ import annotations
-from typing import Callable, Pattern
+from typing import Callable, Hashable, Pattern, Tuple
+from collections import OrderedDict
 import functools
 
 import trio
@@ -16,6 +17,65 @@ LOGGER = logger.get_logger(__name__)
 LazyConf = Callable[[], Property]
 # Empty property.
 BLANK: LazyConf = lambda: Property.root()
+# The total size of the source text to keep parsed trees for.
+CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+
+class ParseCache:
+	"""Caches parsed config files, so exporting multiple times doesn't need to reparse.
+
+	Trees are keyed by package, path and modification time, so changed files are reparsed.
+	The stored trees are never modified - callers are given copies. Once the text size of
+	the cached files exceeds max_size, the least recently used are discarded.
+	"""
+	def __init__(self, max_size: int = CACHE_MAX_SIZE) -> None:
+		self.max_size = max_size
+		self.size = 0
+		self.hits = self.misses = 0
+		self._trees: OrderedDict[Hashable, Tuple[Property, int]] = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._trees)
+
+	def parse(self, key: Hashable, file: File) -> Property:
+		"""Parse this file, or return a copy of the cached tree."""
+		try:
+			tree, size = self._trees[key]
+		except KeyError:
+			pass
+		else:
+			self.hits += 1
+			self._trees.move_to_end(key)
+			return tree.copy()
+
+		self.misses += 1
+		with file.open_str() as f:
+			text = f.read()
+		tree = Property.parse(text, file.path)
+		size = len(text)
+		if size <= self.max_size:
+			self._trees[key] = tree, size
+			self.size += size
+			while self.size > self.max_size:
+				_, (_, old_size) = self._trees.popitem(last=False)
+				self.size -= old_size
+		return tree.copy()
+
+	def clear(self) -> None:
+		"""Remove all cached trees."""
+		self._trees.clear()
+		self.size = 0
+
+	def log_stats(self) -> None:
+		"""Log the number of hits and misses, then reset them."""
+		LOGGER.info(
+			'Config cache: {} hits, {} misses, {} files = {:.1f}KB cached.',
+			self.hits, self.misses, len(self._trees), self.size / 1024,
+		)
+		self.hits = self.misses = 0
+
+
+PARSE_CACHE = ParseCache()
 
 
 def raw_prop(block: Property, source: str= '') -> LazyConf:
@@ -52,8 +112,7 @@ def from_file(path: utils.PackagePath, missing_ok: bool=False, source: str= '')
 	def loader() -> Property:
 		"""Load and parse the specified file when called."""
 		try:
-			with file.open_str() as f:
-				props = Property.parse(f)
+			props = PARSE_CACHE.parse((path.package, path.path, file.cache_key()), file)
 		except (KeyValError, FileNotFoundError, UnicodeDecodeError):
 			LOGGER.exception('Unable to read "{}"', path)
 			raise
@@ -88,10 +147,8 @@ def concat(a: LazyConf, b: LazyConf) -> LazyConf:
 
 	def concat_inner() -> Property:
 		"""Resolve then merge the configs."""
-		prop = Property.root()
-		prop.extend(a())
-		prop.extend(b())
-		return prop
+		# These are new trees, so we don't need to copy them again.
+		return Property.root(*a(), *b())
 	return concat_inner
 
 
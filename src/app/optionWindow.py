@@ -10,6 +10,7 @@ from typing import Callable, List, Optional, Tuple, Dict
 import attrs
 import srctools.logger
 
+import compiler_server
 import packages
 from app.tooltip import add_tooltip
 from app import (
@@ -452,6 +453,16 @@ async def init_dev_tab(f: ttk.Frame) -> None:
         ),
     ).grid(row=3, column=0, sticky='W')
 
+    if compiler_server.SUPPORTED:
+        make_checkbox(
+            frm_check, 'compiler_server',
+            desc=TransToken.ui("Keep Compiler Loaded"),
+            tooltip=TransToken.ui(
+                'After exporting, start a background copy of the compiler which keeps the '
+                'configuration loaded, so compiles start faster.'
+            ),
+        ).grid(row=4, column=0, sticky='W')
+
     make_checkbox(
         frm_check, 'dev_mode',
         var=DEV_MODE,
@@ -44,6 +44,8 @@ import config
 LOGGER = srctools.logger.get_logger(__name__)
 ITEM_WIDTH = ICON_SIZE + (32 if utils.MAC else 16)
 ITEM_HEIGHT = ICON_SIZE + 51
+# After the window is resized, wait this long (in ms) for more changes before repositioning items.
+RESIZE_DELAY = 50
 
 # The two icons used for boolean item attributes
 ICON_CHECK = img.Handle.builtin('icons/check', 16, 16)
@@ -154,6 +156,17 @@ class AttrDef:
         return AttrDef(attr_id, desc, default, AttrTypes.COLOR)
 
 
+def visible_rows(y_off: int, count: int, columns: int, row_height: int, top: float, bottom: float) -> range:
+    """Return the rows of a group of items which overlap the region between top and bottom.
+
+    The group's first row starts at y_off.
+    """
+    rows = math.ceil(count / columns)
+    first = max(0, math.floor((top - y_off) / row_height))
+    last = min(rows, math.ceil((bottom - y_off) / row_height))
+    return range(first, max(first, last))
+
+
 class GroupHeader(tk_tools.LineHeader):
     """The widget used for group headers."""
     def __init__(self, win: SelectorWin, title: TransToken, menu: tk.Menu) -> None:
@@ -234,7 +247,7 @@ class Item:
     - authors: A list of the item's authors.
     - group: Items with the same group name will be shown together.
     - attrs: a dictionary containing the attribute values for this item.
-    - button, Set later, the button TK object for this item
+    - button: The button TK object displaying this item, if it's currently visible.
     - source: For debugging only, the packages the item came from.
     """
     __slots__ = [
@@ -294,8 +307,8 @@ class Item:
         self.snd_sample = snd_sample
         self.authors: list[str] = list(authors)
         self.attrs: dict[str, AttrValues] = dict(attributes)
-        # The button widget for this item.
-        self.button: ttk.Button | None= None
+        # The button widget for this item, while it's scrolled into view.
+        self.button: ttk.Button | None = None
         # The selector window we belong to.
         self._selector: SelectorWin | None = None
         # The position on the menu this item is located at.
@@ -367,15 +380,6 @@ class Item:
         else:
             self._selector.sel_item(self)
 
-    def set_pos(self, x: int = None, y: int = None) -> None:
-        """Place the item on the palette."""
-        if x is None or y is None:
-            # Remove from the window.
-            self.button.place_forget()
-        else:
-            self.button.place(x=x, y=y)
-            self.button.lift()  # Force a particular stacking order for widgets
-
     def copy(self) -> Item:
         """Duplicate an item."""
         item = Item.__new__(Item)
@@ -646,6 +650,16 @@ class SelectorWin(Generic[CallbackT]):
 
         # The maximum number of items that fits per row (set in flow_items)
         self.item_width = 1
+        # The Y position of the first row of items in each expanded group (set in flow_items).
+        self._group_y: dict[str, int] = {}
+        # The total height of the items.
+        self._flow_height = 0
+        # Only items scrolled into view have buttons. These are reused as the window scrolls.
+        self._item_buttons: list[ttk.Button] = []
+        self._button_items: dict[ttk.Button, Item] = {}
+        # Pending after() callbacks to reposition items.
+        self._flow_after: str | None = None
+        self._place_after: str | None = None
 
         # The ID used to persist our window state across sessions.
         self.save_id = save_id.casefold()
@@ -696,7 +710,7 @@ class SelectorWin(Generic[CallbackT]):
             command=self.wid_canvas.yview,
         )
         self.wid_scroll.grid(row=0, column=1, sticky="NS")
-        self.wid_canvas['yscrollcommand'] = self.wid_scroll.set
+        self.wid_canvas['yscrollcommand'] = self._on_scroll
 
         tk_tools.add_mousewheel(self.wid_canvas, self.win)
 
@@ -908,7 +922,7 @@ class SelectorWin(Generic[CallbackT]):
 
         self.set_disp()
         self.refresh()
-        self.wid_canvas.bind("<Configure>", self.flow_items)
+        self.wid_canvas.bind("<Configure>", self._on_configure)
         localisation.add_callback(call=False)(self._update_translations)
 
     async def _load_selected(self, selected: LastSelected) -> None:
@@ -1003,21 +1017,6 @@ class SelectorWin(Generic[CallbackT]):
                 raise ValueError(f'Item {item} reused on a different selector!')
             item._selector = self
 
-            if item.button is None:  # New, create the button widget.
-                if item is self.noneItem:
-                    item.button = ttk.Button(self.pal_frame, name='item_none')
-                    item.context_lbl = item.context_lbl
-                else:
-                    item.button = ttk.Button(
-                        self.pal_frame,
-                        name='item_' + item.name,
-                        compound='top',
-                    )
-                    localisation.set_text(item.button, item.shortName)
-
-                # noinspection PyProtectedMember
-                tk_tools.bind_leftclick(item.button, item._on_click)
-
             group_key = item.group_id
             grouped_items[group_key].append(item)
 
@@ -1069,11 +1068,10 @@ class SelectorWin(Generic[CallbackT]):
         if self.sampler is not None:
             self.sampler.stop()
 
-        for item in self.item_list:
-            if item.button is not None:
-                # Unpress everything.
-                item.button.state(('!alternate', '!pressed', '!active'))
-                img.apply(item.button, None)
+        # Release the buttons, so the icons can be unloaded.
+        for button in self._item_buttons:
+            self._release_button(button)
+            button.place_forget()
 
         if not self.first_open:  # We've got state to store.
             state = SelectorState(
@@ -1145,10 +1143,6 @@ class SelectorWin(Generic[CallbackT]):
             TK_ROOT.bell()
             return 'break'  # Tell tk to stop processing this event
 
-        for item in self.item_list:
-            if item.button is not None:
-                img.apply(item.button, item.icon)
-
         # Restore configured states.
         if self.first_open:
             self.first_open = False
@@ -1277,9 +1271,11 @@ class SelectorWin(Generic[CallbackT]):
         else:
             self.prop_desc.set_text(item.desc)
 
-        self.selected.button.state(('!alternate',))
+        if self.selected.button is not None:
+            self.selected.button.state(('!alternate',))
         self.selected = item
-        item.button.state(('alternate',))
+        if item.button is not None:
+            item.button.state(('alternate',))
         self.scroll_to(item)
 
         if self.sampler:
@@ -1469,11 +1465,27 @@ class SelectorWin(Generic[CallbackT]):
         else:  # Within this group
             self.sel_item(cur_group[item_ind])
 
+    def _on_configure(self, _: tk.Event) -> None:
+        """When the window is resized, reposition items once it stops changing."""
+        if self._flow_after is not None:
+            self.win.after_cancel(self._flow_after)
+        self._flow_after = self.win.after(RESIZE_DELAY, self.flow_items)
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        """When the canvas is scrolled, update the scrollbar and show newly visible items."""
+        self.wid_scroll.set(first, last)
+        if self._place_after is None:
+            self._place_after = self.win.after_idle(self._place_items)
+
     def flow_items(self, _: tk.Event = None) -> None:
         """Reposition all the items to fit in the current geometry.
 
-        Called on the <Configure> event.
+        Called after the window is resized. Positions are calculated from the
+        item counts, then only the items currently scrolled into view are shown.
         """
+        if self._flow_after is not None:
+            self.win.after_cancel(self._flow_after)
+            self._flow_after = None
         self.pal_frame.update_idletasks()
         self.pal_frame['width'] = self.wid_canvas.winfo_width()
         self.desc_label['wraplength'] = self.win.winfo_width() - 10
@@ -1485,11 +1497,7 @@ class SelectorWin(Generic[CallbackT]):
 
         # The offset for the current group
         y_off = 0
-
-        # Hide suggestion indicators if they end up unused.
-        for lbl in self._suggest_lbl:
-            lbl.place_forget()
-        suggest_ind = 0
+        self._group_y.clear()
 
         # If only the '' group is present, force it to be visible, and hide
         # the header.
@@ -1507,54 +1515,16 @@ class SelectorWin(Generic[CallbackT]):
                     y=y_off,
                     width=width * ITEM_WIDTH,
                 )
-                group_wid.update_idletasks()
                 y_off += group_wid.winfo_reqheight()
 
                 if not group_wid.visible:
-                    # Hide everything!
-                    for item in items:
-                        item.set_pos()
                     continue
 
-            # Place each item
-            for i, item in enumerate(items):
-                if item in self.suggested:
-                    # Reuse an existing suggested label.
-                    try:
-                        sugg_lbl = self._suggest_lbl[suggest_ind]
-                    except IndexError:
-                        # Not enough, make more.
-                        if utils.MAC:
-                            # Labelframe doesn't look good here on OSX
-                            sugg_lbl = ttk.Label(
-                                self.pal_frame,
-                                name=f'suggest_label_{suggest_ind}',
-                            )
-                            localisation.set_text(sugg_lbl, TRANS_SUGGESTED_MAC)
-                        else:
-                            sugg_lbl = ttk.LabelFrame(
-                                self.pal_frame,
-                                name=f'suggest_label_{suggest_ind}',
-                                labelanchor='n',
-                                height=50,
-                            )
-                            localisation.set_text(sugg_lbl, TRANS_SUGGESTED)
-                        self._suggest_lbl.append(sugg_lbl)
-                    suggest_ind += 1
-                    sugg_lbl.place(
-                        x=(i % width) * ITEM_WIDTH + 1,
-                        y=(i // width) * ITEM_HEIGHT + y_off,
-                    )
-                    sugg_lbl['width'] = item.button.winfo_width()
-                item.set_pos(
-                    x=(i % width) * ITEM_WIDTH + 1,
-                    y=(i // width) * ITEM_HEIGHT + y_off + 20,
-                )
-                item.button['text'] = item.shortName
-
+            self._group_y[group_key] = y_off
             # Increase the offset by the total height of this item section
             y_off += math.ceil(len(items) / width) * ITEM_HEIGHT + 5
 
+        self._flow_height = y_off
         # Set the size of the canvas and frame to the amount we've used
         self.wid_canvas['scrollregion'] = (
             0, 0,
@@ -1562,26 +1532,137 @@ class SelectorWin(Generic[CallbackT]):
             y_off,
         )
         self.pal_frame['height'] = y_off
+        self._place_items()
+
+    def _place_items(self) -> None:
+        """Show the items currently scrolled into view, reusing buttons from other items."""
+        self._place_after = None
+        width = self.item_width
+        # Also include a row on either side, so they're ready when scrolling.
+        top, bottom = self.wid_canvas.yview()
+        top = top * self._flow_height - ITEM_HEIGHT
+        bottom = bottom * self._flow_height + ITEM_HEIGHT
+
+        # Item -> index in the group, and position.
+        visible: dict[Item, tuple[int, int, int]] = {}
+        for group_key, y_off in self._group_y.items():
+            items = self.grouped_items[group_key]
+            for row in visible_rows(y_off, len(items), width, ITEM_HEIGHT, top, bottom):
+                for i in range(row * width, min(row * width + width, len(items))):
+                    visible[items[i]] = (
+                        i,
+                        (i % width) * ITEM_WIDTH + 1,
+                        (i // width) * ITEM_HEIGHT + y_off,
+                    )
+
+        # Keep buttons already showing a visible item, free up the rest.
+        free_buttons: list[ttk.Button] = []
+        for button in self._item_buttons:
+            item = self._button_items.get(button)
+            if item is None or item not in visible:
+                self._release_button(button)
+                free_buttons.append(button)
+        free_buttons.reverse()  # Reuse in the same order.
+
+        # Hide suggestion indicators if they end up unused.
+        for lbl in self._suggest_lbl:
+            lbl.place_forget()
+        suggest_ind = 0
+
+        for item, (i, x, y) in visible.items():
+            if item.button is None:
+                if free_buttons:
+                    button = free_buttons.pop()
+                else:
+                    button = ttk.Button(self.pal_frame, name=f'item_{len(self._item_buttons)}')
+                    tk_tools.bind_leftclick(button, functools.partial(self._button_clicked, button))
+                    self._item_buttons.append(button)
+                self._assign_button(button, item)
+            else:
+                button = item.button
+            if item in self.suggested:
+                # Reuse an existing suggested label.
+                try:
+                    sugg_lbl = self._suggest_lbl[suggest_ind]
+                except IndexError:
+                    # Not enough, make more.
+                    if utils.MAC:
+                        # Labelframe doesn't look good here on OSX
+                        sugg_lbl = ttk.Label(
+                            self.pal_frame,
+                            name=f'suggest_label_{suggest_ind}',
+                        )
+                        localisation.set_text(sugg_lbl, TRANS_SUGGESTED_MAC)
+                    else:
+                        sugg_lbl = ttk.LabelFrame(
+                            self.pal_frame,
+                            name=f'suggest_label_{suggest_ind}',
+                            labelanchor='n',
+                            height=50,
+                        )
+                        localisation.set_text(sugg_lbl, TRANS_SUGGESTED)
+                    self._suggest_lbl.append(sugg_lbl)
+                suggest_ind += 1
+                sugg_lbl.place(x=x, y=y)
+                sugg_lbl['width'] = button.winfo_width()
+            button.place(x=x, y=y + 20)
+            button.lift()  # Force a particular stacking order for widgets
+
+        for button in free_buttons:
+            button.place_forget()
+
+    def _assign_button(self, button: ttk.Button, item: Item) -> None:
+        """Set a button to display this item."""
+        self._button_items[button] = item
+        item.button = button
+        if item is self.noneItem:
+            button['compound'] = 'none'  # Only the icon.
+        else:
+            button['compound'] = 'top'
+        localisation.set_text(button, item.shortName)
+        img.apply(button, item.icon)
+        if item is self.selected:
+            button.state(('alternate', '!pressed', '!active'))
+        else:
+            button.state(('!alternate', '!pressed', '!active'))
+
+    def _release_button(self, button: ttk.Button) -> None:
+        """Stop a button from displaying its item."""
+        item = self._button_items.pop(button, None)
+        if item is not None:
+            item.button = None
+            img.apply(button, None)
+
+    def _button_clicked(self, button: ttk.Button, event: tk.Event) -> None:
+        """Handle clicking on a button, for whichever item it shows."""
+        item = self._button_items.get(button)
+        if item is not None:
+            # noinspection PyProtectedMember
+            item._on_click(event)
 
     def scroll_to(self, item: Item) -> None:
         """Scroll to an item so it's visible."""
-        canvas = self.wid_canvas
-
-        height = canvas.bbox('all')[3]  # Returns (x, y, width, height)
+        try:
+            y_off = self._group_y[item.group_id]
+        except KeyError:
+            return  # Not positioned yet, or the group is collapsed.
+        height = self._flow_height
+        if height <= 0:
+            return
 
-        bottom, top = canvas.yview()
+        bottom, top = self.wid_canvas.yview()
         # The sizes are returned in fractions, but we use the pixel values
         # for accuracy
         bottom *= height
         top *= height
 
-        y = item.button.winfo_y()
+        y = self.grouped_items[item.group_id].index(item) // self.item_width * ITEM_HEIGHT + y_off + 20
 
         if bottom <= y - 8 and y + ICON_SIZE + 8 <= top:
             return  # Already in view
 
         # Center in the view
-        canvas.yview_moveto(
+        self.wid_canvas.yview_moveto(
             (y - (top - bottom) // 2)
             / height
         )
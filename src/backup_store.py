@@ -0,0 +1,137 @@
+"""A content-addressed store for automatic puzzle backups.
+
+Each file is stored once as an LZMA-compressed blob named after the SHA256 of its
+contents. Each backup is then a small JSON manifest mapping filenames to blob hashes,
+so unchanged puzzles don't need to be compressed or stored again. Manifests use their
+own extension, so other files the user keeps in the backup folder are ignored.
+"""
+from __future__ import annotations
+from typing import IO, Dict, Iterable, List, Optional, Set
+from zipfile import ZipFile, ZIP_LZMA
+import hashlib
+import json
+import lzma
+import os
+import time
+
+import attrs
+import srctools.logger
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+MANIFEST_VERSION = 1
+MANIFEST_EXT = '.bee_backup'
+BLOB_FOLDER = 'blobs'
+
+
+@attrs.frozen
+class Snapshot:
+    """The files present in a single backup."""
+    files: Dict[str, str]  # Filename -> blob hash.
+    created: float = attrs.Factory(time.time)
+
+    @classmethod
+    def read(cls, path: str) -> Snapshot:
+        """Read a snapshot manifest."""
+        with open(path, encoding='utf8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f'Backup manifest must be an object, not {type(data).__name__}!')
+        if data.get('version') != MANIFEST_VERSION:
+            raise ValueError(f'Unknown backup manifest version {data.get("version")!r}!')
+        files = data['files']
+        if not isinstance(files, dict):
+            raise ValueError(f'Backup manifest files must be an object, not {type(files).__name__}!')
+        return cls(dict(files), data['created'])
+
+    def write(self, path: str) -> None:
+        """Write the snapshot manifest."""
+        with srctools.AtomicWriter(path) as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'created': self.created,
+                'files': self.files,
+            }, f, indent=1)
+
+
+def find_snapshots(folder: str) -> List[str]:
+    """Return the paths of all snapshot manifests in the folder."""
+    try:
+        return [
+            os.path.join(folder, name)
+            for name in os.listdir(folder)
+            if name.casefold().endswith(MANIFEST_EXT)
+        ]
+    except FileNotFoundError:
+        return []
+
+
+class BackupStore:
+    """Stores blobs in the blobs/ subfolder of the backup folder."""
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.blob_folder = os.path.join(folder, BLOB_FOLDER)
+
+    def blob_path(self, blob_hash: str) -> str:
+        """Return the location of a blob."""
+        return os.path.join(self.blob_folder, blob_hash[:2], blob_hash + '.xz')
+
+    def add_file(self, path: str) -> str:
+        """Add a file to the store, and return its hash.
+
+        If it is already present, it isn't compressed again. This is called from worker threads.
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        blob_hash = hashlib.sha256(data).hexdigest()
+        blob_path = self.blob_path(blob_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # Write to a temporary file first, so an interrupted backup doesn't leave a partial blob.
+            temp_path = f'{blob_path}.{os.getpid()}.{id(data)}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(lzma.compress(data))
+            os.replace(temp_path, blob_path)
+        return blob_hash
+
+    def read_blob(self, blob_hash: str) -> bytes:
+        """Read and decompress the given blob."""
+        with open(self.blob_path(blob_hash), 'rb') as f:
+            data = lzma.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != blob_hash:
+            raise ValueError(f'Backup blob {blob_hash} is corrupt!')
+        return data
+
+    def restore(self, snapshot: Snapshot, dest: str) -> None:
+        """Write all the files in a snapshot to the destination folder."""
+        os.makedirs(dest, exist_ok=True)
+        for filename, blob_hash in snapshot.files.items():
+            with open(os.path.join(dest, filename), 'wb') as f:
+                f.write(self.read_blob(blob_hash))
+
+    def write_zip(self, snapshot: Snapshot, file: IO[bytes]) -> None:
+        """Write a snapshot as a backup zip, the same as manual backups."""
+        with ZipFile(file, mode='w', compression=ZIP_LZMA) as zip_file:
+            for filename, blob_hash in snapshot.files.items():
+                zip_file.writestr(filename, self.read_blob(blob_hash))
+
+    def collect_garbage(self, manifests: Iterable[str]) -> Optional[int]:
+        """Remove blobs not used by any of these manifests, returning the number removed.
+
+        If any manifest can't be read, nothing is removed and None is returned.
+        """
+        used: Set[str] = set()
+        for path in manifests:
+            try:
+                used.update(Snapshot.read(path).files.values())
+            except (OSError, ValueError, KeyError, TypeError):
+                LOGGER.warning('Could not read backup manifest "{}", keeping all blobs:', path, exc_info=True)
+                return None
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.blob_folder):
+            for filename in filenames:
+                blob_hash, ext = os.path.splitext(filename)
+                if ext == '.xz' and blob_hash not in used:
+                    os.remove(os.path.join(dirpath, filename))
+                    removed += 1
+        return removed
@@ -0,0 +1,4 @@
+"""Benchmarks for the compiler and app.
+
+Run these from the src/ folder, for example `python -m bench.clump`.
+"""
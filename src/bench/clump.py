@@ -0,0 +1,128 @@
+"""Benchmark the clump texture generator on a synthetic map.
+
+This also checks the results against the original linear search implementation.
+"""
+from __future__ import annotations
+from typing import List, Optional, Set, Tuple
+from random import Random
+import itertools
+import time
+
+import attrs
+from srctools import Vec, VMF
+
+from precomp import rand
+from precomp.texturing import GenCat, GenClump, Clump, Orient, Portalable, TileSize
+
+
+SIZE = 50
+
+
+@attrs.define
+class FakeTile:
+    """The parts of TileDef used by the generator."""
+    pos: Vec
+    normal: Vec
+
+
+def make_tiles(size: int) -> List[FakeTile]:
+    """Generate the surfaces of a hollow cube of voxels, with random pillars inside."""
+    rng = Random(1234)
+    solid: Set[Tuple[int, int, int]] = set()
+    for x, y, z in itertools.product(range(size), repeat=3):
+        if min(x, y, z) == 0 or max(x, y, z) == size - 1:
+            solid.add((x, y, z))
+    for _ in range(size * 4):
+        x, y = rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+        for z in range(1, rng.randrange(2, size - 1)):
+            solid.add((x, y, z))
+    tiles = []
+    for x, y, z in solid:
+        for normal in [
+            Vec(1, 0, 0), Vec(-1, 0, 0),
+            Vec(0, 1, 0), Vec(0, -1, 0),
+            Vec(0, 0, 1), Vec(0, 0, -1),
+        ]:
+            if (x + int(normal.x), y + int(normal.y), z + int(normal.z)) not in solid:
+                if 0 <= x + normal.x < size and 0 <= y + normal.y < size and 0 <= z + normal.z < size:
+                    tiles.append(FakeTile(Vec(x, y, z) * 128 + 64, normal))
+    return tiles
+
+
+def reference_clumps(gen: GenClump, tiles: List[FakeTile]) -> List[Clump]:
+    """The original clump placement, picking tiles by iterating a set."""
+    clump_length: int = gen.options['clump_length']
+    clump_width: int = gen.options['clump_width']
+    assert gen.orient is not None
+    remaining_tiles: Set[Tuple[float, float, float]] = {
+        (tile.pos + 64 * tile.normal // 128 * 128).as_tuple() for tile in tiles
+        if tile.normal.z == gen.orient.z
+    }
+    clump_rand = rand.seed(b'clump_pos')
+    pos_min = Vec()
+    pos_max = Vec()
+    clumps = []
+    while remaining_tiles:
+        tile_pos = next(itertools.islice(
+            remaining_tiles,
+            clump_rand.randrange(0, len(remaining_tiles)),
+            len(remaining_tiles),
+        ))
+        remaining_tiles.remove(tile_pos)
+        pos = Vec(tile_pos)
+        direction = clump_rand.choice('xyz')
+        for axis in 'xyz':
+            dist = clump_length if axis == direction else clump_width
+            pos_min[axis] = pos[axis] - clump_rand.randint(0, dist) * 128
+            pos_max[axis] = pos[axis] + clump_rand.randint(0, dist) * 128
+        remaining_tiles.difference_update(map(Vec.as_tuple, Vec.iter_grid(pos_min, pos_max, 128)))
+        clumps.append(Clump(
+            pos_min.x, pos_min.y, pos_min.z,
+            pos_max.x, pos_max.y, pos_max.z,
+            clump_rand.getrandbits(64).to_bytes(8, 'little'),
+        ))
+    return clumps
+
+
+def reference_find(clumps: List[Clump], loc: Vec) -> Optional[bytes]:
+    """The original linear clump search."""
+    for clump in clumps:
+        if (
+            clump.x1 <= loc.x <= clump.x2 and
+            clump.y1 <= loc.y <= clump.y2 and
+            clump.z1 <= loc.z <= clump.z2
+        ):
+            return clump.seed
+    return None
+
+
+def main() -> None:
+    """Run the benchmark."""
+    tiles = make_tiles(SIZE)
+    print(f'{len(tiles)} tiles in a {SIZE}x{SIZE}x{SIZE} map.')
+    locs = [tile.pos + 63 * tile.normal for tile in tiles]
+    options = {'clump_length': 4, 'clump_width': 2, 'clump_debug': False}
+    textures = {TileSize.TILE_4x4: ['tile/a', 'tile/b', 'tile/c', 'tile/d']}
+    for orient in Orient:
+        gen = GenClump(GenCat.NORMAL, orient, Portalable.WHITE, options, textures)
+
+        start = time.perf_counter()
+        ref_clumps = reference_clumps(gen, tiles)
+        ref_seeds = [reference_find(ref_clumps, loc) for loc in locs]
+        ref_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        gen.setup(VMF(), tiles)  # type: ignore
+        seeds = [gen._find_clump(loc) for loc in locs]
+        new_time = time.perf_counter() - start
+
+        assert gen._clump_locs == ref_clumps, 'Clumps differ!'
+        assert seeds == ref_seeds, 'Clump lookup differs!'
+        print(
+            f'{orient.name:>7}: {len(ref_clumps):>5} clumps, '
+            f'original = {ref_time:.3f}s, indexed = {new_time:.3f}s'
+        )
+
+
+if __name__ == '__main__':
+    main()
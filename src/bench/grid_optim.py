@@ -0,0 +1,129 @@
+"""Benchmark grid_optim.optimise() on tile planes like those generate_brushes() produces.
+
+This also checks the results against the original cell-by-cell implementation.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+from collections import defaultdict
+from random import Random
+import time
+
+from srctools import Vec
+
+from bench.clump import SIZE, make_tiles
+from plane import Plane
+from precomp.grid_optim import optimise
+
+
+VOID: Any = object()
+Rect = Tuple[int, int, int, int, Any]
+
+
+def reference_optimise(grid: Plane[Any]) -> List[Rect]:
+    """The original implementation, scanning the plane for each cell."""
+    full_grid: Plane[Any] = Plane(grid, default=VOID)
+    x_min, y_min = full_grid.mins
+    x_max, y_max = full_grid.maxes
+    x_max += 1
+    y_max += 1
+
+    result = []
+    for x in range(x_min, x_max):
+        for y in range(y_min, y_max):
+            value = full_grid[x, y]
+            if value is VOID:
+                continue
+            result.append(reference_cell(full_grid, value, x, y, x_max, y_max))
+    return result
+
+
+def reference_cell(
+    grid: Plane[Any], value: Any,
+    min_x: int, min_y: int, max_x: int, max_y: int,
+) -> Rect:
+    """From a cell (min x/y) find a good rectangle."""
+    x1 = x2 = min_x
+    y1 = y2 = min_y
+    for x1 in range(min_x, max_x + 1):
+        if grid[x1, min_y] is not value:
+            break
+    for y1 in range(min_y, max_y + 1):
+        if any(grid[x, y1] is not value for x in range(min_x, x1)):
+            break
+    for y2 in range(min_y, max_y + 1):
+        if grid[min_x, y2] is not value:
+            break
+    for x2 in range(min_x, max_x + 1):
+        if any(grid[x2, y] is not value for y in range(min_y, y2)):
+            break
+    if (x1 - min_x) * (y1 - min_y) > (x2 - min_x) * (y2 - min_y):
+        max_x, max_y = x1, y1
+    else:
+        max_x, max_y = x2, y2
+    for x in range(min_x, max_x):
+        for y in range(min_y, max_y):
+            del grid[x, y]
+    return min_x, min_y, max_x - 1, max_y - 1, value
+
+
+def make_planes(texture_count: int) -> List[Plane[bool]]:
+    """Group tiles into planes the same way as generate_brushes().
+
+    Each tile is assigned a random texture out of the given count, then each
+    texture on each surface gets a plane.
+    """
+    rng = Random(5678)
+    surfaces: Dict[Tuple[float, float, float, float], List[Vec]] = defaultdict(list)
+    for tile in make_tiles(SIZE):
+        pos = tile.pos + 64 * tile.normal
+        surfaces[(*tile.normal, abs(pos.dot(tile.normal)))].append(pos)
+
+    planes = []
+    for (norm_x, norm_y, norm_z, _), positions in surfaces.items():
+        u_axis, v_axis = Vec.INV_AXIS[Vec(norm_x, norm_y, norm_z).axis()]
+        bbox_min, bbox_max = Vec.bbox(positions)
+        grid_pos: Dict[int, Plane[bool]] = defaultdict(Plane)
+        for pos in positions:
+            u_pos = int((pos[u_axis] - bbox_min[u_axis]) // 128)
+            v_pos = int((pos[v_axis] - bbox_min[v_axis]) // 128)
+            grid_pos[rng.randrange(texture_count)][u_pos, v_pos] = True
+        planes.extend(grid_pos.values())
+    return planes
+
+
+def main() -> None:
+    """Run the benchmark."""
+    for texture_count in [1, 2, 4]:
+        planes = make_planes(texture_count)
+        cells = sum(map(len, planes))
+
+        start = time.perf_counter()
+        ref_rects = [reference_optimise(plane) for plane in planes]
+        ref_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rects = [list(optimise(plane)) for plane in planes]
+        new_time = time.perf_counter() - start
+
+        assert rects == ref_rects, 'Rectangles differ!'
+        print(
+            f'{texture_count} textures: {len(planes):>4} planes, {cells:>6} cells, '
+            f'{sum(map(len, rects)):>6} rects, '
+            f'original = {ref_time:.3f}s, run-length = {new_time:.3f}s'
+        )
+
+    # Also check random grids with several values, since the tiles only use True.
+    rng = Random(1234)
+    for _ in range(200):
+        plane: Plane[Any] = Plane()
+        values = [object() for _ in range(rng.randint(1, 4))]
+        for x in range(rng.randint(1, 20)):
+            for y in range(rng.randint(1, 20)):
+                if rng.random() < 0.8:
+                    plane[x - 5, y - 3] = rng.choice(values)
+        assert list(optimise(plane)) == reference_optimise(plane), 'Random grid differs!'
+    print('Random grids match.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark generating smoothed noise for cutout tiles, compared to calling noise3() per sample."""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from random import Random
+import timeit
+
+from perlin import SimplexNoise, smooth_noise_grid
+
+
+# A full 28x28 block floor, with 4x4 tiles per block.
+SIZE = 28 * 4
+
+
+def scalar_noise(noise: SimplexNoise, xs: List[float], ys: List[float], z: float) -> Dict[Tuple[float, float], float]:
+    """The original method, averaging 9 noise3() calls for each location."""
+    return {
+        (x, y): sum(
+            (noise.noise3(x + off_x, y + off_y, z) + 1) / 2
+            for off_x in (-1, 0, 1)
+            for off_y in (-1, 0, 1)
+        ) / 9
+        for x in xs
+        for y in ys
+    }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    noise = SimplexNoise(permutation_table=Random(1234).sample(range(160), 160))
+    cases = [
+        ('Floor (112x112)', [float(x) for x in range(SIZE)], [float(y) for y in range(SIZE)], 2.0, 1),
+        # Blocks are generated separately.
+        ('Block (4x4)', [8.0, 9.0, 10.0, 11.0], [20.0, 21.0, 22.0, 23.0], 2.0, 500),
+        # The default displacement size.
+        ('Displacement (9x9)', [float(x) for x in range(9)], [float(y) for y in range(9)], -3.0, 100),
+    ]
+    for name, xs, ys, z, number in cases:
+        assert scalar_noise(noise, xs, ys, z) == smooth_noise_grid(noise, xs, ys, z), 'Results differ!'
+        scalar_time = timeit.timeit(lambda: scalar_noise(noise, xs, ys, z), number=number) / number
+        grid_time = timeit.timeit(lambda: smooth_noise_grid(noise, xs, ys, z), number=number) / number
+        print(
+            f'{name:<20} scalar: {scalar_time * 1000:8.3f}ms, '
+            f'grid: {grid_time * 1000:8.3f}ms, {scalar_time / grid_time:5.1f}x faster'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Microbenchmark the throughput of precomp.rand.seed()."""
+from __future__ import annotations
+from random import Random
+import timeit
+
+from srctools import Vec, Entity, VMF
+
+from precomp import rand
+
+
+COUNT = 50_000
+
+
+def main() -> None:
+    """Run the benchmark."""
+    rand.MAP_HASH.update(b'bench_map')
+    locs = [Vec(x * 128 + 64, y * 128 + 64, 256) for x in range(50) for y in range(20)]
+    inst = Entity(VMF(), {'targetname': 'bench_inst', 'origin': '64 128 256'})
+
+    cases = [
+        ('seed(name, Vec)', lambda: [rand.seed(b'tex_rand', loc) for loc in locs]),
+        ('seed(name, Entity, str)', lambda: [rand.seed(b'rand_res', inst, 'seed') for _ in locs]),
+        ('seeder(name)(Vec, Vec)', lambda: [
+            seeder(loc, loc) for seeder in [rand.seeder(b'antline')] for loc in locs
+        ]),
+        ('seed(name, Vec).choice()', lambda: [
+            rand.seed(b'tex_rand', loc).choice('abcd') for loc in locs
+        ]),
+    ]
+    for fast in [False, True]:
+        rand.FAST_MODE = fast
+        print('Fast mode:' if fast else 'Compatible mode:')
+        for name, func in cases:
+            number = COUNT // len(locs)
+            duration = timeit.timeit(func, number=number)
+            print(f'  {name:<28} {COUNT / duration:>12,.0f} calls/s')
+    rand.FAST_MODE = False
+
+    # Check compatible mode still matches the original implementation.
+    for loc in locs:
+        algo = rand.MAP_HASH.copy()
+        algo.update(b'tex_rand')
+        algo.update(rand.THREE_FLOATS.pack(*loc))
+        expected = Random(int.from_bytes(algo.digest(), 'little')).random()
+        assert rand.seed(b'tex_rand', loc).random() == expected
+
+
+if __name__ == '__main__':
+    main()
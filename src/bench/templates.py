@@ -0,0 +1,95 @@
+"""Benchmark loading templates from the bundle, compared to parsing the VMF text.
+
+Templates are generated synthetically and stored in a zip, like a package.
+"""
+from __future__ import annotations
+from typing import List, Tuple
+from pathlib import Path
+from random import Random
+import io
+import tempfile
+import time
+import zipfile
+
+from srctools import VMF, Property, Vec
+
+import template_bundle
+
+
+TEMPLATE_COUNT = 200
+
+
+def make_template(rng: Random, index: int) -> str:
+    """Generate a template VMF with some brushes and overlays."""
+    vmf = VMF()
+    vmf.create_ent(
+        'bee2_template_conf',
+        template_id=f'BENCH_TEMP_{index}',
+        visgroup_force_tiles='0',
+    )
+    for _ in range(rng.randint(5, 40)):
+        pos = Vec(rng.randrange(-8, 8), rng.randrange(-8, 8), rng.randrange(-8, 8)) * 16
+        size = Vec(rng.randint(1, 8), rng.randint(1, 8), rng.randint(1, 8)) * 8
+        brush = vmf.make_prism(pos, pos + size).solid
+        if rng.random() < 0.5:
+            vmf.add_brush(brush)
+        else:
+            vmf.create_ent('func_detail').solids.append(brush)
+    buf = io.StringIO()
+    vmf.export(buf)
+    return buf.getvalue()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    rng = Random(4321)
+    with tempfile.TemporaryDirectory() as tempdir:
+        pak_path = str(Path(tempdir, 'bench.bee_pack'))
+        with zipfile.ZipFile(pak_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for i in range(TEMPLATE_COUNT):
+                zipf.writestr(f'templates/temp_{i}.vmf', make_template(rng, i))
+        mtime = template_bundle.source_mtime(pak_path, '')
+
+        start = time.perf_counter()
+        parsed: List[Property] = []
+        with zipfile.ZipFile(pak_path) as zipf:
+            for i in range(TEMPLATE_COUNT):
+                path = f'templates/temp_{i}.vmf'
+                parsed.append(Property.parse(zipf.read(path).decode('utf8'), path))
+        parse_time = time.perf_counter() - start
+
+        entries: List[Tuple[str, str, str, float, bytes]] = [
+            (f'BENCH_TEMP_{i}', pak_path, f'templates/temp_{i}.vmf', mtime, template_bundle.encode(props))
+            for i, props in enumerate(parsed)
+        ]
+
+        bundle_path = Path(tempdir, 'templates.bin')
+        with bundle_path.open('wb') as f:
+            template_bundle.write(f, entries)
+
+        start = time.perf_counter()
+        bundle = template_bundle.TemplateBundle.open(str(bundle_path))
+        assert bundle is not None
+        with bundle:
+            decoded = [
+                bundle.get(f'BENCH_TEMP_{i}', pak_path, f'templates/temp_{i}.vmf')
+                for i in range(TEMPLATE_COUNT)
+            ]
+        bundle_time = time.perf_counter() - start
+
+        assert decoded == parsed, 'Templates differ!'
+        # Constructing the VMF is the same either way, time it for comparison.
+        start = time.perf_counter()
+        for props in parsed:
+            VMF.parse(props, preserve_ids=True)
+        vmf_time = time.perf_counter() - start
+
+        print(
+            f'{TEMPLATE_COUNT} templates, {bundle_path.stat().st_size // 1024}KB bundle: '
+            f'parse = {parse_time:.3f}s, bundle = {bundle_time:.3f}s, '
+            f'VMF.parse() = {vmf_time:.3f}s'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,588 @@
+"""Benchmark the whole VBSP precompiler, using synthetic PeTI-style maps.
+
+A minimal export (editor.bin, vbsp_config, corridors and templates) and game folder
+are generated in a temporary folder, so no game install or packages are needed.
+Maps of each size are then generated and compiled, each in a fresh process since
+the compiler keeps global state. The compiler's profile report gives the time taken
+by each phase, and the peak memory usage. The original VBSP is skipped, so
+saving the map is not included.
+
+Run with `python -m bench.vbsp_pipeline [size ...] [--json results.json]`.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+from pathlib import Path
+from random import Random
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+import attrs
+from srctools import VMF, Output, Vec
+from srctools.dmx import Attribute as DMXAttr, Element as DMXElement, ValueType as DMXValue
+from srctools.vmf import make_overlay
+
+from corridor import Corridor, Direction, ExportedConf, GameMode, Orient
+import config_snapshot
+import consts
+import editoritems
+
+
+@attrs.frozen
+class MapSize:
+    """The amount of each feature to place in a map."""
+    # Size of the chamber in voxels.
+    width: int
+    length: int
+    height: int
+    cubes: int
+    # Floor buttons, each connected to a fizzler by an antline.
+    buttons: int
+    fizzlers: int
+    # Glass panels, placed in a wall across the chamber.
+    glass: int
+
+
+SIZES: Dict[str, MapSize] = {
+    'small': MapSize(width=6, length=6, height=3, cubes=2, buttons=2, fizzlers=1, glass=4),
+    'medium': MapSize(width=12, length=12, height=6, cubes=8, buttons=8, fizzlers=3, glass=24),
+    'large': MapSize(width=24, length=24, height=12, cubes=24, buttons=24, fizzlers=8, glass=96),
+}
+CORR_ENTRY = 'instances/bee2_corridor/sp/entry/corr_1.vmf'
+CORR_EXIT = 'instances/bee2_corridor/sp/exit/corr_1.vmf'
+
+GAMEINFO = '''\
+"GameInfo"
+{
+    "game" "Portal 2"
+    "FileSystem"
+    {
+        "SteamAppId" "620"
+        "SearchPaths"
+        {
+            "Game" "|gameinfo_path|."
+        }
+    }
+}
+'''
+
+EDITORITEMS = '''
+"Item"
+{
+    "Type" "ITEM_ENTRY_DOOR"
+    "ItemClass" "ItemEntranceDoor"
+    "Editor" { "SubType" { "Name" "Entry" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/entry_corr.vmf" }
+        "TargetName" "entry"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_EXIT_DOOR"
+    "ItemClass" "ItemExitDoor"
+    "Editor" { "SubType" { "Name" "Exit" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/exit_corr.vmf" }
+        "TargetName" "exit"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_COOP_ENTRY_DOOR"
+    "ItemClass" "ItemCoopEntranceDoor"
+    "Editor" { "SubType" { "Name" "Coop Entry" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/coop_entry_corr.vmf" }
+        "TargetName" "entry"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_COOP_EXIT_DOOR"
+    "ItemClass" "ItemCoopExitDoor"
+    "Editor" { "SubType" { "Name" "Coop Exit" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/coop_exit_corr.vmf" }
+        "TargetName" "exit"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_CUBE"
+    "ItemClass" "ItemCube"
+    "Editor" { "SubType" { "Name" "Cube" } }
+    "Exporting"
+    {
+        "Instances"
+        {
+            "0" "instances/bench/cube_standard.vmf"
+            "1" "instances/bench/cube_companion.vmf"
+        }
+        "TargetName" "cube"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_BUTTON_FLOOR"
+    "ItemClass" "ItemButtonFloor"
+    "Editor" { "SubType" { "Name" "Button" } }
+    "Exporting"
+    {
+        "Instances"
+        {
+            "0" "instances/bench/button_weighted_white.vmf"
+            "1" "instances/bench/button_weighted_black.vmf"
+            "2" "instances/bench/button_cube_white.vmf"
+            "3" "instances/bench/button_cube_black.vmf"
+            "4" "instances/bench/button_ball_white.vmf"
+            "5" "instances/bench/button_ball_black.vmf"
+        }
+        "TargetName" "button"
+        "Offset" "64 64 64"
+        "Outputs"
+        {
+            "CONNECTION_STANDARD"
+            {
+                "Activate" "instance:button;OnPressed"
+                "Deactivate" "instance:button;OnUnPressed"
+            }
+        }
+    }
+}
+"Item"
+{
+    "Type" "ITEM_BARRIER_HAZARD"
+    "ItemClass" "ItemBarrierHazard"
+    "Editor" { "SubType" { "Name" "Fizzler" } }
+    "Exporting"
+    {
+        "Instances"
+        {
+            "0" "instances/bench/fizzler_base.vmf"
+            "1" "instances/bench/fizzler_model.vmf"
+        }
+        "TargetName" "fizzler"
+        "Offset" "64 64 64"
+        "Inputs"
+        {
+            "CONNECTION_STANDARD"
+            {
+                "Activate" "instance:fizzler;Disable"
+                "Deactivate" "instance:fizzler;Enable"
+            }
+        }
+    }
+}
+"Item"
+{
+    "Type" "ITEM_POINT_LIGHT"
+    "Editor" { "SubType" { "Name" "Light" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/point_light.vmf" }
+        "TargetName" "light"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_INDICATOR_TOGGLE"
+    "Editor" { "SubType" { "Name" "Toggle" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/indicator_toggle.vmf" }
+        "TargetName" "toggle"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_INDICATOR_PANEL"
+    "Editor" { "SubType" { "Name" "Checkmark" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/indicator_check.vmf" }
+        "TargetName" "panel"
+        "Offset" "64 64 64"
+    }
+}
+"Item"
+{
+    "Type" "ITEM_INDICATOR_PANEL_TIMER"
+    "Editor" { "SubType" { "Name" "Timer" } }
+    "Exporting"
+    {
+        "Instances" { "0" "instances/bench/indicator_timer.vmf" }
+        "TargetName" "panel"
+        "Offset" "64 64 64"
+    }
+}
+'''
+
+VBSP_CONFIG = '''
+"Options" {}
+"Fizzlers"
+{
+    "Fizzler"
+    {
+        "id" "BENCH_FIZZLER"
+        "item_id" "ITEM_BARRIER_HAZARD"
+        "model" "instances/bench/fizzler_emitter.vmf"
+        "Brush"
+        {
+            "name" "fizz"
+            "keys"
+            {
+                "classname" "trigger_portal_cleanser"
+                "spawnflags" "9"
+            }
+            "tex_center" "effects/fizzler_center"
+            "tex_short" "effects/fizzler"
+            "tex_left" "effects/fizzler_l"
+            "tex_right" "effects/fizzler_r"
+            "tex_nodraw" "tools/toolsnodraw"
+            "thickness" "2"
+        }
+    }
+}
+'''
+
+
+def make_tiling_template() -> VMF:
+    """Generate the template used to produce each tile.
+
+    There's a brush for each thickness, with the surface facing +X.
+    """
+    vmf = VMF()
+    vmf.create_ent('bee2_template_conf', template_id='__TILING_TEMPLATE__')
+    for bevel in ['bevel', 'flat']:
+        for name, thickness in [('thin', 2), ('norm', 4), ('thick', 8)]:
+            visgroup = vmf.create_visgroup(f'{bevel}_{name}')
+            prism = vmf.make_prism(
+                Vec(-thickness / 2, -16, -16),
+                Vec(thickness / 2, 16, 16),
+                consts.Special.SQUAREBEAMS,
+            )
+            prism.east.mat = consts.WhitePan.WHITE_1x1
+            prism.west.mat = consts.Special.BACKPANELS
+            # Visgroups on world brushes aren't saved, so use func_detail instead.
+            detail = vmf.create_ent('func_detail')
+            detail.visgroup_ids.add(visgroup.id)
+            detail.solids.append(prism.solid)
+    return vmf
+
+
+def make_scaling_template(temp_id: str, material: str) -> VMF:
+    """Generate a template used to align the textures of glass or grating."""
+    vmf = VMF()
+    vmf.create_ent('bee2_template_conf', template_id=temp_id)
+    vmf.add_brush(vmf.make_prism(Vec(-64, -64, -64), Vec(64, 64, 64), material).solid)
+    return vmf
+
+
+def write_export(bin_folder: Path, package: Path) -> None:
+    """Write the files normally produced by exporting from the app.
+
+    The package folder contains the templates.
+    """
+    bee2 = bin_folder / 'bee2'
+    bee2.mkdir(parents=True)
+
+    items, _ = editoritems.Item.parse(EDITORITEMS)
+    with open(bee2 / 'editor.bin', 'wb') as f:
+        editoritems.ItemDatabase.write(f, items)
+
+    conf: ExportedConf = {}
+    for mode in GameMode:
+        for direction in Direction:
+            for orient in Orient:
+                conf[mode, direction, orient] = [Corridor(
+                    instance=f'instances/bench/{mode.value}_{direction.value}_{orient.value}.vmf',
+                    fixups={},
+                    orig_index=1,
+                    legacy=False,
+                )]
+    with open(bee2 / 'corridors.bin', 'wb') as f:
+        pickle.dump(conf, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with open(bee2 / 'vbsp_config.cfg', 'w') as f:
+        f.write(VBSP_CONFIG)
+    config_snapshot.write(str(bee2 / 'vbsp_config.cfg'), str(bee2 / 'vbsp_config.bin'))
+
+    with open(bee2 / 'pack_list.cfg', 'w') as f:
+        f.write('')
+
+    templates = {
+        '__TILING_TEMPLATE__': make_tiling_template(),
+        'BEE2_GLASS_TEMPLATE': make_scaling_template('BEE2_GLASS_TEMPLATE', consts.Special.GLASS),
+        'BEE2_GRATING_TEMPLATE': make_scaling_template('BEE2_GRATING_TEMPLATE', consts.Special.GRATING),
+    }
+    (package / 'templates').mkdir(parents=True)
+    root = DMXElement('Templates', 'DMERoot')
+    root['temp'] = DMXAttr.array('list', DMXValue.ELEMENT)
+    for temp_id, temp_vmf in templates.items():
+        path = f'templates/{temp_id.lower()}.vmf'
+        with open(package / path, 'w') as f:
+            temp_vmf.export(f)
+        template = DMXElement(temp_id, 'DMETemplate')
+        template['package'] = str(package)
+        template['path'] = path
+        root['temp'].append(template)
+    with open(bee2 / 'templates.lst', 'wb') as f:
+        root.export_binary(f, fmt_name='bee_templates', unicode='format')
+
+
+def add_antline(vmf: VMF, name: str, start: Vec, length: int) -> None:
+    """Add a straight floor antline, running along the Y axis from the start.
+
+    Like the editor, it's made of several overlays, each 2 tiles long.
+    """
+    for i in range(0, length, 2):
+        over = make_overlay(
+            vmf,
+            Vec(0, 0, 1),
+            start + (0, 16 * i + 16, 0),
+            Vec(16, 0, 0),
+            Vec(0, 32, 0),
+            consts.Antlines.STRAIGHT,
+            [],
+        )
+        over['targetname'] = name
+        over['angles'] = '0 0 0'
+
+
+def make_map(size: MapSize, seed: int = 1) -> VMF:
+    """Generate a PeTI-style map of the given size."""
+    rng = Random(seed)
+    vmf = VMF()
+    # Offset so the chamber is surrounded by solid voxels, like the editor.
+    air = {
+        (x, y, z)
+        for x in range(1, size.width + 1)
+        for y in range(1, size.length + 1)
+        for z in range(1, size.height + 1)
+    }
+    # Each solid voxel bordering the chamber becomes a cube.
+    solid = {
+        (x + dx, y + dy, z + dz)
+        for x, y, z in air
+        for dx, dy, dz in [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+    } - air
+    for pos in sorted(solid):
+        mat = consts.WhitePan.WHITE_1x1 if rng.random() < 0.5 else consts.BlackPan.BLACK_1x1
+        origin = Vec(pos) * 128
+        vmf.add_brush(vmf.make_prism(origin, origin + 128, mat).solid)
+
+    # Corridors are placed on the side walls.
+    for filename, (x, y) in [
+        (CORR_ENTRY, (0, 1)),
+        (CORR_EXIT, (size.width + 1, size.length)),
+    ]:
+        inst = vmf.create_ent(
+            'func_instance',
+            targetname=filename.split('/')[3],
+            file=filename,
+            origin=Vec(x, y, 1) * 128 + (64, 64, 0),
+            angles='0 0 0',
+        )
+        inst.fixup['no_player_start'] = '0'
+
+    # A wall of glass across the middle, with each panel on the boundary between voxels.
+    glass_y = size.length // 2 * 128 + 128
+    for i in range(min(size.glass, size.width * size.height)):
+        x, z = divmod(i, size.height)
+        origin = Vec(x + 1, 0, z + 1) * 128
+        prism = vmf.make_prism(
+            origin + (0, glass_y - 2, 0),
+            origin + (128, glass_y + 2, 128),
+            consts.Tools.NODRAW,
+        )
+        prism.north.mat = prism.south.mat = consts.Special.GLASS
+        vmf.create_ent('func_detail').solids.append(prism.solid)
+
+    # Fizzlers span the chamber along the X axis, in rows on the opposite side of the glass.
+    fizz_names = []
+    for i in range(size.fizzlers):
+        y = 1 + i % (size.length // 2)
+        z = 1 + i // (size.length // 2) % size.height
+        name = f'fizzler_{i}'
+        fizz_names.append(name)
+        base = vmf.create_ent(
+            'func_instance',
+            targetname=name,
+            file='instances/bench/fizzler_base.vmf',
+            origin=Vec(1, y, z) * 128 + 64,
+            angles='0 90 90',
+        )
+        base.fixup['$start_enabled'] = '1'
+        base.fixup['$connectioncount'] = '0'
+        for j, x in enumerate([1, size.width]):
+            model = vmf.create_ent(
+                'func_instance',
+                targetname=f'{name}_modelStart' if j == 0 else f'{name}_modelEnd',
+                file='instances/bench/fizzler_model.vmf',
+                origin=Vec(x, y, z) * 128 + 64,
+                angles='0 90 90',
+            )
+            model.fixup['$skin'] = '0'
+
+    # Items go on the floor beyond the glass wall.
+    floor = sorted(pos for pos in air if pos[2] == 1 and pos[1] > size.length // 2 + 1)
+    rng.shuffle(floor)
+
+    for i in range(size.cubes):
+        x, y, z = floor.pop()
+        vmf.create_ent(
+            'func_instance',
+            targetname=f'cube_{i}',
+            file=f'instances/bench/cube_{rng.choice(["standard", "companion"])}.vmf',
+            origin=Vec(x, y, z) * 128 + (64, 64, 0),
+            angles='0 0 0',
+        )
+
+    for i in range(size.buttons):
+        x, y, z = floor.pop()
+        name = f'button_{i}'
+        origin = Vec(x, y, z) * 128 + (64, 64, 0)
+        button = vmf.create_ent(
+            'func_instance',
+            targetname=name,
+            file=f'instances/bench/button_{rng.choice(["weighted", "cube", "ball"])}_white.vmf',
+            origin=origin,
+            angles='0 0 0',
+        )
+        button.fixup['$connectioncount'] = '0'
+        toggle = vmf.create_ent(
+            'func_instance',
+            targetname=f'{name}_toggle',
+            file='instances/bench/indicator_toggle.vmf',
+            origin=origin,
+            angles='0 0 0',
+        )
+        toggle.fixup['indicator_name'] = f'{name}_overlay'
+        button.add_out(Output('OnPressed', toggle['targetname'], 'Activate', inst_out='button'))
+        add_antline(vmf, f'{name}_overlay', origin + (40, -64, 0.5), 8)
+        if fizz_names:
+            fizz_name = fizz_names[i % len(fizz_names)]
+            button.add_out(Output('OnPressed', fizz_name, 'Disable', inst_out='button', inst_in='fizzler'))
+    return vmf
+
+
+def compile_map(bin_folder: Path, map_path: Path) -> None:
+    """Run the compiler on a map. This is run in a subprocess."""
+    os.chdir(bin_folder)
+    sys.argv = [
+        'vbsp', '-entity_limit', '1750', '-skip_vbsp',
+        '-game', str(bin_folder.parent / 'portal2'),
+        str(map_path),
+    ]
+    import trio
+    import vbsp  # Sets up logging.
+    trio.run(vbsp.main)
+
+
+def run(name: str, size: MapSize, folder: Path) -> Dict[str, Any]:
+    """Generate and compile a map, returning the profile report."""
+    map_path = folder / 'sdk_content' / 'maps' / f'bench_{name}.vmf'
+    map_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(map_path, 'w') as f:
+        make_map(size).export(f)
+    bin_folder = folder / 'bin'
+    # The compiler's output is only useful if it fails.
+    proc = subprocess.run(
+        [sys.executable, '-m', 'bench.vbsp_pipeline', '--compile', str(bin_folder), str(map_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=Path(__file__).parent.parent,
+    )
+    report = None
+    if proc.returncode == 0:
+        with open(bin_folder / 'bee2' / 'vbsp_profile.json') as f:
+            report = json.load(f)
+    # If it's missing the last phase, an error map was produced instead.
+    if report is None or 'finalise' not in report['phases']:
+        sys.stdout.buffer.write(proc.stdout)
+        raise ValueError(f'Compiling the {name} map failed!')
+    return report
+
+
+def print_reports(reports: Dict[str, Dict[str, Any]]) -> None:
+    """Print a table of the time taken by each phase, for each size."""
+    names = list(reports)
+    phases: List[str] = []
+    for report in reports.values():
+        for phase in report['phases']:
+            if phase not in phases:
+                phases.append(phase)
+    rows: List[Tuple[str, List[str]]] = [
+        (phase, [
+            f'{report["phases"][phase]:.3f}s' if phase in report['phases'] else '-'
+            for report in reports.values()
+        ])
+        for phase in phases
+    ]
+    rows.append(('total', [f'{report["total"]:.3f}s' for report in reports.values()]))
+    rows.append(('peak memory', [
+        f'{report["peak_memory"] / 2**20:.1f}MiB' if report['peak_memory'] else '?'
+        for report in reports.values()
+    ]))
+    for count in ['tiles', 'instances', 'entities', 'brushes']:
+        rows.append((count, [str(report['counts'].get(count, '-')) for report in reports.values()]))
+
+    first = max(len(row_name) for row_name, _ in rows)
+    widths = [
+        max(len(name), *(len(values[i]) for _, values in rows))
+        for i, name in enumerate(names)
+    ]
+    print(' ' * first, *[name.rjust(width) for name, width in zip(names, widths)])
+    for row_name, values in rows:
+        print(row_name.ljust(first), *[value.rjust(width) for value, width in zip(values, widths)])
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', help=f'The map sizes to compile: {", ".join(SIZES)}.')
+    parser.add_argument('--json', help='Write all the profile reports to this file.')
+    parser.add_argument('--compile', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.compile:
+        compile_map(Path(args.compile[0]), Path(args.compile[1]))
+        return
+    for name in args.sizes:
+        if name not in SIZES:
+            parser.error(f'Unknown size "{name}", valid sizes: {", ".join(SIZES)}')
+
+    reports: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tempdir:
+        folder = Path(tempdir)
+        game = folder / 'portal2'
+        game.mkdir()
+        (game / 'gameinfo.txt').write_text(GAMEINFO)
+        write_export(folder / 'bin', folder / 'package')
+        for name in args.sizes or SIZES:
+            print(f'Compiling {name} map...', flush=True)
+            reports[name] = run(name, SIZES[name], folder)
+
+    print_reports(reports)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
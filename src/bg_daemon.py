@@ -12,6 +12,7 @@ from tkinter.font import Font, families as tk_font_families
 from app import img, TK_ROOT, tk_tools
 import tkinter as tk
 import multiprocessing.connection
+import threading
 
 import utils
 
@@ -56,6 +57,18 @@ BOX_LEVELS = [
 START = '1.0'  # Row 1, column 0 = first character
 
 
+def format_size(size: int) -> str:
+    """Format a number of bytes for display."""
+    if size < 1024:
+        return f'{size}B'
+    value = size / 1024
+    for unit in ['KB', 'MB']:
+        if value < 1024:
+            return f'{value:.1f}{unit}'
+        value /= 1024
+    return f'{value:.1f}GB'
+
+
 class BaseLoadScreen:
     """Code common to both loading screen types."""
     drag_x: Optional[int]
@@ -82,6 +95,8 @@ class BaseLoadScreen:
         self.values = {}
         self.maxes = {}
         self.names = {}
+        # For stages which copy files, the (done, total) number of bytes.
+        self.byte_counts: Dict[str, Tuple[int, int]] = {}
         self.stages = stages
         self.is_shown = False
 
@@ -149,6 +164,7 @@ class BaseLoadScreen:
         for stage in self.values.keys():
             self.maxes[stage] = 10
             self.values[stage] = 0
+        self.byte_counts.clear()
         self.reset_stages()
 
     def op_step(self, stage: str) -> None:
@@ -164,6 +180,19 @@ class BaseLoadScreen:
             self.maxes[stage] = num
             self.update_stage(stage)
 
+    def op_batch(self, lengths: Dict[str, int], steps: Dict[str, int]) -> None:
+        """Apply several lengths and steps, coalesced by the main process."""
+        for stage, num in lengths.items():
+            self.op_set_length(stage, num)
+        for stage, count in steps.items():
+            self.values[stage] += count
+            self.update_stage(stage)
+
+    def op_set_bytes(self, stage: str, done: int, total: int) -> None:
+        """Set the number of bytes processed in a stage."""
+        self.byte_counts[stage] = (done, total)
+        self.update_stage(stage)
+
     def op_skip_stage(self, stage: str) -> None:
         """Skip over this stage of the loading process."""
         raise NotImplementedError
@@ -262,10 +291,14 @@ class LoadScreen(BaseLoadScreen):
             self.bar_var[stage].set(round(
                 1000 * self.values[stage] / max_val
             ))
-        self.labels[stage]['text'] = '{!s}/{!s}'.format(
+        text = '{!s}/{!s}'.format(
             self.values[stage],
             max_val,
         )
+        if stage in self.byte_counts:
+            done, total = self.byte_counts[stage]
+            text = f'{format_size(done)}/{format_size(total)}, {text}'
+        self.labels[stage]['text'] = text
 
     def op_show(self, title: str, labels: List[str]) -> None:
         """Show the window."""
@@ -813,15 +846,20 @@ def run_background(
 
     log_window = LogWindow(log_pipe_send)
 
-    def check_queue() -> None:
+    # Set once the pipes have been emptied, when waiting in a thread.
+    drained = threading.Event()
+
+    def check_queue(*_: object) -> None:
         """Update stages from the parent process."""
         nonlocal force_ontop
-        had_values = False
         try:
             while PIPE_REC.poll():  # Pop off all the values.
-                had_values = True
                 operation, scr_id, args = PIPE_REC.recv()
-                if operation == 'init':
+                if operation == 'batch':
+                    # Multiple steps, potentially for several screens.
+                    for batch_id, (lengths, steps) in args.items():
+                        SCREENS[batch_id].op_batch(lengths, steps)
+                elif operation == 'init':
                     # Create a new loadscreen.
                     is_main, title, stages = args
                     screen = (SplashScreen if is_main else LoadScreen)(scr_id, title, force_ontop, stages)
@@ -856,16 +894,28 @@ def run_background(
                         raise TypeError(func) from e
             while log_pipe_rec.poll():
                 log_window.handle(log_pipe_rec.recv())
-        except BrokenPipeError:
+        except (BrokenPipeError, EOFError):
             # A pipe failed, means the main app quit. Terminate ourselves.
             print('BG: Lost pipe!')
             TK_ROOT.quit()
             return
-
-        # Continually re-run this function in the TK loop.
-        # If we didn't find anything in the pipe, wait longer.
-        # Otherwise, we hog the CPU.
-        TK_ROOT.after(1 if had_values else 200, check_queue)
-
-    TK_ROOT.after(10, check_queue)
+        finally:
+            drained.set()
+
+    def wait_for_data() -> None:
+        """Block until there's data, then wake up the TK loop to process it."""
+        while True:
+            multiprocessing.connection.wait([PIPE_REC, log_pipe_rec])
+            drained.clear()
+            TK_ROOT.after_idle(check_queue)
+            drained.wait()
+
+    if hasattr(TK_ROOT.tk, 'createfilehandler'):
+        # Have Tk's notifier call us whenever the pipes are readable.
+        for conn in [PIPE_REC, log_pipe_rec]:
+            TK_ROOT.tk.createfilehandler(conn.fileno(), tk.READABLE, check_queue)
+    else:
+        # Windows can't watch pipes, so wait in a thread instead.
+        threading.Thread(target=wait_for_data, name='bg_daemon_pipes', daemon=True).start()
+    TK_ROOT.after_idle(check_queue)  # Process anything sent before we started.
     TK_ROOT.mainloop()  # Infinite loop, until the entire process tree quits.
@@ -15,8 +15,16 @@ else:
     app_name = sys.argv.pop(1).casefold()
 
 if app_name in ('vbsp.exe', 'vbsp_osx', 'vbsp_linux'):
-    import vbsp
-    trio.run(vbsp.main)
+    import compiler_server
+    if '--server' in sys.argv:
+        compiler_server.main()
+    else:
+        # If the server is running, let it compile the map.
+        code = compiler_server.run_client()
+        if code is not None:
+            sys.exit(code)
+        import vbsp
+        trio.run(vbsp.main)
 elif app_name in ('vrad.exe', 'vrad_osx', 'vrad_linux'):
     if '--errorserver' in sys.argv:
         import error_server
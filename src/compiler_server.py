@@ -0,0 +1,366 @@
+"""An optional resident server for VBSP, which keeps the exported configuration loaded.
+
+Normally each compile imports all the conditions, then parses editor.bin,
+vbsp_config, templates and so on before looking at the map. If enabled, the app
+starts VBSP with --server after exporting. That loads everything once, then
+listens on a local socket. Each compile then only runs a small client, which
+sends its arguments and console handles to the server. The server forks a worker
+from its loaded state for each map, so compiles can't affect each other.
+
+If the server isn't running, or the game was exported again since it started,
+the client compiles the map itself as normal. This requires os.fork(), so it is
+not available on Windows.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import array
+import hashlib
+import json
+import logging
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import srctools.logger
+
+import utils
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+SUPPORTED = hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX')
+# Written by the app after each export, so the server can tell when its settings are outdated.
+STAMP_FILE = 'bee2/export_stamp.txt'
+# If no compiles occur for this long, quit.
+IDLE_TIMEOUT = 2 * 60 * 60
+# How long to wait for the server to respond to a quit request.
+STOP_TIMEOUT = 30.0
+MAX_FDS = 3
+
+
+def socket_folder() -> str:
+    """Return a folder only accessible to this user, to place sockets in.
+
+    This is $XDG_RUNTIME_DIR if set, otherwise a folder in the temporary directory
+    is created. If that already exists but other users can access it, OSError is raised.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    folder = os.path.join(tempfile.gettempdir(), f'bee2-{os.getuid()}')
+    try:
+        os.mkdir(folder, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise OSError(f'Socket folder "{folder}" is accessible to other users!')
+    return folder
+
+
+def socket_path(bin_folder: str) -> str:
+    """Return the location of the socket for a game.
+
+    Socket paths are limited to around 100 characters, so this is placed in the
+    socket folder with a name derived from the game's location.
+    """
+    key = hashlib.sha256(os.path.realpath(bin_folder).encode('utf8')).hexdigest()[:16]
+    return os.path.join(socket_folder(), f'bee2_vbsp_{key}.sock')
+
+
+def read_stamp(bin_folder: str) -> Optional[str]:
+    """Read the export stamp, or return None if not exported."""
+    try:
+        with open(os.path.join(bin_folder, STAMP_FILE), encoding='utf8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_stamp(bin_folder: str) -> None:
+    """Record that the game was just exported."""
+    with open(os.path.join(bin_folder, STAMP_FILE), 'w', encoding='utf8') as f:
+        f.write(repr(time.time()))
+
+
+def _send_msg(sock: socket.socket, msg: Dict[str, Any], fds: Sequence[int] = ()) -> None:
+    """Send a JSON message, with optionally some file descriptors."""
+    data = json.dumps(msg).encode('utf8') + b'\n'
+    if fds:
+        sent = sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+        data = data[sent:]
+    sock.sendall(data)
+
+
+def _recv_msg(sock: socket.socket) -> Tuple[Optional[Dict[str, Any]], List[int]]:
+    """Receive a JSON message, and any file descriptors sent with it.
+
+    If the connection was closed first, the message is None.
+    """
+    fds = array.array('i')
+    data, ancdata, _, _ = sock.recvmsg(4096, socket.CMSG_LEN(MAX_FDS * fds.itemsize))
+    for level, kind, cdata in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cdata[:len(cdata) - (len(cdata) % fds.itemsize)])
+    chunks = [data]
+    while data and not data.endswith(b'\n'):
+        data = sock.recv(4096)
+        chunks.append(data)
+    if not data:
+        for fd in fds:
+            os.close(fd)
+        return None, []
+    return json.loads(b''.join(chunks)), list(fds)
+
+
+def _request(
+    bin_folder: str,
+    msg: Dict[str, Any],
+    fds: Sequence[int] = (),
+    timeout: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Send a message to the server and wait for the reply, or return None if it isn't running."""
+    if not SUPPORTED:
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path(bin_folder))
+            _send_msg(sock, msg, fds)
+            reply, _ = _recv_msg(sock)
+            return reply
+    except (OSError, ValueError):
+        return None
+
+
+def run_client() -> Optional[int]:
+    """Ask the server to compile the map with our arguments, if it's running.
+
+    This returns the exit code, or None if the map should be compiled in this process instead.
+    """
+    if not SUPPORTED:
+        return None
+    try:
+        fds = [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()]
+    except (AttributeError, OSError, ValueError):  # No console.
+        return None
+    cwd = os.getcwd()
+    reply = _request(cwd, {
+        'command': 'compile',
+        'argv': sys.argv,
+        'cwd': cwd,
+        'env': dict(os.environ),
+    }, fds)
+    if reply is not None and reply.get('status') == 'done':
+        return int(reply['code'])
+    return None
+
+
+def stop(bin_folder: str) -> bool:
+    """Tell the server for this game to quit, returning whether it was running."""
+    return _request(bin_folder, {'command': 'quit'}, timeout=STOP_TIMEOUT) is not None
+
+
+def start(bin_folder: str) -> bool:
+    """Start the server for this game, returning whether it could be started."""
+    if not SUPPORTED:
+        return False
+    if utils.LINUX:
+        exe = os.path.join(bin_folder, 'linux32', 'vbsp_linux')
+    else:
+        exe = os.path.join(bin_folder, 'vbsp_osx')
+    if not os.path.isfile(exe):
+        LOGGER.warning('Compiler "{}" does not exist, cannot start server!', exe)
+        return False
+    LOGGER.info('Starting compiler server for "{}"...', bin_folder)
+    subprocess.Popen(
+        [exe, '--server'],
+        cwd=bin_folder,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return True
+
+
+def listen(bin_folder: str) -> Optional[socket.socket]:
+    """Create the server socket, or return None if another server is running."""
+    try:
+        path = socket_path(bin_folder)
+    except OSError:
+        LOGGER.warning('Cannot create the compiler server socket:', exc_info=True)
+        return None
+    if _request(bin_folder, {'command': 'ping'}, timeout=STOP_TIMEOUT) is not None:
+        LOGGER.warning('Compiler server already running!')
+        return None
+    try:
+        os.remove(path)  # Left over from a previous server.
+    except FileNotFoundError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    return listener
+
+
+def _run_worker(
+    conn: socket.socket,
+    listener: socket.socket,
+    request: Dict[str, Any],
+    fds: List[int],
+    compile_map: Callable[[], object],
+) -> int:
+    """Run a compile in the forked process, returning the exit code."""
+    listener.close()
+    conn.close()
+    # Use the client's console, so the output goes to the game.
+    for target, fd in enumerate(fds[:MAX_FDS]):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request['cwd'])
+    os.environ.clear()
+    os.environ.update(request['env'])
+    sys.argv = list(request['argv'])
+    try:
+        compile_map()
+    except SystemExit as exc:
+        if exc.code is None:
+            return 0
+        elif isinstance(exc.code, int):
+            return exc.code
+        print(exc.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        LOGGER.exception('Compile failed:')
+        return 1
+    return 0
+
+
+def serve(
+    listener: socket.socket,
+    bin_folder: str,
+    stamp: str,
+    compile_map: Callable[[], object],
+) -> None:
+    """Handle requests, until the game is exported again or we're told to quit.
+
+    For each compile, compile_map() is called in a forked process.
+    """
+    path = listener.getsockname()
+    listener.settimeout(IDLE_TIMEOUT)
+    try:
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                LOGGER.info('No compiles for {}s, quitting.', IDLE_TIMEOUT)
+                return
+            with conn:
+                conn.settimeout(STOP_TIMEOUT)
+                try:
+                    request, fds = _recv_msg(conn)
+                except (OSError, ValueError):
+                    LOGGER.warning('Could not read request:', exc_info=True)
+                    continue
+                if request is None:
+                    continue
+                command = request.get('command')
+                if command == 'ping':
+                    _send_msg(conn, {'status': 'ok'})
+                    continue
+                elif command == 'quit':
+                    LOGGER.info('Quit requested.')
+                    _send_msg(conn, {'status': 'ok'})
+                    return
+                elif command != 'compile':
+                    LOGGER.warning('Unknown command {!r}!', command)
+                    continue
+                if read_stamp(bin_folder) != stamp:
+                    LOGGER.info('Game was exported again, quitting.')
+                    for fd in fds:
+                        os.close(fd)
+                    _send_msg(conn, {'status': 'stale'})
+                    return
+
+                LOGGER.info('Compiling: {}', request['argv'])
+                # Flush so buffered data isn't written by both processes.
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    code = 1
+                    try:
+                        code = _run_worker(conn, listener, request, fds, compile_map)
+                    finally:
+                        sys.stdout.flush()
+                        sys.stderr.flush()
+                        logging.shutdown()
+                        os._exit(code)
+                for fd in fds:
+                    os.close(fd)
+                _, status = os.waitpid(pid, 0)
+                code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+                LOGGER.info('Compile finished with code {}.', code)
+                try:
+                    conn.settimeout(None)
+                    _send_msg(conn, {'status': 'done', 'code': code})
+                except OSError:  # The game stopped waiting for the compile.
+                    pass
+    finally:
+        listener.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _reopen_log() -> None:
+    """Start a new log file for a compile, instead of sharing the server's."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, logging.FileHandler):
+            new_handler = srctools.logger.get_handler(handler.baseFilename)
+            new_handler.setLevel(handler.level)
+            new_handler.setFormatter(handler.formatter)
+            root.removeHandler(handler)
+            handler.close()
+            root.addHandler(new_handler)
+
+
+def main() -> None:
+    """Load the exported configuration, then serve compiles."""
+    import trio
+    import vbsp  # Sets up logging.
+    from precomp import conditions
+
+    bin_folder = os.getcwd()
+    stamp = read_stamp(bin_folder)
+    if stamp is None:
+        LOGGER.warning('Game has not been exported, not starting compiler server.')
+        return
+    LOGGER.info('Compiler server starting for "{}"...', bin_folder)
+    conditions.import_conditions()
+    settings = trio.run(vbsp.load_settings)
+
+    # Trio's worker threads don't survive forking, so wait for them to exit
+    # before accepting compiles.
+    while threading.active_count() > 1:
+        time.sleep(0.25)
+
+    listener = listen(bin_folder)
+    if listener is None:
+        return
+
+    def compile_map() -> None:
+        """Run a compile in the worker."""
+        _reopen_log()
+        vbsp.BEE2_config.load()
+        trio.run(vbsp.main, settings)
+
+    LOGGER.info('Compiler server ready.')
+    serve(listener, bin_folder, stamp, compile_map)
@@ -9,6 +9,10 @@ from BEE2_config import GEN_OPTS as LEGACY_CONF
 import config
 
 
+# The default number of images loaded simultaneously.
+DEFAULT_IMG_LOAD_WORKERS = 8
+
+
 class AfterExport(Enum):
     """Specifies what happens after exporting."""
     NORMAL = 0  # Stay visible
@@ -46,6 +50,10 @@ class GenOptions(config.Data, conf_name='Options', palette_stores=False, version
     log_item_fallbacks: bool = attrs.field(default=False, metadata={'legacy': 'Debug'})
     visualise_inheritance: bool = False
     force_all_editor_models: bool = attrs.field(default=False, metadata={'legacy': 'Debug'})
+    # Keep the compiler's configuration loaded between compiles.
+    compiler_server: bool = False
+    # Number of images loaded simultaneously.
+    img_load_workers: int = DEFAULT_IMG_LOAD_WORKERS
 
     language: str = ''
 
@@ -97,6 +105,7 @@ class GenOptions(config.Data, conf_name='Options', palette_stores=False, version
             after_export=after_export,
             log_win_level=data['log_win_level', 'INFO'],
             language=data['language', ''],
+            img_load_workers=data.int('img_load_workers', DEFAULT_IMG_LOAD_WORKERS),
             preserve_fgd=preserve_fgd,
             **{
                 field.name: data.bool(field.name, field.default)
@@ -110,6 +119,7 @@ class GenOptions(config.Data, conf_name='Options', palette_stores=False, version
             Property('after_export', str(self.after_export.value)),
             Property('log_win_level', self.log_win_level),
             Property('language', self.language),
+            Property('img_load_workers', str(self.img_load_workers)),
             Property('preserve_fgd', '1' if self.preserve_fgd else '0')
         ])
         for field in gen_opts_bool:
@@ -139,6 +149,10 @@ class GenOptions(config.Data, conf_name='Options', palette_stores=False, version
             res['language'] = data['language'].val_str
         except KeyError:
             res['language'] = ''
+        try:
+            res['img_load_workers'] = data['img_load_workers'].val_int
+        except (KeyError, ValueError):
+            res['img_load_workers'] = DEFAULT_IMG_LOAD_WORKERS
 
         for field in gen_opts_bool:
             try:
@@ -152,6 +166,7 @@ class GenOptions(config.Data, conf_name='Options', palette_stores=False, version
         elem = Element('Options', 'DMElement')
         elem['after_export'] = self.after_export.value
         elem['language'] = self.language
+        elem['img_load_workers'] = self.img_load_workers
         elem['preserve_fgd'] = self.preserve_fgd
         for field in gen_opts_bool:
             elem[field.name] = getattr(self, field.name)
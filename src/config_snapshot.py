@@ -0,0 +1,106 @@
+"""A pre-parsed binary snapshot of vbsp_config, so the compiler can skip parsing the text.
+
+On export the text file is written as normal, then parsed back to validate it and
+saved in a compact marshal-based form. The snapshot records the hash of the text,
+so if the text file is edited by hand it is used instead. The same encoding is
+also used by template_bundle.
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple, Union
+from typing_extensions import TypeAlias
+import hashlib
+import io
+import marshal
+import struct
+import time
+
+from srctools import Property
+import srctools.logger
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+MAGIC = b'BEE2CONF'
+VERSION = 1
+# Magic, version, SHA256 of the text file, and the time taken to parse the text.
+HEADER = struct.Struct('<8sH32sd')
+# The encoded form of a property, either a leaf or a block.
+EncodedProp: TypeAlias = Tuple[str, Union[str, List['EncodedProp']]]
+
+
+def encode_props(prop: Property) -> EncodedProp:
+    """Convert a property into tuples and lists, which marshal can save."""
+    if prop.has_children():
+        return (prop.real_name, [encode_props(child) for child in prop])
+    else:
+        return (prop.real_name, prop.value)
+
+
+def decode_props(data: EncodedProp) -> Property:
+    """Rebuild a property from the encoded form."""
+    name, value = data
+    if isinstance(value, str):
+        return Property(name, value)
+    else:
+        return Property(name, [decode_props(child) for child in value])
+
+
+def _parse_text(data: bytes, text_path: str) -> Property:
+    """Parse the text file, handling newlines in the same way as open()."""
+    return Property.parse(io.StringIO(data.decode('utf8'), newline=None), text_path)
+
+
+def write(text_path: str, snapshot_path: str) -> None:
+    """Parse the config text file, and write the snapshot for it."""
+    with open(text_path, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    conf = _parse_text(data, text_path)
+    duration = time.perf_counter() - start
+
+    with open(snapshot_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, hashlib.sha256(data).digest(), duration))
+        marshal.dump([encode_props(prop) for prop in conf], f)
+
+
+def _read_snapshot(snapshot_path: str, text_hash: bytes) -> Optional[Tuple[Property, float]]:
+    """Read the snapshot, if it's present and matches the text file.
+
+    This returns the config, and the time originally taken to parse the text.
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            magic, version, snap_hash, parse_time = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                LOGGER.info('Config snapshot is an unknown version.')
+                return None
+            if snap_hash != text_hash:
+                LOGGER.info('Config snapshot does not match, it may have been edited.')
+                return None
+            encoded = marshal.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, TypeError, struct.error):
+        LOGGER.warning('Could not read config snapshot:', exc_info=True)
+        return None
+    return Property.root(*map(decode_props, encoded)), parse_time
+
+
+def load(text_path: str, snapshot_path: str) -> Property:
+    """Load the config, using the snapshot if it matches the text file."""
+    with open(text_path, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    result = _read_snapshot(snapshot_path, hashlib.sha256(data).digest())
+    duration = time.perf_counter() - start
+    if result is not None:
+        conf, parse_time = result
+        LOGGER.info(
+            'Loaded config snapshot in {:.3f}s, saving {:.3f}s of parsing.',
+            duration, parse_time - duration,
+        )
+        return conf
+
+    start = time.perf_counter()
+    conf = _parse_text(data, text_path)
+    LOGGER.info('Parsed config in {:.3f}s.', time.perf_counter() - start)
+    return conf
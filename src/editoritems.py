@@ -1,10 +1,14 @@
 """Parses the Puzzlemaker's item format."""
 from __future__ import annotations
+import pickle
+import pickletools
+import struct
 import sys
+import typing
 from collections import defaultdict
 from collections.abc import Iterable, Iterator, Mapping
 from enum import Enum, Flag
-from typing import Callable, ClassVar, Protocol, Any
+from typing import IO, Callable, ClassVar, Protocol, Any
 from pathlib import PurePosixPath as FSPath
 
 import attrs
@@ -1982,3 +1986,137 @@ class Item:
         for subtype in self.subtypes:
             yield subtype.name, source + '.name'
             yield subtype.pal_name, source + '.pal_name'
+
+
+@attrs.frozen
+class ItemSummary:
+    """The parts of an item the compiler needs for every item, not just placed ones.
+
+    These are stored together in the item database, so the full items only
+    need to be decoded when used.
+    """
+    id: str
+    # Filenames for each instance, then custom instances.
+    instances: list[str]
+    cust_instances: dict[str, str]
+    conn_config: ConnConfig | None
+    force_input: bool
+    force_output: bool
+
+    @classmethod
+    def from_item(cls, item: Item) -> ItemSummary:
+        """Compute the summary for an item."""
+        return cls(
+            item.id,
+            [str(inst.inst) for inst in item.instances],
+            {name: str(file) for name, file in item.cust_instances.items()},
+            item.conn_config,
+            item.force_input,
+            item.force_output,
+        )
+
+
+ITEM_DB_MAGIC = b'BEE2ITEM'
+ITEM_DB_VERSION = 1
+# Magic, version, item count and the size of the summary block.
+_ITEM_DB_HEADER = struct.Struct('<8sHII')
+# Item ID size, then record offset and size.
+_ITEM_DB_ENTRY = struct.Struct('<HII')
+
+
+# collections.abc.Mapping can't be subscripted in Python 3.8.
+class ItemDatabase(typing.Mapping[str, Item]):
+    """The indexed database of items exported to editor.bin, for the compiler.
+
+    The file has a header with the ID, offset and size of each item,
+    then a pickled list of summaries, then each item pickled separately.
+    Items are only decoded the first time they are accessed.
+    Keys are case-insensitive.
+    """
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        self._items: dict[str, Item] = {}
+        self._summaries: list[ItemSummary] | None = None
+        magic, version, count, summary_size = _ITEM_DB_HEADER.unpack_from(data, 0)
+        if magic != ITEM_DB_MAGIC:
+            raise ValueError('Not an item database!')
+        if version != ITEM_DB_VERSION:
+            raise ValueError(f'Unknown item database version {version}!')
+        pos = _ITEM_DB_HEADER.size
+        # ID -> (offset, size).
+        self._index: dict[str, tuple[int, int]] = {}
+        for _ in range(count):
+            id_size, offset, size = _ITEM_DB_ENTRY.unpack_from(data, pos)
+            pos += _ITEM_DB_ENTRY.size
+            item_id = bytes(self._data[pos:pos + id_size]).decode('utf8')
+            pos += id_size
+            self._index[item_id.casefold()] = (offset, size)
+        self._summary_pos = (pos, summary_size)
+        self._records_start = pos + summary_size
+
+    @classmethod
+    def read(cls, file: IO[bytes]) -> ItemDatabase:
+        """Read the database from a file."""
+        return cls(file.read())
+
+    @staticmethod
+    def write(file: IO[bytes], items: Iterable[Item]) -> None:
+        """Write items to a file in this format."""
+        index = bytearray()
+        records = bytearray()
+        summaries: list[ItemSummary] = []
+        for item in items:
+            item_id = item.id.encode('utf8')
+            record = pickletools.optimize(pickle.dumps(item, pickle.HIGHEST_PROTOCOL))
+            index += _ITEM_DB_ENTRY.pack(len(item_id), len(records), len(record))
+            index += item_id
+            records += record
+            summaries.append(ItemSummary.from_item(item))
+        summary_data = pickletools.optimize(pickle.dumps(summaries, pickle.HIGHEST_PROTOCOL))
+        file.write(_ITEM_DB_HEADER.pack(
+            ITEM_DB_MAGIC, ITEM_DB_VERSION,
+            len(summaries), len(summary_data),
+        ))
+        file.write(index)
+        file.write(summary_data)
+        file.write(records)
+
+    def summaries(self) -> list[ItemSummary]:
+        """Return the summary of every item, without decoding the items themselves."""
+        if self._summaries is None:
+            pos, size = self._summary_pos
+            self._summaries = pickle.loads(self._data[pos:pos + size])
+        return self._summaries
+
+    def __getitem__(self, item_id: str) -> Item:
+        """Fetch an item, decoding it if required."""
+        folded = item_id.casefold()
+        try:
+            return self._items[folded]
+        except KeyError:
+            pass
+        offset, size = self._index[folded]
+        offset += self._records_start
+        item = self._items[folded] = pickle.loads(self._data[offset:offset + size])
+        return item
+
+    def __contains__(self, item_id: object) -> bool:
+        """Check if this item is present, without decoding it."""
+        return isinstance(item_id, str) and item_id.casefold() in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the item IDs, casefolded."""
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        """Return the number of items."""
+        return len(self._index)
+
+
+def item_summaries(items: Mapping[str, Item]) -> Iterator[ItemSummary]:
+    """Produce the summary of each item, avoiding decoding items if possible."""
+    if isinstance(items, ItemDatabase):
+        yield from items.summaries()
+    else:
+        for item in items.values():
+            yield ItemSummary.from_item(item)
@@ -9,6 +9,7 @@ from types import TracebackType
 from tkinter import commondialog
 from weakref import WeakSet
 import contextlib
+import math
 import multiprocessing
 import time
 
@@ -16,7 +17,8 @@ import attrs
 import srctools.logger
 
 import config.gen_opts
-from app import localisation, logWindow
+from app import TK_ROOT, localisation, logWindow
+from progress_batch import ProgressBatcher
 import config
 from transtoken import TransToken
 import utils
@@ -35,6 +37,11 @@ _SCREEN_CANCEL_FLAG: Set[int] = set()
 # DAEMON is sent over to the other process.
 _PIPE_MAIN_REC, _PIPE_DAEMON_SEND = multiprocessing.Pipe(duplex=False)
 _PIPE_DAEMON_REC, _PIPE_MAIN_SEND = multiprocessing.Pipe(duplex=False)
+# All messages are sent through this, so steps can be combined.
+_BATCHER = ProgressBatcher(
+    _PIPE_MAIN_SEND.send,
+    schedule=lambda delay, func: TK_ROOT.after(math.ceil(delay * 1000), func),
+)
 
 
 class Cancelled(SystemExit):
@@ -65,13 +72,13 @@ def close_all() -> None:
 
 def show_main_loader(is_compact: bool) -> None:
     """Special function, which sets the splash screen compactness."""
-    _PIPE_MAIN_SEND.send(('set_is_compact', id(main_loader), (is_compact, )))
+    _BATCHER.send(('set_is_compact', id(main_loader), (is_compact, )))
     main_loader.show()
 
 
 def set_force_ontop(ontop: bool) -> None:
     """Set whether screens will be forced on top."""
-    _PIPE_MAIN_SEND.send(('set_force_ontop', None, ontop))
+    _BATCHER.send(('set_force_ontop', None, ontop))
 
 
 @contextlib.contextmanager
@@ -150,8 +157,11 @@ class LoadScreen:
 
     def _send_msg(self, command: str, *args: Any) -> None:
         """Send a message to the daemon."""
-        _PIPE_MAIN_SEND.send((command, id(self), args))
-        # Check the messages coming back as well.
+        _BATCHER.send((command, id(self), args))
+        self._check_replies()
+
+    def _check_replies(self) -> None:
+        """Check the messages coming back from the daemon."""
         while _PIPE_MAIN_REC.poll():
             arg: Any
             command, arg = _PIPE_MAIN_REC.recv()
@@ -176,7 +186,8 @@ class LoadScreen:
         """Set the maximum value for the specified stage."""
         if stage not in self.stage_ids:
             raise KeyError(f'"{stage}" not valid for {self.stage_ids}!')
-        self._send_msg('set_length', stage, num)
+        if _BATCHER.set_length(id(self), stage, num):
+            self._check_replies()
 
     def step(self, stage: str, disp_name: str='') -> None:
         """Increment the specified stage."""
@@ -187,7 +198,14 @@ class LoadScreen:
         if diff > 0.1:
             LOGGER.debug('{}: "{}" = {:.3}s', stage, disp_name, diff)
         self._time = cur
-        self._send_msg('step', stage)
+        if _BATCHER.step(id(self), stage):
+            self._check_replies()
+
+    def set_bytes(self, stage: str, done: int, total: int) -> None:
+        """Additionally display the number of bytes processed for the specified stage."""
+        if stage not in self.stage_ids:
+            raise KeyError(f'"{stage}" not valid for {self.stage_ids}!')
+        self._send_msg('set_bytes', stage, done, total)
 
     def skip_stage(self, stage: str) -> None:
         """Skip over this stage of the loading process."""
@@ -228,7 +246,7 @@ class LoadScreen:
 def shutdown() -> None:
     """Instruct the daemon process to shut down."""
     try:
-        _PIPE_MAIN_SEND.send(('quit_daemon', None, None))
+        _BATCHER.send(('quit_daemon', None, None))
     except BrokenPipeError:  # Already quit, don't care.
         pass
 
@@ -236,7 +254,7 @@ def shutdown() -> None:
 @localisation.add_callback(call=False)
 def _update_translations() -> None:
     """Update the translations."""
-    _PIPE_MAIN_SEND.send((
+    _BATCHER.send((
         'update_translations', 0,
         {key: str(tok) for key, tok in TRANSLATIONS.items()},
     ))
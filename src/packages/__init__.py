@@ -3,7 +3,10 @@ Handles scanning through the zip packages to find all items, styles, etc.
 """
 from __future__ import annotations
 
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+import multiprocessing
 import os
+import pickle
 import warnings
 from collections import defaultdict
 from pathlib import Path
@@ -17,7 +20,7 @@ from BEE2_config import ConfigFile
 from app import tkMarkdown, img, lazy_conf, background_run
 import utils
 import consts
-from srctools import Property, NoKeyError
+from srctools import AtomicWriter, Property, NoKeyError
 from srctools.tokenizer import TokenSyntaxError
 from srctools.filesys import FileSystem, RawFileSystem, ZipFileSystem, VPKFileSystem
 from editoritems import Item as EditorItem, Renderable, RenderableType
@@ -42,6 +45,12 @@ OBJ_TYPES: dict[str, Type[PakObject]] = {}
 # Maps a package ID to the matching filesystem for reading files easily.
 PACKAGE_SYS: dict[str, FileSystem] = {}
 PACK_CONFIG = ConfigFile('packages.cfg')
+# Parsed info.txt files for packages, so they don't need to be parsed each time.
+INFO_CACHE_LOC = 'package_info.pickle'
+# Incremented to discard the cache if the format changes.
+INFO_CACHE_VERSION = 1
+# Maximum number of worker processes used to parse info.txt files.
+INFO_POOL_WORKERS = 4
 
 
 @attrs.define
@@ -434,8 +443,121 @@ class PackagesSet:
 LOADED = PackagesSet()
 
 
-async def find_packages(nursery: trio.Nursery, packset: PackagesSet, pak_dir: Path) -> None:
-    """Search a folder for packages, recursing if necessary."""
+class InfoCache:
+    """Parses the info.txt files for packages, caching the result on disk.
+
+    Packages are identified by their path, and are reparsed if the modification time changes.
+    Parsing can be done in a process pool, allowing large packages to be parsed in parallel.
+    """
+    def __init__(self, filename: Path, pool: Optional[Executor] = None) -> None:
+        self.filename = filename
+        self.pool = pool
+        # Path -> (modification time, pickled Property).
+        # We store the pickle, since the info is modified while parsing objects.
+        self._cached: dict[str, tuple[int, bytes]] = {}
+        # The entries used this time, which will be saved.
+        self._used: dict[str, tuple[int, bytes]] = {}
+        self.hits = self.misses = 0
+
+    def load(self) -> None:
+        """Load the existing cache from disk."""
+        try:
+            with self.filename.open('rb') as f:
+                version, cached = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception:
+            LOGGER.warning('Could not read package info cache:', exc_info=True)
+            return
+        if version == INFO_CACHE_VERSION:
+            self._cached = cached
+
+    def save(self) -> None:
+        """Write the cache back to disk, discarding packages which weren't found."""
+        try:
+            with AtomicWriter(self.filename, is_bytes=True) as f:
+                pickle.dump((INFO_CACHE_VERSION, self._used), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            LOGGER.warning('Could not write package info cache:', exc_info=True)
+
+    async def parse(self, filesys: FileSystem, path: Path) -> Property:
+        """Read the info.txt for a package.
+
+        FileNotFoundError is raised if it does not exist.
+        """
+        mod_time = get_modtime(filesys, path)
+        key = str(path.absolute())
+        # Raw folders have no modification time, those are never cached.
+        if mod_time != 0:
+            try:
+                cached_time, data = self._cached[key]
+            except KeyError:
+                pass
+            else:
+                if cached_time == mod_time:
+                    self.hits += 1
+                    self._used[key] = (mod_time, data)
+                    return await trio.to_thread.run_sync(pickle.loads, data)
+
+        self.misses += 1
+        filename = f'{filesys.path}:info.txt'
+        text = await trio.to_thread.run_sync(read_info_text, filesys, cancellable=True)
+        info: Property | None = None
+        if self.pool is not None:
+            try:
+                future = self.pool.submit(Property.parse, text, filename)
+                info = await trio.to_thread.run_sync(future.result, cancellable=True)
+            except BrokenExecutor:
+                # Syntax errors can't be sent between processes, which breaks the pool.
+                LOGGER.debug('Process pool broken while parsing {}:', filename, exc_info=True)
+                self.pool = None
+            except Exception:
+                LOGGER.debug('Parsing {} in a worker process failed:', filename, exc_info=True)
+            # If it failed, parse here to produce the original error.
+        if info is None:
+            info = await trio.to_thread.run_sync(Property.parse, text, filename, cancellable=True)
+        if mod_time != 0:
+            self._used[key] = (mod_time, pickle.dumps(info, protocol=pickle.HIGHEST_PROTOCOL))
+        return info
+
+
+def make_info_pool() -> ProcessPoolExecutor:
+    """Create the process pool used to parse info.txt files.
+
+    Workers are always spawned, so they only import srctools to unpickle Property.parse,
+    not the Tk application. Processes are only started once work is submitted.
+    """
+    return ProcessPoolExecutor(
+        max_workers=min(INFO_POOL_WORKERS, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+def read_info_text(filesys: FileSystem) -> str:
+    """Read the text of a package's info.txt file."""
+    with filesys.open_str('info.txt') as f:
+        return f.read()
+
+
+def get_modtime(filesys: FileSystem, path: Path) -> int:
+    """Return the modification time of a package, or zero if unzipped."""
+    if isinstance(filesys, RawFileSystem):
+        # No modification time
+        return 0
+    else:
+        return int(path.stat().st_mtime)
+
+
+async def find_packages(
+    nursery: trio.Nursery,
+    packset: PackagesSet,
+    pak_dir: Path,
+    info_cache: Optional[InfoCache] = None,
+) -> None:
+    """Search a folder for packages, recursing if necessary.
+
+    If an info cache is provided, it is used to parse the info.txt files.
+    """
     found_pak = False
     try:
         contents = list(pak_dir.iterdir())
@@ -466,12 +588,15 @@ async def find_packages(nursery: trio.Nursery, packset: PackagesSet, pak_dir: Pa
 
         # Valid packages must have an info.txt file!
         try:
-            info = await trio.to_thread.run_sync(filesys.read_prop, 'info.txt', cancellable=True)
+            if info_cache is not None:
+                info = await info_cache.parse(filesys, name)
+            else:
+                info = await trio.to_thread.run_sync(filesys.read_prop, 'info.txt', cancellable=True)
         except FileNotFoundError:
             if name.is_dir():
                 # This isn't a package, so check the subfolders too...
                 LOGGER.debug('Checking subdir "{}" for packages...', name)
-                nursery.start_soon(find_packages, nursery, packset, name)
+                nursery.start_soon(find_packages, nursery, packset, name, info_cache)
             else:
                 LOGGER.warning('ERROR: package "{}" has no info.txt!', name)
             # Don't continue to parse this "package"
@@ -530,9 +655,20 @@ async def load_packages(
     has_tag_music: bool=False,
 ) -> None:
     """Scan and read in all packages."""
-    async with trio.open_nursery() as find_nurs:
-        for pak_dir in pak_dirs:
-            find_nurs.start_soon(find_packages, find_nurs, packset, pak_dir)
+    info_cache = InfoCache(utils.conf_location(INFO_CACHE_LOC))
+    await trio.to_thread.run_sync(info_cache.load)
+    pool = info_cache.pool = make_info_pool()
+    try:
+        async with trio.open_nursery() as find_nurs:
+            for pak_dir in pak_dirs:
+                find_nurs.start_soon(find_packages, find_nurs, packset, pak_dir, info_cache)
+    finally:
+        pool.shutdown(wait=False)
+    LOGGER.info(
+        'Package info: {} cached, {} parsed.',
+        info_cache.hits, info_cache.misses,
+    )
+    await trio.to_thread.run_sync(info_cache.save)
 
     pack_count = len(packset.packages)
     loader.set_length("PAK", pack_count)
@@ -839,11 +975,7 @@ class Package:
     def get_modtime(self) -> int:
         """After the cache has been extracted, set the modification dates
          in the config."""
-        if isinstance(self.fsys, RawFileSystem):
-            # No modification time
-            return 0
-        else:
-            return int(self.path.stat().st_mtime)
+        return get_modtime(self.fsys, self.path)
 
 
 class Style(PakObject, needs_foreground=True):
@@ -10,11 +10,14 @@ from srctools.dmx import Element as DMXElement, ValueType as DMXValue, Attribute
 import srctools.logger
 
 import packages
+import template_bundle
 from app import gameMan
 from utils import PackagePath
 
 LOGGER = srctools.logger.get_logger(__name__)
 TEMPLATES: dict[str, PackagePath] = {}
+# Encoded templates from previous exports, with the modification time when they were parsed.
+_ENCODED: dict[tuple[str, str], tuple[float, bytes]] = {}
 
 
 async def parse_template(pak_id: str, file: File) -> None:
@@ -88,12 +91,40 @@ def write_templates(game: gameMan.Game) -> None:
     root = DMXElement('Templates', 'DMERoot')
     template_list = root['temp'] = DMXAttr.array('list', DMXValue.ELEMENT)
 
+    bundle: list[tuple[str, str, str, float, bytes]] = []
+
     for temp_id, path in TEMPLATES.items():
         pack_path = packages.PACKAGE_SYS[path.package].path
         temp_el = DMXElement(temp_id, 'DMETemplate')
-        temp_el['package'] = os.path.abspath(pack_path).replace('\\', '/')
+        temp_el['package'] = abs_path = os.path.abspath(pack_path).replace('\\', '/')
         temp_el['path'] = path.path
         template_list.append(temp_el)
+        try:
+            mtime, encoded = encode_template(abs_path, path)
+        except (OSError, KeyValError):
+            # The compiler will report the error if it's used.
+            LOGGER.warning('Could not parse template "{}":', path, exc_info=True)
+        else:
+            bundle.append((temp_id, abs_path, path.path, mtime, encoded))
 
     with AtomicWriter(game.abs_path('bin/bee2/templates.lst'), is_bytes=True) as f:
         root.export_binary(f, fmt_name='bee_templates', unicode='format')
+    with AtomicWriter(game.abs_path('bin/bee2/templates.bin'), is_bytes=True) as f:
+        template_bundle.write(f, bundle)
+
+
+def encode_template(pak_path: str, path: PackagePath) -> tuple[float, bytes]:
+    """Parse a template for the bundle, reusing the result from previous exports if unchanged."""
+    mtime = template_bundle.source_mtime(pak_path, path.path)
+    try:
+        old_mtime, encoded = _ENCODED[pak_path, path.path]
+    except KeyError:
+        pass
+    else:
+        if old_mtime == mtime:
+            return mtime, encoded
+    with packages.PACKAGE_SYS[path.package][path.path].open_str() as f:
+        props = Property.parse(f, str(path))
+    encoded = template_bundle.encode(props)
+    _ENCODED[pak_path, path.path] = mtime, encoded
+    return mtime, encoded
@@ -301,6 +301,126 @@ class SimplexNoise(BaseNoise):
 
 		return noise * 32.0
 
+	def noise3_grid(self, xs, ys, zs):
+		"""Evaluate 3D simplex noise for every combination of the given coordinates.
+
+		Returns nested lists, indexed by [x][y][z]. This gives exactly the same
+		results as noise3(), but avoids the overhead of calling it for each point.
+		"""
+		perm = self.permutation
+		period = self.period
+		grad3 = _GRAD3
+		F3 = _F3
+		G3 = _G3
+		result = []
+		for x in xs:
+			row = []
+			result.append(row)
+			for y in ys:
+				column = []
+				row.append(column)
+				for z in zs:
+					# The same as noise3(), but inlined.
+					s = (x + y + z) * F3
+					i = floor(x + s)
+					j = floor(y + s)
+					k = floor(z + s)
+					t = (i + j + k) * G3
+					x0 = x - (i - t)
+					y0 = y - (j - t)
+					z0 = z - (k - t)
+
+					if x0 >= y0:
+						if y0 >= z0:
+							i1 = 1; j1 = 0; k1 = 0
+							i2 = 1; j2 = 1; k2 = 0
+						elif x0 >= z0:
+							i1 = 1; j1 = 0; k1 = 0
+							i2 = 1; j2 = 0; k2 = 1
+						else:
+							i1 = 0; j1 = 0; k1 = 1
+							i2 = 1; j2 = 0; k2 = 1
+					else:
+						if y0 < z0:
+							i1 = 0; j1 = 0; k1 = 1
+							i2 = 0; j2 = 1; k2 = 1
+						elif x0 < z0:
+							i1 = 0; j1 = 1; k1 = 0
+							i2 = 0; j2 = 1; k2 = 1
+						else:
+							i1 = 0; j1 = 1; k1 = 0
+							i2 = 1; j2 = 1; k2 = 0
+
+					x1 = x0 - i1 + G3
+					y1 = y0 - j1 + G3
+					z1 = z0 - k1 + G3
+					x2 = x0 - i2 + 2.0 * G3
+					y2 = y0 - j2 + 2.0 * G3
+					z2 = z0 - k2 + 2.0 * G3
+					x3 = x0 - 1.0 + 3.0 * G3
+					y3 = y0 - 1.0 + 3.0 * G3
+					z3 = z0 - 1.0 + 3.0 * G3
+
+					ii = int(i) % period
+					jj = int(j) % period
+					kk = int(k) % period
+
+					tt = 0.6 - x0**2 - y0**2 - z0**2
+					if tt > 0:
+						g = grad3[perm[ii + perm[jj + perm[kk]]] % 12]
+						noise = tt**4 * (g[0] * x0 + g[1] * y0 + g[2] * z0)
+					else:
+						noise = 0.0
+
+					tt = 0.6 - x1**2 - y1**2 - z1**2
+					if tt > 0:
+						g = grad3[perm[ii + i1 + perm[jj + j1 + perm[kk + k1]]] % 12]
+						noise += tt**4 * (g[0] * x1 + g[1] * y1 + g[2] * z1)
+
+					tt = 0.6 - x2**2 - y2**2 - z2**2
+					if tt > 0:
+						g = grad3[perm[ii + i2 + perm[jj + j2 + perm[kk + k2]]] % 12]
+						noise += tt**4 * (g[0] * x2 + g[1] * y2 + g[2] * z2)
+
+					tt = 0.6 - x3**2 - y3**2 - z3**2
+					if tt > 0:
+						g = grad3[perm[ii + 1 + perm[jj + 1 + perm[kk + 1]]] % 12]
+						noise += tt**4 * (g[0] * x3 + g[1] * y3 + g[2] * z3)
+
+					column.append(noise * 32.0)
+		return result
+
+
+def smooth_noise_grid(noise, xs, ys, z):
+	"""Generate smoothed noise from 0 to 1 for every combination of the x and y values.
+
+	Each value is the average of noise3() at the 3x3 neighbouring integer
+	offsets. Neighbouring locations share most of these samples, so each is only
+	generated once. Returns a dict mapping (x, y) to the value.
+	"""
+	xs = set(xs)
+	ys = set(ys)
+	offsets = (-1, 0, 1)
+	sample_xs = sorted({x + off for x in xs for off in offsets})
+	sample_ys = sorted({y + off for y in ys for off in offsets})
+	grid = noise.noise3_grid(sample_xs, sample_ys, [z])
+	samples = {
+		# + 1 / 2 fixes the value range (originally -1,1 -> 0,1)
+		(x, y): (column[0] + 1) / 2
+		for x, row in zip(sample_xs, grid)
+		for y, column in zip(sample_ys, row)
+	}
+	# Always sum in the same order, so the results don't change.
+	return {
+		(x, y): sum(
+			samples[x + off_x, y + off_y]
+			for off_x in offsets
+			for off_y in offsets
+		) / 9
+		for x in xs
+		for y in ys
+	}
+
 
 def lerp(t, a, b):
 	return a + t * (b - a)
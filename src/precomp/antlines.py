@@ -126,7 +126,7 @@ class AntType:
         return AntType(
             [AntTex(consts.Antlines.STRAIGHT, 0.25, False)],
             [AntTex(consts.Antlines.CORNER, 1, False)],
-            [], [], 0,
+            [], [], 0.0,
         )
 
 
@@ -233,6 +233,7 @@ class Antline:
             self.line[:] = [seg for seg in collapse_line if seg is not None]
             LOGGER.info('Collapsed {} antline corners', collapse_line.count(None))
 
+        seg_seeder = rand.seeder(b'antline')
         for seg in self.line:
             conf = floor_conf if seg.on_floor else wall_conf
             # Check tiledefs in the voxels, and assign just in case.
@@ -252,7 +253,7 @@ class Antline:
                 else:
                     seg.tiles.add(tile)
 
-            rng = rand.seed(b'antline', seg.start, seg.end)
+            rng = seg_seeder(seg.start, seg.end)
             if seg.type is SegType.CORNER:
                 mat: AntTex
                 if rng.randrange(100) < conf.broken_chance:
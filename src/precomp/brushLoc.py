@@ -5,7 +5,7 @@ from __future__ import annotations
 
 from collections.abc import Iterable, Iterator
 from collections import deque
-from typing import Union, Any, Tuple, ItemsView, MutableMapping
+from typing import Union, Any, Tuple, ItemsView, Mapping, MutableMapping
 from enum import Enum
 
 from srctools import Vec, Matrix, VMF
@@ -128,6 +128,21 @@ BLOCK_LOOKUP['pit'] = {
 
 
 _grid_keys = Union[Vec, Tuple[float, float, float], slice]
+DEFAULT_COLLIDE = frozenset({
+    Block.SOLID, Block.EMBED,
+    Block.PIT_BOTTOM, Block.PIT_SINGLE,
+})
+
+# The region DenseGrid stores in its array. This covers the map (0-26), plus
+# the buffer fill_air() permits for embedded areas. Positions outside
+# this are kept in a dict instead.
+DENSE_MIN = -16
+DENSE_SIZE = 64
+# The code each block is stored as in the array. 0 is unset, which reads
+# as VOID just like missing keys in the dict.
+DENSE_BLOCKS: tuple[Block, ...] = (Block.VOID, *Block)
+DENSE_CODES: dict[Block, int] = {block: i for i, block in enumerate(DENSE_BLOCKS) if i}
+_VOID_CODE = DENSE_CODES[Block.VOID]
 
 
 def _conv_key(pos: _grid_keys) -> tuple[float, float, float]:
@@ -176,10 +191,7 @@ class Grid(MutableMapping[_grid_keys, Block]):
         self,
         pos: _grid_keys,
         direction: Vec,
-        collide: Iterable[Block]=frozenset({
-            Block.SOLID, Block.EMBED,
-            Block.PIT_BOTTOM, Block.PIT_SINGLE,
-        }),
+        collide: Iterable[Block]=DEFAULT_COLLIDE,
     ) -> Vec:
         """Move in a direction until hitting a block of a certain type.
 
@@ -214,14 +226,35 @@ class Grid(MutableMapping[_grid_keys, Block]):
         else:
             raise ValueError('Moved too far! (> 90)')
 
+    def raycast_many(
+        self,
+        positions: Iterable[_grid_keys],
+        directions: Iterable[Vec],
+        collide: Iterable[Block]=DEFAULT_COLLIDE,
+    ) -> list[Vec]:
+        """Perform many raycasts at once, pairing up each position and direction.
+
+        This is equivalent to calling raycast() for each, but may be faster.
+        ValueError is raised if any ray hits VOID or moves outside the map.
+        """
+        positions = list(positions)
+        directions = list(directions)
+        if len(positions) != len(directions):
+            raise ValueError(
+                f'Got {len(positions)} positions, '
+                f'but {len(directions)} directions!'
+            )
+        collide_set = frozenset(collide)
+        return [
+            self.raycast(pos, direction, collide_set)
+            for pos, direction in zip(positions, directions)
+        ]
+
     def raycast_world(
         self,
         pos: Vec,
         direction: Vec,
-        collide: Iterable[Block]=frozenset({
-            Block.SOLID, Block.EMBED,
-            Block.PIT_BOTTOM, Block.PIT_SINGLE,
-        }),
+        collide: Iterable[Block]=DEFAULT_COLLIDE,
     ) -> Vec:
         """Like raycast(), but accepts and returns world positions instead."""
         return g2w(self.raycast(w2g(pos), direction, collide))
@@ -264,11 +297,47 @@ class Grid(MutableMapping[_grid_keys, Block]):
     def __len__(self) -> int:
         return len(self._grid)
 
-    def items(self) -> _GridItemsView:
+    def items(self) -> ItemsView[Vec, Block]:
         """Return a view over the grid items."""
         return _GridItemsView(self._grid)
 
-    def read_from_map(self, vmf: VMF, has_attr: dict[str, bool], items: dict[str, editoritems.Item]) -> None:
+    def find_blocks(self, blocks: Iterable[Block]) -> list[Vec]:
+        """Return the positions of all voxels set to one of these blocks.
+
+        The order of the result is unspecified.
+        """
+        block_set = frozenset(blocks)
+        return [
+            Vec(pos) for pos, block in self._grid.items()
+            if block in block_set
+        ]
+
+    def flood_fill(self, start: _grid_keys, blocks: Iterable[Block]) -> list[Vec]:
+        """Find all voxels connected to the start position through the given blocks.
+
+        Only the 6 orthogonal neighbours are considered to be connected.
+        If the start position isn't one of these, nothing is returned.
+        The order of the result is unspecified.
+        """
+        block_set = frozenset(blocks)
+        start_key = _conv_key(start)
+        if self[start_key] not in block_set:
+            return []
+        found = {start_key}
+        queue = deque([start_key])
+        while queue:
+            x, y, z = queue.popleft()
+            for key in [
+                (x + 1, y, z), (x - 1, y, z),
+                (x, y + 1, z), (x, y - 1, z),
+                (x, y, z + 1), (x, y, z - 1),
+            ]:
+                if key not in found and self[key] in block_set:
+                    found.add(key)
+                    queue.append(key)
+        return list(map(Vec, found))
+
+    def read_from_map(self, vmf: VMF, has_attr: dict[str, bool], items: Mapping[str, editoritems.Item]) -> None:
         """Given the map file, set blocks."""
         from precomp.instance_traits import get_item_id
         from precomp import bottomlessPit
@@ -489,7 +558,373 @@ class Grid(MutableMapping[_grid_keys, Block]):
             )
 
 
+def _dense_index(x: float, y: float, z: float) -> int | None:
+    """Compute the index of this position in the DenseGrid array.
+
+    None is returned if it is not an integer position, or outside the array.
+    """
+    try:
+        ix, iy, iz = int(x), int(y), int(z)
+    except (ValueError, OverflowError):  # NaN/infinity
+        return None
+    if ix != x or iy != y or iz != z:
+        return None
+    ix -= DENSE_MIN
+    iy -= DENSE_MIN
+    iz -= DENSE_MIN
+    if 0 <= ix < DENSE_SIZE and 0 <= iy < DENSE_SIZE and 0 <= iz < DENSE_SIZE:
+        return (ix * DENSE_SIZE + iy) * DENSE_SIZE + iz
+    return None
+
+
+def _dense_coords(index: int) -> tuple[int, int, int]:
+    """Convert an array index back into the (offset) x, y, z position."""
+    x, rem = divmod(index, DENSE_SIZE * DENSE_SIZE)
+    y, z = divmod(rem, DENSE_SIZE)
+    return x, y, z
+
+
+def _dense_pos(key: int | tuple[float, float, float]) -> Vec:
+    """Convert a DenseGrid key into the position it represents."""
+    if isinstance(key, int):
+        x, y, z = _dense_coords(key)
+        return Vec(x + DENSE_MIN, y + DENSE_MIN, z + DENSE_MIN)
+    return Vec(key)
+
+
+def _code_table(blocks: Iterable[Block]) -> bytes:
+    """Build a translation table, mapping array codes for these blocks to 1 and others to 0."""
+    table = bytearray(256)
+    for block in blocks:
+        table[DENSE_CODES[block]] = 1
+    return bytes(table)
+
+
+class _DenseItemsView(ItemsView[Vec, Block]):
+    """Implements the DenseGrid.items() view, providing a view over the pos, block pairs."""
+    # Initialised by superclass.
+    _mapping: DenseGrid
+
+    def __init__(self, grid: DenseGrid) -> None:
+        super().__init__(grid)
+
+    def __contains__(self, item: Any) -> bool:
+        pos, block = item
+        return pos in self._mapping and block is self._mapping[pos]
+
+    def __iter__(self) -> Iterator[tuple[Vec, Block]]:
+        for key, block in self._mapping._blocks.items():
+            yield (_dense_pos(key), block)
+
+
+class DenseGrid(Grid):
+    """A grid which stores voxels in a flat array, instead of a dict.
+
+    This behaves identically to Grid, including iteration order, but makes
+    raycasts, flood fills and finding blocks much cheaper. Positions outside
+    the array bounds, or non-integer positions are stored separately.
+    """
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        # Each byte is the code of the block at that position.
+        self._cells = bytearray(DENSE_SIZE ** 3)
+        # Each key, mapped to its block. This keeps insertion order for iteration,
+        # and also stores positions outside the array. Keys in the array are
+        # stored as the index, others as the position tuple.
+        self._blocks: dict[int | tuple[float, float, float], Block] = {}
+
+    def _lookup(self, x: float, y: float, z: float) -> Block:
+        """Find the block at a position."""
+        index = _dense_index(x, y, z)
+        if index is not None:
+            return DENSE_BLOCKS[self._cells[index]]
+        return self._blocks.get((x, y, z), Block.VOID)
+
+    def _store(self, x: float, y: float, z: float, value: Block) -> None:
+        """Set the block at a position."""
+        if type(value) is not Block:
+            raise ValueError(f'Must be set to a Block item, not "{type(value).__name__}"!')
+        index = _dense_index(x, y, z)
+        if index is not None:
+            self._cells[index] = DENSE_CODES[value]
+            self._blocks[index] = value
+        else:
+            self._blocks[x, y, z] = value
+
+    def _raycast_code(
+        self,
+        x: float, y: float, z: float,
+        dx: float, dy: float, dz: float,
+        collide: bytes,
+    ) -> Vec:
+        """Perform a raycast, with collide as a table from _code_table()."""
+        cells = self._cells
+        start_pos = Vec(x, y, z)
+        index = _dense_index(x, y, z)
+        if index is not None and _dense_index(dx, dy, dz) is not None:
+            # Integer direction, so we can step through the array directly.
+            # Compute how far we can go before leaving the array.
+            limit = 90
+            for pos, delta in [(x, dx), (y, dy), (z, dz)]:
+                pos -= DENSE_MIN
+                if delta > 0:
+                    limit = min(limit, int(DENSE_SIZE - 1 - pos) // int(delta))
+                elif delta < 0:
+                    limit = min(limit, int(pos) // int(-delta))
+            stride = int((dx * DENSE_SIZE + dy) * DENSE_SIZE + dz)
+            for i in range(limit):
+                code = cells[index + stride]
+                if not code or code == _VOID_CODE:
+                    break
+                if collide[code]:
+                    return Vec(x + dx * i, y + dy * i, z + dz * i)
+                index += stride
+            else:
+                i = limit
+            # Hit VOID or the edge, continue with the general case for the error/sparse blocks.
+            x += dx * i
+            y += dy * i
+            z += dz * i
+            steps = 90 - i
+        else:
+            steps = 90
+        for i in range(steps):
+            next_x, next_y, next_z = x + dx, y + dy, z + dz
+            block = self._lookup(next_x, next_y, next_z)
+            if block is Block.VOID:
+                raise ValueError(
+                    'Reached VOID at ({}) when '
+                    'raycasting from {} with direction {}!'.format(
+                        Vec(next_x, next_y, next_z), start_pos, Vec(dx, dy, dz),
+                    )
+                )
+            if collide[DENSE_CODES[block]]:
+                return Vec(x, y, z)
+            x, y, z = next_x, next_y, next_z
+        else:
+            raise ValueError('Moved too far! (> 90)')
+
+    def raycast(
+        self,
+        pos: _grid_keys,
+        direction: Vec,
+        collide: Iterable[Block]=DEFAULT_COLLIDE,
+    ) -> Vec:
+        """Move in a direction until hitting a block of a certain type.
+
+        See Grid.raycast().
+        """
+        x, y, z = _conv_key(pos)
+        dx, dy, dz = direction
+        return self._raycast_code(x, y, z, dx, dy, dz, _code_table(collide))
+
+    def raycast_many(
+        self,
+        positions: Iterable[_grid_keys],
+        directions: Iterable[Vec],
+        collide: Iterable[Block]=DEFAULT_COLLIDE,
+    ) -> list[Vec]:
+        """Perform many raycasts at once, pairing up each position and direction.
+
+        See Grid.raycast_many().
+        """
+        positions = list(positions)
+        directions = list(directions)
+        if len(positions) != len(directions):
+            raise ValueError(
+                f'Got {len(positions)} positions, '
+                f'but {len(directions)} directions!'
+            )
+        table = _code_table(collide)
+        result = []
+        for pos, (dx, dy, dz) in zip(positions, directions):
+            x, y, z = _conv_key(pos)
+            result.append(self._raycast_code(x, y, z, dx, dy, dz, table))
+        return result
+
+    def lookup_world(self, pos: Iterable[float]) -> Block:
+        """Lookup a world position."""
+        x, y, z = world_to_grid(Vec(pos))
+        return self._lookup(x, y, z)
+
+    def __getitem__(self, pos: _grid_keys) -> Block:
+        x, y, z = _conv_key(pos)
+        return self._lookup(x, y, z)
+
+    def __setitem__(self, pos: _grid_keys, value: Block) -> None:
+        x, y, z = _conv_key(pos)
+        self._store(x, y, z, value)
+
+    def set_world(self, pos: Iterable[float], value: Block) -> None:
+        """Set a world position."""
+        x, y, z = world_to_grid(Vec(pos))
+        self._store(x, y, z, value)
+
+    def __delitem__(self, pos: _grid_keys) -> None:
+        x, y, z = _conv_key(pos)
+        index = _dense_index(x, y, z)
+        if index is not None:
+            if not self._cells[index]:
+                raise KeyError((x, y, z))
+            self._cells[index] = 0
+            del self._blocks[index]
+        else:
+            del self._blocks[x, y, z]
+
+    def __contains__(self, pos: object) -> bool:
+        try:
+            x, y, z = _conv_key(pos)  # type: ignore
+        except (TypeError, ValueError):
+            return False
+        index = _dense_index(x, y, z)
+        if index is not None:
+            return self._cells[index] != 0
+        return (x, y, z) in self._blocks
+
+    def __iter__(self) -> Iterator[Vec]:
+        yield from map(_dense_pos, self._blocks)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def items(self) -> ItemsView[Vec, Block]:
+        """Return a view over the grid items."""
+        return _DenseItemsView(self)
+
+    def find_blocks(self, blocks: Iterable[Block]) -> list[Vec]:
+        """Return the positions of all voxels set to one of these blocks.
+
+        The order of the result is unspecified.
+        """
+        block_set = frozenset(blocks)
+        # Translate to a mask of 1/0, then find() can skip through in C.
+        mask = self._cells.translate(_code_table(block_set))
+        found = []
+        index = mask.find(1)
+        while index != -1:
+            found.append(_dense_pos(index))
+            index = mask.find(1, index + 1)
+        for key, block in self._blocks.items():
+            if not isinstance(key, int) and block in block_set:
+                found.append(Vec(key))
+        return found
+
+    def flood_fill(self, start: _grid_keys, blocks: Iterable[Block]) -> list[Vec]:
+        """Find all voxels connected to the start position through the given blocks.
+
+        See Grid.flood_fill().
+        """
+        x, y, z = _conv_key(start)
+        start_ind = _dense_index(x, y, z)
+        if start_ind is None:
+            return super().flood_fill(start, blocks)
+        block_set = frozenset(blocks)
+        table = _code_table(block_set)
+        cells = self._cells
+        if not table[cells[start_ind]]:
+            return []
+        # If nothing is stored outside the array, neighbours beyond the edge are void
+        # and can be skipped. Otherwise, if we reach the edge use the generic version.
+        has_sparse = len(self._blocks) != len(cells) - cells.count(0)
+        last = DENSE_SIZE - 1
+        found = bytearray(len(cells))
+        found[start_ind] = 1
+        queue = deque([start_ind])
+        result = []
+        while queue:
+            index = queue.popleft()
+            result.append(index)
+            px, py, pz = _dense_coords(index)
+            for neighbour, valid in [
+                (index + DENSE_SIZE * DENSE_SIZE, px != last),
+                (index - DENSE_SIZE * DENSE_SIZE, px != 0),
+                (index + DENSE_SIZE, py != last),
+                (index - DENSE_SIZE, py != 0),
+                (index + 1, pz != last),
+                (index - 1, pz != 0),
+            ]:
+                if not valid:
+                    if has_sparse:
+                        return super().flood_fill(start, block_set)
+                elif not found[neighbour] and table[cells[neighbour]]:
+                    found[neighbour] = 1
+                    queue.append(neighbour)
+        return list(map(_dense_pos, result))
+
+    def fill_air(self, search_locs: Iterable[tuple[Vec, bool]]) -> None:
+        """Flood-fill the area, making all inside spaces air or goo.
+
+        See Grid.fill_air(), this produces identical results.
+        """
+        queue: deque[tuple[int, bool]] = deque()
+        search_locs = list(search_locs)
+        for pos, is_goo in search_locs:
+            index = _dense_index(*pos)
+            if index is None:
+                # Unusual position, use the generic implementation.
+                super().fill_air(search_locs)
+                return
+            queue.append((index, is_goo))
+
+        cells = self._cells
+        blocks = self._blocks
+        goo_fillable = {
+            DENSE_CODES[block]
+            for block in [
+                Block.AIR,
+                Block.OCCUPIED,
+                Block.PIT_BOTTOM,
+                Block.PIT_MID,
+                Block.PIT_TOP,
+                Block.PIT_SINGLE,
+            ]
+        }
+        # The leak bounds, converted to array coordinates.
+        # The neighbours of positions within are still inside the array.
+        bound_min = -15 - DENSE_MIN
+        bound_max = 40 - DENSE_MIN
+        x_stride = DENSE_SIZE * DENSE_SIZE
+        y_stride = DENSE_SIZE
+
+        while queue:
+            index, is_goo = queue.popleft()
+            code = cells[index]
+            # Already set. But allow the goo to fill certain types.
+            if code and not (is_goo and code in goo_fillable):
+                continue
+
+            x, y, z = _dense_coords(index)
+            if not (
+                bound_min <= x <= bound_max and
+                bound_min <= y <= bound_max and
+                bound_min <= z <= bound_max
+            ):
+                raise user_errors.UserError(user_errors.TOK_BRUSHLOC_LEAK)
+
+            if is_goo:
+                block = DENSE_BLOCKS[code]
+                if block.is_pit:
+                    block = Block.from_pitgoo_attr(False, block.is_top, block.is_bottom)
+                elif DENSE_BLOCKS[cells[index - y_stride]].is_solid:
+                    block = Block.GOO_BOTTOM
+                else:
+                    block = Block.GOO_MID
+            else:
+                block = Block.AIR
+            cells[index] = DENSE_CODES[block]
+            blocks[index] = block
+
+            # Continue filling in each other direction.
+            # But not up for goo.
+            if not is_goo:
+                queue.append((index + 1, is_goo))
+            queue.append((index + y_stride, is_goo))
+            queue.append((index - y_stride, is_goo))
+            queue.append((index + x_stride, is_goo))
+            queue.append((index - x_stride, is_goo))
+            queue.append((index - 1, is_goo))
+
+
 # Grid position -> block mapping.
 # Generally between (-1 -1 -1) and (26 26 26), but can be outside (embedded spaces).
 # Unset spaces are assumed to be void.
-POS = Grid()
+POS: Grid = DenseGrid()
@@ -1,5 +1,5 @@
 """Records the collisions for each item."""
-from typing import Dict, List
+from typing import Dict, Iterable, List
 
 import attrs
 from srctools import Entity, Matrix, VMF, Vec
@@ -10,7 +10,17 @@ from editoritems import Item
 from tree import RTree
 
 
-__all__ = ['CollideType', 'BBox', 'Collisions']
+__all__ = ['CollideType', 'BBox', 'Collisions', 'item_collisions']
+
+
+def item_collisions(item: Item, inst: Entity) -> List[BBox]:
+    """Compute the default collisions from an item definition for this instance."""
+    origin = Vec.from_str(inst['origin'])
+    orient = Matrix.from_angstr(inst['angles'])
+    return [
+        (coll @ orient + origin).with_attrs(name=inst['targetname'])
+        for coll in item.collisions
+    ]
 
 
 @attrs.define
@@ -30,6 +40,25 @@ class Collisions:
         if bbox not in lst:
             lst.append(bbox)
 
+    def add_many(self, bboxes: Iterable[BBox]) -> None:
+        """Add all the given bounding boxes to the map.
+
+        If no collisions have been added yet, this packs the tree in one go which is more efficient.
+        """
+        bboxes = list(bboxes)
+        for bbox in bboxes:
+            if not bbox.name:
+                raise ValueError(f'Collision {bbox!r} must have a name to be inserted!')
+        if not self._by_name:
+            self._by_bbox = RTree.bulk_load((bbox.mins, bbox.maxes, bbox) for bbox in bboxes)
+        else:
+            for bbox in bboxes:
+                self._by_bbox.insert(bbox.mins, bbox.maxes, bbox)
+        for bbox in bboxes:
+            lst = self._by_name.setdefault(bbox.name.casefold(), [])
+            if bbox not in lst:
+                lst.append(bbox)
+
     def remove_bbox(self, bbox: BBox) -> None:
         """Remove the given bounding box from the map."""
         if not bbox.name:
@@ -50,10 +79,8 @@ class Collisions:
 
     def add_item_coll(self, item: Item, inst: Entity) -> None:
         """Add the default collisions from an item definition for this instance."""
-        origin = Vec.from_str(inst['origin'])
-        orient = Matrix.from_angstr(inst['angles'])
-        for coll in item.collisions:
-            self.add((coll @ orient + origin).with_attrs(name=inst['targetname']))
+        for bbox in item_collisions(item, inst):
+            self.add(bbox)
 
     def dump(self, vmf: VMF, vis_name: str = 'Collisions') -> None:
         """Dump all the bounding boxes as a set of brushes."""
@@ -28,6 +28,7 @@ only parsing configuration options once, and is expected to be used with a
 closure.
 """
 from __future__ import annotations
+import csv
 import functools
 import inspect
 import io
@@ -35,6 +36,7 @@ import importlib
 import math
 import pkgutil
 import sys
+import time
 import typing
 import warnings
 from collections import defaultdict
@@ -50,9 +52,10 @@ from srctools import (
     VMF, Entity, Output, Solid, Angle, Matrix,
 )
 
-from precomp import instanceLocs, rand, collisions
+from precomp import instanceLocs, rand, collisions, options
 from precomp.corridor import Info as MapInfo
 import consts
+import profiler
 import utils
 
 
@@ -93,6 +96,17 @@ class SWITCH_TYPE(Enum):
     ALL = 'all'  # Run all matching commands
 
 
+class FlagScope(Enum):
+    """What the result of a flag depends on, so it can be reused for other instances.
+
+    Global state can only be changed by results, so global flags are checked
+    again once any result has run.
+    """
+    GLOBAL = 0  # Only global state like stylevars, not the instance.
+    FILE = 1  # Only the filename of the instance.
+    INSTANCE = 2  # Anything else about the instance.
+
+
 xp = Vec_tuple(1, 0, 0)
 xn = Vec_tuple(-1, 0, 0)
 yp = Vec_tuple(0, 1, 0)
@@ -185,6 +199,266 @@ class Unsatisfiable(Exception):
 RES_EXHAUSTED = object()
 
 
+class InstanceIndex:
+    """Tracks the func_instances in the map by their casefolded filename.
+
+    This allows conditions which only apply to specific instance files to skip
+    checking every other instance. New and removed instances are picked up
+    automatically when syncing, but if code changes the file of an instance
+    which already exists, refresh() must be called.
+    """
+    def __init__(self) -> None:
+        self._by_file: dict[str, set[Entity]] = defaultdict(set)
+        self._file_of: dict[Entity, str] = {}
+        # Instances whose file was changed since the last sync.
+        self._changed: list[Entity] = []
+
+    def clear(self) -> None:
+        """Remove all instances from the index."""
+        self._by_file.clear()
+        self._file_of.clear()
+        self._changed.clear()
+
+    def sync(self, instances: typing.AbstractSet[Entity]) -> None:
+        """Add new instances and remove deleted ones, given the current set in the map."""
+        for inst in self._file_of.keys() - instances:
+            self._by_file[self._file_of.pop(inst)].discard(inst)
+        for inst in instances - self._file_of.keys():
+            self._file_of[inst] = filename = inst['file'].casefold()
+            self._by_file[filename].add(inst)
+        self._changed.clear()
+
+    def refresh(self, inst: Entity) -> None:
+        """Update the index after the file of this instance was modified."""
+        try:
+            old_file = self._file_of[inst]
+        except KeyError:
+            return  # Not added yet, it'll be picked up by sync().
+        filename = inst['file'].casefold()
+        if filename != old_file:
+            self._by_file[old_file].discard(inst)
+            self._by_file[filename].add(inst)
+            self._file_of[inst] = filename
+            self._changed.append(inst)
+
+    def get_file(self, inst: Entity) -> str | None:
+        """Return the filename this instance is indexed with."""
+        return self._file_of.get(inst)
+
+    def matching(self, files: typing.Collection[str]) -> set[Entity]:
+        """Return all indexed instances using one of these files."""
+        return set().union(*[
+            self._by_file[filename]
+            for filename in files
+            if filename in self._by_file
+        ])
+
+    def iter_matching(
+        self,
+        instances: typing.AbstractSet[Entity],
+        files: typing.Collection[str],
+    ) -> typing.Iterator[Entity]:
+        """Iterate over the instances which use one of the given files.
+
+        Instances are produced in the same order as iterating the VMF's CopySet
+        would, including instances added during iteration. If an instance not yet
+        visited is changed to one of these files, it will be produced too.
+        """
+        self.sync(instances)
+        # Same as CopySet.__iter__().
+        snapshot = frozenset(instances)
+        yield from self._iter_subset(snapshot, files)
+        self.sync(instances)
+        yield from self._iter_subset(instances - snapshot, files)
+
+    def _iter_subset(
+        self,
+        ents: typing.AbstractSet[Entity],
+        files: typing.Collection[str],
+    ) -> typing.Iterator[Entity]:
+        """Iterate over matching instances in ents, in the order of ents."""
+        todo = list(filter(self.matching(files).__contains__, ents))
+        mark = len(self._changed)
+        i = 0
+        while i < len(todo):
+            inst = todo[i]
+            i += 1
+            yield inst
+            if len(self._changed) != mark:
+                changed = self._changed[mark:]
+                mark = len(self._changed)
+                if any(self._file_of[changed_inst] in files for changed_inst in changed):
+                    # Another instance may now match. Recompute the remainder, so
+                    # it is included only if it's after our current position.
+                    ent_iter = iter(ents)
+                    for skipped in ent_iter:
+                        if skipped is inst:
+                            break
+                    todo = list(filter(self.matching(files).__contains__, ent_iter))
+                    i = 0
+
+    def check(self, instances: typing.Iterable[Entity]) -> list[Entity]:
+        """Verify the index is correct, returning and fixing any out of date instances."""
+        wrong = [
+            inst for inst in instances
+            if self._file_of.get(inst, inst['file'].casefold()) != inst['file'].casefold()
+        ]
+        for inst in wrong:
+            self.refresh(inst)
+        return wrong
+
+
+# Index of the instances in the map, for conditions beginning with an instance flag.
+INST_INDEX = InstanceIndex()
+
+
+@attrs.define
+class CostStats:
+    """The cost of a condition, flag or result."""
+    calls: int = 0
+    passed: int = 0
+    time: float = 0.0
+
+
+class ConditionStats:
+    """Records the cost of each condition, if enabled with the condition_stats option."""
+    def __init__(self) -> None:
+        # For conditions, calls is the number of instances visited, and passed
+        # is the number which passed the first flag.
+        self.conditions: dict[int, CostStats] = {}
+        self.cond_names: dict[int, str] = {}
+        self.flags: dict[str, CostStats] = defaultdict(CostStats)
+        self.results: dict[str, CostStats] = defaultdict(CostStats)
+
+    def condition(self, condition: Condition) -> CostStats:
+        """Get the stats for a condition."""
+        try:
+            return self.conditions[id(condition)]
+        except KeyError:
+            self.cond_names[id(condition)] = f'#{len(self.conditions)} {condition.source or "<unknown>"}'
+            stats = self.conditions[id(condition)] = CostStats()
+            return stats
+
+    def rows(self) -> list[tuple[str, str, CostStats]]:
+        """Return all the stats, slowest first."""
+        rows = [
+            ('condition', self.cond_names[key], stats)
+            for key, stats in self.conditions.items()
+        ]
+        rows += [('flag', name, stats) for name, stats in self.flags.items()]
+        rows += [('result', name, stats) for name, stats in self.results.items()]
+        rows.sort(key=lambda row: row[2].time, reverse=True)
+        return rows
+
+    def log(self, count: int = 20) -> None:
+        """Log the slowest entries."""
+        LOGGER.info('Slowest conditions, flags and results:\n{}', '\n'.join([
+            f'{stats.time * 1000:9.2f}ms {stats.calls:7} calls {stats.passed:7} passed  {kind} {name}'
+            for kind, name, stats in self.rows()[:count]
+        ]))
+
+    def write_csv(self, filename: str) -> None:
+        """Write all the stats to a CSV file."""
+        try:
+            with open(filename, 'w', newline='', encoding='utf8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['kind', 'name', 'calls', 'passed', 'time_ms'])
+                for kind, name, stats in self.rows():
+                    writer.writerow([kind, name, stats.calls, stats.passed, f'{stats.time * 1000:.3f}'])
+        except OSError:
+            LOGGER.warning('Could not write condition stats:', exc_info=True)
+
+
+# Set by check_all() if the condition_stats option is enabled.
+STATS: ConditionStats | None = None
+
+
+def flag_scope(flag: Property) -> FlagScope:
+    """Determine what the result of a flag depends on."""
+    name = flag.name
+    if name[:1] == '!':
+        name = name[1:]
+    try:
+        scope = FLAG_LOOKUP[name].scope
+    except KeyError:
+        return FlagScope.INSTANCE
+    if scope is not None:
+        return scope
+    # Logical flags depend on whatever their sub-flags do.
+    if not flag.has_children():
+        return FlagScope.INSTANCE
+    return max(map(flag_scope, flag), key=lambda sub_scope: sub_scope.value, default=FlagScope.GLOBAL)
+
+
+class CompiledFlag:
+    """A flag in a condition, with the lookup and inversion handled ahead of time.
+
+    If the flag doesn't depend on the specific instance, the result is reused.
+    """
+    __slots__ = ['flag', 'name', 'desired', 'can_skip', 'scope', '_func', '_bound', '_global', '_by_file']
+
+    def __init__(self, flag: Property, can_skip: bool) -> None:
+        self.flag = flag
+        self.name = flag.name
+        # If starting with '!', invert the result.
+        if self.name[:1] == '!':
+            self.desired = False
+            can_skip = False  # This doesn't work.
+            self.name = self.name[1:]
+        else:
+            self.desired = True
+        self.can_skip = can_skip
+        self.scope = flag_scope(flag)
+        self._func = FLAG_LOOKUP.get(self.name)
+        self._bound: FlagCallable | None = None
+        self._global: bool | None = None
+        self._by_file: dict[str, bool] = {}
+
+    def reset(self) -> None:
+        """Discard the global result, since a result may have changed global state."""
+        self._global = None
+
+    def check(self, vmf: VMF, coll: collisions.Collisions, info: MapInfo, inst: Entity) -> bool:
+        """Determine the result of the flag, the same as check_flag()."""
+        if self._func is None:
+            # Invalid, let check_flag() report the error.
+            return check_flag(self.flag, coll, info, inst, self.can_skip, vmf)
+        if self.scope is FlagScope.GLOBAL:
+            if self._global is None:
+                self._global = self._evaluate(vmf, coll, info, inst)
+            return self._global
+        elif self.scope is FlagScope.FILE:
+            filename = inst['file'].casefold()
+            try:
+                return self._by_file[filename]
+            except KeyError:
+                res = self._by_file[filename] = self._evaluate(vmf, coll, info, inst)
+                return res
+        else:
+            return self._evaluate(vmf, coll, info, inst)
+
+    def _evaluate(self, vmf: VMF, coll: collisions.Collisions, info: MapInfo, inst: Entity) -> bool:
+        """Actually call the flag."""
+        assert self._func is not None
+        start = time.perf_counter() if STATS is not None else 0.0
+        try:
+            if self._bound is None:
+                self._bound = self._func.bind(vmf, coll, info, self.flag)
+            res = self._bound(inst)
+        except Unsatisfiable:
+            if self.can_skip:
+                raise
+            else:
+                return not self.desired
+        if STATS is not None:
+            stats = STATS.flags[self.name]
+            stats.calls += 1
+            stats.time += time.perf_counter() - start
+            if res is self.desired:
+                stats.passed += 1
+        return res is self.desired
+
+
 @attrs.define
 class Condition:
     """A single condition which may be evaluated."""
@@ -193,6 +467,8 @@ class Condition:
     else_results: list[Property] = attrs.Factory(list)
     priority: Decimal = Decimal()
     source: str = None
+    # Set by compile() while check_all() runs this condition.
+    _compiled: list[CompiledFlag] | None = attrs.field(default=None, init=False, repr=False, eq=False)
 
     @classmethod
     def parse(cls, prop_block: Property, *, toplevel: bool) -> Condition:
@@ -259,7 +535,17 @@ class Condition:
                 # Delete this so it doesn't re-fire..
                 return RES_EXHAUSTED
         else:
-            return cond_call(coll, info, inst, res)
+            start = time.perf_counter()
+            try:
+                return cond_call(coll, info, inst, res)
+            finally:
+                # This includes nested conditions.
+                duration = time.perf_counter() - start
+                profiler.add_time('result', res.name, duration)
+                if STATS is not None:
+                    stats = STATS.results[res.name]
+                    stats.calls += 1
+                    stats.time += duration
 
     def test(self, coll: collisions.Collisions, info: MapInfo, inst: Entity) -> None:
         """Try to satisfy this condition on the given instance.
@@ -267,19 +553,87 @@ class Condition:
         If we find that no instance will succeed, raise Unsatisfiable.
         """
         success = True
-        # Only the first one can cause this condition to be skipped.
-        # We could have a situation where the first flag modifies the map
-        # such that it becomes satisfiable later, so this would be premature.
-        # If we have else results, we also can't skip because those could modify state.
-        for i, flag in enumerate(self.flags):
-            if not check_flag(flag, coll, info, inst, can_skip=i==0 and not self.else_results):
-                success = False
-                break
+        stats = STATS.condition(self) if STATS is not None else None
+        if stats is not None:
+            stats.calls += 1
+        compiled = self._compiled
+        if compiled is not None:
+            vmf = inst.map
+            for i, comp_flag in enumerate(compiled):
+                if not comp_flag.check(vmf, coll, info, inst):
+                    success = False
+                    break
+                if i == 0 and stats is not None:
+                    stats.passed += 1
+        else:
+            # Only the first one can cause this condition to be skipped.
+            # We could have a situation where the first flag modifies the map
+            # such that it becomes satisfiable later, so this would be premature.
+            # If we have else results, we also can't skip because those could modify state.
+            for i, flag in enumerate(self.flags):
+                if not check_flag(flag, coll, info, inst, can_skip=i==0 and not self.else_results):
+                    success = False
+                    break
+                if i == 0 and stats is not None:
+                    stats.passed += 1
+        if not self.flags and stats is not None:
+            stats.passed += 1
         results = self.results if success else self.else_results
+        if results and compiled is not None:
+            # The results could change global state.
+            for comp_flag in compiled:
+                comp_flag.reset()
         for res in results[:]:
             should_del = self.test_result(coll, info, inst, res)
             if should_del is RES_EXHAUSTED:
                 results.remove(res)
+        if results:
+            # The results may have changed the file.
+            INST_INDEX.refresh(inst)
+
+    def compile(self) -> None:
+        """Look up the flags ahead of time, so this doesn't need to be done for each instance.
+
+        This also discards results reused from a previous run, so it should be
+        called each time before the condition is run.
+        """
+        self._compiled = [
+            CompiledFlag(flag, can_skip=i == 0 and not self.else_results)
+            for i, flag in enumerate(self.flags)
+        ]
+
+    def scope(self) -> FlagScope:
+        """Return the widest scope of all the flags."""
+        return max(map(flag_scope, self.flags), key=lambda scope: scope.value, default=FlagScope.GLOBAL)
+
+    def test_global(self, vmf: VMF, coll: collisions.Collisions, info: MapInfo) -> bool:
+        """Check flags which only depend on global state, without an instance.
+
+        The condition must be compiled, and all flags must be global.
+        """
+        assert self._compiled is not None, 'Not compiled!'
+        # The entity shouldn't be used by these flags. Pass a dummy object
+        # so errors occur if it is.
+        dummy = cast(Entity, object())
+        for comp_flag in self._compiled:
+            if comp_flag.scope is not FlagScope.GLOBAL:
+                raise ValueError(f'Flag "{comp_flag.flag.real_name}" is not global!')
+            if not comp_flag.check(vmf, coll, info, dummy):
+                return False
+        return True
+
+    def indexed_files(self) -> frozenset[str] | None:
+        """If this condition can only apply to specific instance files, return them.
+
+        This is the case if the first flag is an instance flag, and there are no else
+        results which would need to run on every other instance.
+        """
+        if not self.flags or self.else_results:
+            return None
+        flag = self.flags[0]
+        if flag.name != 'instance' or flag.has_children():
+            return None
+        return frozenset(instanceLocs.resolve(flag.value))
 
 
 AnnResT = TypeVar('AnnResT')
@@ -488,16 +842,18 @@ class CondCall(Generic[CallResultT]):
 
     This should be called to execute it.
     """
-    __slots__ = ['func', 'group', '_cback', '_setup_data']
+    __slots__ = ['func', 'group', 'scope', '_cback', '_setup_data']
     _setup_data: dict[int, Callable[[Entity], CallResultT]] | None
 
     def __init__(
         self,
         func: Callable[..., CallResultT | Callable[[Entity], CallResultT]],
         group: str,
+        scope: FlagScope | None = FlagScope.INSTANCE,
     ):
         self.func = func
         self.group = group
+        self.scope = scope
         cback, arg_order = annotation_caller(
             func,
             srctools.VMF, collisions.Collisions, MapInfo, Entity, Property,
@@ -516,10 +872,19 @@ class CondCall(Generic[CallResultT]):
     def __doc__(self) -> str:  # type: ignore  # object.__doc__ is not a property.
         return self.func.__doc__
 
-    def __call__(self, coll: collisions.Collisions, info: MapInfo, ent: Entity, conf: Property) -> CallResultT:
-        """Execute the callback."""
+    def __call__(
+        self,
+        coll: collisions.Collisions, info: MapInfo, ent: Entity, conf: Property,
+        vmf: VMF | None = None,
+    ) -> CallResultT:
+        """Execute the callback.
+
+        The VMF is normally the entity's map, but must be passed if the entity is a placeholder.
+        """
+        if vmf is None:
+            vmf = ent.map
         if self._setup_data is None:
-            return self._cback(ent.map, coll, info, ent, conf)  # type: ignore
+            return self._cback(vmf, coll, info, ent, conf)  # type: ignore
         else:
             # Execute setup functions if required.
             try:
@@ -528,7 +893,7 @@ class CondCall(Generic[CallResultT]):
                 # The entity should never be used in setup functions. Pass a dummy object
                 # so errors occur if it's used.
                 cback = self._setup_data[id(conf)] = self._cback(
-                    ent.map, coll, info,
+                    vmf, coll, info,
                     cast(Entity, object()),
                     conf,
                 )
@@ -543,6 +908,43 @@ class CondCall(Generic[CallResultT]):
 
             return cback(ent)
 
+    def bind(
+        self,
+        vmf: VMF, coll: collisions.Collisions, info: MapInfo, conf: Property,
+    ) -> Callable[[Entity], CallResultT]:
+        """Return a function which executes the callback with this configuration.
+
+        Setup functions are run immediately if required. The returned function
+        should be called right away, since if this turns out not to be a setup
+        function the first call returns the result already computed.
+        """
+        func = self._cback
+        if self._setup_data is not None:
+            try:
+                cback = self._setup_data[id(conf)]
+            except KeyError:
+                cback = self._setup_data[id(conf)] = func(
+                    vmf, coll, info,
+                    cast(Entity, object()),
+                    conf,
+                )
+            if callable(cback):
+                return cback
+            # Not a setup function, see __call__(). We already have the first result,
+            # so don't evaluate it again.
+            self._setup_data = None
+            first_pending = True
+
+            def call_first(ent: Entity) -> CallResultT:
+                """Return the first result, then call the function normally."""
+                nonlocal first_pending
+                if first_pending:
+                    first_pending = False
+                    return cback  # type: ignore
+                return func(vmf, coll, info, ent, conf)  # type: ignore
+            return call_first
+        return lambda ent: func(vmf, coll, info, ent, conf)
+
 
 def _get_cond_group(func: Any) -> str:
     """Get the condition group hint for a function."""
@@ -596,10 +998,18 @@ def meta_cond(priority: int | Decimal=0, only_once: bool=True) -> Callable[[Call
     return x
 
 
-def make_flag(orig_name: str, *aliases: str) -> Callable[[CallableT], CallableT]:
-    """Decorator to add flags to the lookup."""
+def make_flag(
+    orig_name: str, *aliases: str,
+    scope: FlagScope | None = FlagScope.INSTANCE,
+) -> Callable[[CallableT], CallableT]:
+    """Decorator to add flags to the lookup.
+
+    The scope specifies what the flag depends on, allowing the result to be reused
+    for other instances. If None, the flag combines sub-flags, and depends on
+    whatever those do.
+    """
     def x(func: CallableT) -> CallableT:
-        wrapper: CondCall[bool] = CondCall(func, _get_cond_group(func))
+        wrapper: CondCall[bool] = CondCall(func, _get_cond_group(func), scope)
         ALL_FLAGS.append((orig_name, aliases, wrapper))
         name = orig_name.casefold()
         if name in FLAG_LOOKUP:
@@ -675,6 +1085,8 @@ def add(prop_block: Property) -> None:
 
 def check_all(vmf: VMF, coll: collisions.Collisions, info: MapInfo) -> None:
     """Check all conditions."""
+    global STATS
+    STATS = ConditionStats() if options.get(bool, 'condition_stats') else None
     ALL_INST.update({
         inst['file'].casefold()
         for inst in vmf.by_class['func_instance']
@@ -692,33 +1104,42 @@ def check_all(vmf: VMF, coll: collisions.Collisions, info: MapInfo) -> None:
 
     LOGGER.info('Checking Conditions...')
     LOGGER.info('-----------------------')
-    skipped_cond = 0
+    skipped_cond = indexed_cond = global_cond = 0
+    all_inst = vmf.by_class['func_instance']
+    INST_INDEX.clear()
+    INST_INDEX.sync(all_inst)
     for condition in conditions:
+        start = time.perf_counter()
         with srctools.logger.context(condition.source or ''):
-            for inst in vmf.by_class['func_instance']:
-                try:
-                    condition.test(coll, info, inst)
-                except NextInstance:
-                    # NextInstance is raised to immediately stop running
-                    # this condition, and skip to the next instance.
-                    continue
-                except Unsatisfiable:
-                    # Unsatisfiable indicates this condition's flags will
-                    # never succeed, so just skip.
+            condition.compile()
+            inst_files = condition.indexed_files()
+            if inst_files is None:
+                global_only = (
+                    all_inst and not condition.else_results
+                    and condition.scope() is FlagScope.GLOBAL
+                )
+                if global_only:
+                    global_cond += 1
+                if global_only and not _check_global(condition, vmf, coll, info):
+                    # The flags are the same for every instance, so they failed for all.
                     skipped_cond += 1
-                    break
-                except EndCondition:
-                    # EndCondition is raised to immediately stop running
-                    # this condition, and skip to the next condition.
-                    break
-                except Exception:
-                    # Print the source of the condition if it fails...
-                    LOGGER.exception('Error in {}:', condition.source or 'condition')
-                    # Exit directly, so we don't print it again in the exception
-                    # handler
-                    utils.quit_app(1)
-                if not condition.results and not condition.else_results:
-                    break  # Condition has run out of results, quit early
+                elif _run_condition(condition, coll, info, all_inst):
+                    skipped_cond += 1
+            elif all_inst and ALL_INST.isdisjoint(inst_files):
+                # The instance flag would raise Unsatisfiable on the first instance.
+                skipped_cond += 1
+            else:
+                # Only visit the instances the first flag could match.
+                indexed_cond += 1
+                if _run_condition(
+                    condition, coll, info,
+                    INST_INDEX.iter_matching(all_inst, inst_files),
+                ):
+                    skipped_cond += 1
+        duration = time.perf_counter() - start
+        profiler.add_time('condition', condition.source or '<unknown>', duration)
+        if STATS is not None:
+            STATS.condition(condition).time += duration
 
         if utils.DEV_MODE:
             # Check ALL_INST is correct.
@@ -735,13 +1156,33 @@ def check_all(vmf: VMF, coll: collisions.Collisions, info: MapInfo) -> None:
                     extra.add(inst['file'].casefold())
             # Suppress errors for future conditions.
             ALL_INST.update(extra)
+            for inst in INST_INDEX.check(all_inst):
+                LOGGER.warning(
+                    'Condition "{}" doesn\'t refresh the instance index for "{}"!',
+                    condition.source,
+                    inst['file'],
+                )
 
     LOGGER.info('---------------------')
+    profiler.set_count('conditions', len(conditions))
+    profiler.set_count('conditions_skipped', skipped_cond)
     LOGGER.info(
         'Conditions executed, {}/{} ({:.0%}) skipped!',
         skipped_cond, len(conditions),
         skipped_cond/len(conditions),
     )
+    LOGGER.info(
+        '{}/{} conditions only checked matching instance files.',
+        indexed_cond, len(conditions),
+    )
+    LOGGER.info(
+        '{}/{} conditions only checked global flags once.',
+        global_cond, len(conditions),
+    )
+    if STATS is not None:
+        STATS.log()
+        STATS.write_csv('bee2/condition_stats.csv')
+        STATS = None
     import vbsp
     LOGGER.info('Map has attributes: {}', [
         key
@@ -758,14 +1199,66 @@ def check_all(vmf: VMF, coll: collisions.Collisions, info: MapInfo) -> None:
     LOGGER.info('Global instances: {}', GLOBAL_INSTANCES)
 
 
+def _run_condition(
+    condition: Condition,
+    coll: collisions.Collisions, info: MapInfo,
+    instances: typing.Iterable[Entity],
+) -> bool:
+    """Test a condition against each of the given instances.
+
+    Returns True if the condition was found to be unsatisfiable.
+    """
+    for inst in instances:
+        try:
+            condition.test(coll, info, inst)
+        except NextInstance:
+            # NextInstance is raised to immediately stop running
+            # this condition, and skip to the next instance.
+            continue
+        except Unsatisfiable:
+            # Unsatisfiable indicates this condition's flags will
+            # never succeed, so just skip.
+            return True
+        except EndCondition:
+            # EndCondition is raised to immediately stop running
+            # this condition, and skip to the next condition.
+            break
+        except Exception:
+            # Print the source of the condition if it fails...
+            LOGGER.exception('Error in {}:', condition.source or 'condition')
+            # Exit directly, so we don't print it again in the exception
+            # handler
+            utils.quit_app(1)
+        if not condition.results and not condition.else_results:
+            break  # Condition has run out of results, quit early
+    return False
+
+
+def _check_global(
+    condition: Condition,
+    vmf: VMF, coll: collisions.Collisions, info: MapInfo,
+) -> bool:
+    """Check a condition which only has global flags, returning if they passed."""
+    try:
+        return condition.test_global(vmf, coll, info)
+    except (Unsatisfiable, NextInstance, EndCondition):
+        # Since these are the same for every instance, none would run.
+        return False
+    except Exception:
+        LOGGER.exception('Error in {}:', condition.source or 'condition')
+        utils.quit_app(1)
+
+
 def check_flag(
     flag: Property,
     coll: collisions.Collisions, info: MapInfo,
     inst: Entity, can_skip: bool = False,
+    vmf: VMF | None = None,
 ) -> bool:
     """Determine the result for a condition flag.
 
     If can_skip is true, flags raising Unsatifiable will pass the exception through.
+    The VMF must be passed if the instance is a placeholder, when checking global flags.
     """
     name = flag.name
     # If starting with '!', invert the result.
@@ -787,14 +1280,24 @@ def check_flag(
             # Skip these conditions..
             return False
 
+    start = time.perf_counter() if STATS is not None else 0.0
     try:
-        res = func(coll, info, inst, flag)
+        if vmf is None:
+            res = func(coll, info, inst, flag)
+        else:
+            res = func(coll, info, inst, flag, vmf)
     except Unsatisfiable:
         if can_skip:
             raise
         else:
             return not desired_result
     else:
+        if STATS is not None:
+            stats = STATS.flags[name]
+            stats.calls += 1
+            stats.time += time.perf_counter() - start
+            if res is desired_result:
+                stats.passed += 1
         return res is desired_result
 
 
@@ -976,6 +1479,7 @@ def add_suffix(inst: Entity, suff: str) -> None:
     old_name, dot, ext = file.partition('.')
     inst['file'] = new_filename = ''.join((old_name, suff, dot, ext))
     ALL_INST.add(new_filename.casefold())
+    INST_INDEX.refresh(inst)
 
 
 def local_name(inst: Entity, name: str | Entity) -> str:
@@ -1380,6 +1884,7 @@ def make_static_pist(vmf: srctools.VMF, res: Property) -> Callable[[Entity], Non
             if val:  # Only if defined
                 ent['file'] = val
                 ALL_INST.add(val.casefold())
+                INST_INDEX.refresh(ent)
 
             logic_file = instances['logic_' + str(bottom_pos)]
             if logic_file:
@@ -1407,6 +1912,7 @@ def make_static_pist(vmf: srctools.VMF, res: Property) -> Callable[[Entity], Non
             if val:
                 ent['file'] = val
                 ALL_INST.add(val.casefold())
+                INST_INDEX.refresh(ent)
 
         # Add in the grating for the bottom as an overlay.
         # It's low to fit the piston at minimum, or higher if needed.
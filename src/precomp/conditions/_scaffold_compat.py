@@ -185,6 +185,7 @@ def legacy_scaffold_link(vmf: VMF) -> None:
                 new_file = conf.get('inst_' + orient, '')
                 if new_file:
                     node.inst['file'] = new_file
+                    conditions.INST_INDEX.refresh(node.inst)
 
                 if node.prev is None:
                     link_type = LinkType.START
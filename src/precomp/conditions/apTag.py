@@ -118,6 +118,7 @@ def ap_tag_modifications(vmf: VMF):
         if inst['file'].casefold() in transition_ents:
             inst['file'] = TRANSITION_ENTS
             conditions.ALL_INST.add(TRANSITION_ENTS.casefold())
+            conditions.INST_INDEX.refresh(inst)
 
     # Because of a bug in P2, these folders aren't created automatically.
     # We need a folder with the user's ID in portal2/maps/puzzlemaker.
@@ -237,6 +238,7 @@ def res_make_tag_fizzler(vmf: VMF, info: conditions.MapInfo, res: Property) -> c
         if disable_other or (blue_enabled and oran_enabled):
             inst['file'] = inst_frame_double
             conditions.ALL_INST.add(inst_frame_double.casefold())
+            conditions.INST_INDEX.refresh(inst)
             # On a wall, and pointing vertically
             if abs(inst_normal.z) < 0.01 and abs(inst_orient.left().z) > 0.01:
                 # They're vertical, make sure blue's on top!
@@ -253,6 +255,7 @@ def res_make_tag_fizzler(vmf: VMF, info: conditions.MapInfo, res: Property) -> c
         else:
             inst['file'] = inst_frame_single
             conditions.ALL_INST.add(inst_frame_single.casefold())
+            conditions.INST_INDEX.refresh(inst)
             # They're always centered
             blue_loc = loc
             oran_loc = loc
@@ -12,7 +12,7 @@ from precomp import (
     conditions,
 )
 import consts
-from perlin import SimplexNoise
+from perlin import SimplexNoise, smooth_noise_grid
 from srctools import Property, Vec_tuple, Vec, Side, UVAxis, VMF
 
 
@@ -379,20 +379,6 @@ def res_cutout_tile(vmf: srctools.VMF, res: Property):
     return conditions.RES_EXHAUSTED
 
 
-def get_noise(loc: Vec, noise_func: SimplexNoise):
-    """Generate a number between 0 and 1.
-
-    This is used to determine where tiles are placed.
-    """
-    # Average between the neighbouring locations, to smooth out changes.
-    return sum(
-        # + 1 / 2 fixes the value range (originally -1,1 -> 0,1)
-        (noise_func.noise3(loc.x + x, loc.y + y, loc.z) + 1) / 2
-        for x in (-1, 0, 1)
-        for y in (-1, 0, 1)
-    ) / 9
-
-
 def convert_floor(
     vmf: VMF,
     loc: Vec,
@@ -446,6 +432,19 @@ def convert_floor(
     loc.x -= 64
     loc.y -= 64
 
+    noise_locs = [
+        (loc + (x * 32 + 16, y * 32 + 16, 0)) // 32
+        for x, y in utils.iter_grid(max_x=4, max_y=4)
+    ]
+    # Generate the noise used to place tiles all at once. This is
+    # averaged between the neighbouring locations, to smooth out changes.
+    noise_grid = smooth_noise_grid(
+        noise_func,
+        [noise_loc.x for noise_loc in noise_locs],
+        [noise_loc.y for noise_loc in noise_locs],
+        noise_locs[0].z,
+    )
+
     for x, y in utils.iter_grid(max_x=4, max_y=4):
         tile_loc = loc + (x * 32 + 16, y * 32 + 16, 0)
         if tile_loc.as_tuple() in signage_loc:
@@ -456,7 +455,8 @@ def convert_floor(
             signage_loc.remove(tile_loc.as_tuple())
         else:
             # Create a number between 0-100
-            rand = 100 * get_noise(tile_loc // 32, noise_func) + 10
+            noise_loc = tile_loc // 32
+            rand = 100 * noise_grid[noise_loc.x, noise_loc.y] + 10
 
             # Adjust based on the noise_weight value, so boundries have more tiles
             rand *= 0.1 + 0.9 * (1 - noise_weight)
@@ -757,20 +757,29 @@ def make_displacement(
         # We can duplicate immutable strings fine..
         face.disp_data[key] = [val * grid_size] * grid_size
 
+    noise_locs = [
+        [
+            Vec(
+                bbox_min.x + x * x_vert,
+                bbox_min.y + y * y_vert,
+                bbox_min.z,
+            ) // max(x_vert, y_vert)
+            for x in range(grid_size)
+        ]
+        for y in range(grid_size)
+    ]
+    noise_grid = smooth_noise_grid(
+        noise,
+        [loc.x for row in noise_locs for loc in row],
+        [loc.y for row in noise_locs for loc in row],
+        noise_locs[0][0].z,
+    )
     face.disp_data['alphas'] = [
         ' '.join(
-            str(512 * get_noise(
-                Vec(
-                    bbox_min.x + x * x_vert,
-                    bbox_min.y + y * y_vert,
-                    bbox_min.z,
-                ) // max(x_vert, y_vert),
-                noise,
-            ))
-            for x in
-            range(grid_size)
+            str(512 * noise_grid[loc.x, loc.y])
+            for loc in row
         )
-        for y in range(grid_size)
+        for row in noise_locs
     ]
 
 
@@ -30,7 +30,7 @@ def global_bool(val: bool) -> bool:
         raise conditions.Unsatisfiable
 
 
-@conditions.make_flag('styleVar')
+@conditions.make_flag('styleVar', scope=conditions.FlagScope.GLOBAL)
 def flag_stylevar(flag: Property) -> bool:
     """Checks if the given Style Var is true.
 
@@ -39,7 +39,7 @@ def flag_stylevar(flag: Property) -> bool:
     return global_bool(vbsp.settings['style_vars'][flag.value.casefold()])
 
 
-@conditions.make_flag('has')
+@conditions.make_flag('has', scope=conditions.FlagScope.GLOBAL)
 def flag_voice_has(info: conditions.MapInfo, flag: Property) -> bool:
     """Checks if the given Voice Attribute is present.
 
@@ -48,7 +48,7 @@ def flag_voice_has(info: conditions.MapInfo, flag: Property) -> bool:
     return global_bool(info.has_attr(flag.value))
 
 
-@conditions.make_flag('has_music')
+@conditions.make_flag('has_music', scope=conditions.FlagScope.GLOBAL)
 def flag_music() -> NoReturn:
     """Checks the selected music ID.
 
@@ -58,7 +58,7 @@ def flag_music() -> NoReturn:
     raise conditions.Unsatisfiable
 
 
-@conditions.make_flag('Game')
+@conditions.make_flag('Game', scope=conditions.FlagScope.GLOBAL)
 def flag_game(flag: Property) -> bool:
     """Checks which game is being modded.
 
@@ -80,7 +80,7 @@ def flag_game(flag: Property) -> bool:
     ))
 
 
-@conditions.make_flag('has_char')
+@conditions.make_flag('has_char', scope=conditions.FlagScope.GLOBAL)
 def flag_voice_char(flag: Property) -> bool:
     """Checks to see if the given charcter is present in the voice pack.
 
@@ -97,26 +97,26 @@ def flag_voice_char(flag: Property) -> bool:
     raise conditions.Unsatisfiable
 
 
-@conditions.make_flag('HasCavePortrait')
+@conditions.make_flag('HasCavePortrait', scope=conditions.FlagScope.GLOBAL)
 def res_cave_portrait() -> bool:
     """Checks to see if the Cave Portrait option is set for the given voice pack.
     """
     return global_bool(options.get(int, 'cave_port_skin') is not None)
 
 
-@conditions.make_flag('entryCorridor')
+@conditions.make_flag('entryCorridor', scope=conditions.FlagScope.GLOBAL)
 def res_check_entry_corridor(info: conditions.MapInfo, flag: Property) -> bool:
     """Check the selected entry corridor matches this filename."""
     return global_bool(info.corr_entry.instance.casefold() == flag.value.casefold())
 
 
-@conditions.make_flag('exitCorridor')
+@conditions.make_flag('exitCorridor', scope=conditions.FlagScope.GLOBAL)
 def res_check_exit_corridor(info: conditions.MapInfo, flag: Property) -> bool:
     """Check the selected exit corridor matches this filename."""
     return global_bool(info.corr_exit.instance.casefold() == flag.value.casefold())
 
 
-@conditions.make_flag('ifMode', 'iscoop', 'gamemode')
+@conditions.make_flag('ifMode', 'iscoop', 'gamemode', scope=conditions.FlagScope.GLOBAL)
 def flag_game_mode(info: conditions.MapInfo, flag: Property) -> bool:
     """Checks if the game mode is `SP` or `COOP`.
     """
@@ -129,7 +129,7 @@ def flag_game_mode(info: conditions.MapInfo, flag: Property) -> bool:
         raise ValueError(f'Unknown gamemode "{flag.value}"!')
 
 
-@conditions.make_flag('ifPreview', 'preview')
+@conditions.make_flag('ifPreview', 'preview', scope=conditions.FlagScope.GLOBAL)
 def flag_is_preview(info: conditions.MapInfo, flag: Property) -> bool:
     """Checks if the preview mode status equals the given value.
 
@@ -143,7 +143,7 @@ def flag_is_preview(info: conditions.MapInfo, flag: Property) -> bool:
     return global_bool(expect_preview == (not info.start_at_elevator))
 
 
-@conditions.make_flag('hasExitSignage')
+@conditions.make_flag('hasExitSignage', scope=conditions.FlagScope.GLOBAL)
 def flag_has_exit_signage(vmf: VMF) -> bool:
     """Check to see if either exit sign is present."""
     for over in vmf.by_class['info_overlay']:
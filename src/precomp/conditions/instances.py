@@ -6,7 +6,7 @@ from typing import Any, Union, Callable
 import operator
 
 import srctools.logger
-from precomp.conditions import make_flag, make_result
+from precomp.conditions import FlagScope, make_flag, make_result
 from precomp import instance_traits, instanceLocs, conditions, options
 from srctools import Property, Angle, Vec, Entity, Output, VMF, conv_bool
 
@@ -14,7 +14,7 @@ LOGGER = srctools.logger.get_logger(__name__, 'cond.instances')
 COND_MOD_NAME = 'Instances'
 
 
-@make_flag('instance')
+@make_flag('instance', scope=FlagScope.FILE)
 def flag_file_equal(flag: Property) -> Callable[[Entity], bool]:
     """Evaluates True if the instance matches the given file."""
     inst_list = set(instanceLocs.resolve(flag.value))
@@ -27,13 +27,13 @@ def flag_file_equal(flag: Property) -> Callable[[Entity], bool]:
     return check_inst
 
 
-@make_flag('instFlag', 'InstPart')
+@make_flag('instFlag', 'InstPart', scope=FlagScope.FILE)
 def flag_file_cont(inst: Entity, flag: Property) -> bool:
     """Evaluates True if the instance contains the given portion."""
     return flag.value in inst['file'].casefold()
 
 
-@make_flag('hasInst')
+@make_flag('hasInst', scope=FlagScope.GLOBAL)
 def flag_has_inst(flag: Property) -> Callable[[Entity], bool]:
     """Checks if the given instance is present anywhere in the map."""
     flags = set(instanceLocs.resolve(flag.value))
@@ -206,6 +206,7 @@ def res_change_instance(inst: Entity, res: Property):
     """Set the file to a value."""
     inst['file'] = filename = instanceLocs.resolve_one(res.value, error=True)
     conditions.ALL_INST.add(filename.casefold())
+    conditions.INST_INDEX.refresh(inst)
 
 
 @make_result('suffix', 'instSuffix')
@@ -1,28 +1,28 @@
 """Logical flags used to combine others (AND, OR, NOT, etc)."""
 from precomp.collisions import Collisions
 from precomp.conditions import make_flag, check_flag, MapInfo, Unsatisfiable
-from srctools import Entity, Property
+from srctools import Entity, Property, VMF
 
 
 COND_MOD_NAME = 'Logic'
 
 
-@make_flag('AND')
-def flag_and(inst: Entity, coll: Collisions, info: MapInfo, flag: Property):
+@make_flag('AND', scope=None)
+def flag_and(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property):
     """The AND group evaluates True if all sub-flags are True."""
     for i, sub_flag in enumerate(flag):
-        if not check_flag(sub_flag, coll, info, inst, can_skip=i == 0):
+        if not check_flag(sub_flag, coll, info, inst, can_skip=i == 0, vmf=vmf):
             return False
     return True
 
 
-@make_flag('OR')
-def flag_or(inst: Entity, coll: Collisions, info: MapInfo, flag: Property):
+@make_flag('OR', scope=None)
+def flag_or(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property):
     """The OR group evaluates True if any sub-flags are True."""
     satisfiable = False
     for sub_flag in flag:
         try:
-            res = check_flag(sub_flag, coll, info, inst, can_skip=True)
+            res = check_flag(sub_flag, coll, info, inst, can_skip=True, vmf=vmf)
         except Unsatisfiable:
             pass
         else:
@@ -35,35 +35,35 @@ def flag_or(inst: Entity, coll: Collisions, info: MapInfo, flag: Property):
     return False
 
 
-@make_flag('NOT')
-def flag_not(inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
+@make_flag('NOT', scope=None)
+def flag_not(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
     """The NOT group inverts the value of it's one sub-flag."""
     try:
         [subflag] = flag
     except ValueError:
         return False
-    return not check_flag(subflag, coll, info, inst)
+    return not check_flag(subflag, coll, info, inst, vmf=vmf)
 
 
-@make_flag('XOR')
-def flag_xor(inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
+@make_flag('XOR', scope=None)
+def flag_xor(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
     """The XOR group returns True if the number of true sub-flags is odd."""
-    return sum([check_flag(sub_flag, coll, info, inst) for sub_flag in flag]) % 2 == 1
+    return sum([check_flag(sub_flag, coll, info, inst, vmf=vmf) for sub_flag in flag]) % 2 == 1
 
 
-@make_flag('NOR')
-def flag_nor(inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
+@make_flag('NOR', scope=None)
+def flag_nor(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
     """The NOR group evaluates True if any sub-flags are False."""
     for sub_flag in flag:
-        if check_flag(sub_flag, coll, info, inst):
+        if check_flag(sub_flag, coll, info, inst, vmf=vmf):
             return True
     return False
 
 
-@make_flag('NAND')
-def flag_nand(inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
+@make_flag('NAND', scope=None)
+def flag_nand(vmf: VMF, inst: Entity, coll: Collisions, info: MapInfo, flag: Property) -> bool:
     """The NAND group evaluates True if all sub-flags are False."""
     for sub_flag in flag:
-        if not check_flag(sub_flag, coll, info, inst):
+        if not check_flag(sub_flag, coll, info, inst, vmf=vmf):
             return True
     return False
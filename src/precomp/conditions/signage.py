@@ -151,6 +151,7 @@ def res_signage(vmf: VMF, inst: Entity, res: Property):
         inst['file'] = fname = res['small_clip', '']
         inst['origin'] = prim_pos if sign_prim else sec_pos
     conditions.ALL_INST.add(fname.casefold())
+    conditions.INST_INDEX.refresh(inst)
 
     brush_faces: List[Side] = []
     tiledef: Optional[tiling.TileDef] = None
@@ -94,6 +94,7 @@ def res_track_plat(vmf: VMF, res: Property) -> object:
             # remove track!
             plat_inst['file'] = single_plat_inst
             conditions.ALL_INST.add(single_plat_inst.casefold())
+            conditions.INST_INDEX.refresh(plat_inst)
             first_track.remove()
             continue  # Next platform
 
@@ -19,7 +19,7 @@ import editoritems
 import consts
 import srctools.logger
 
-from typing import Optional, Iterable, Dict, List, Set, Tuple, Iterator, Union
+from typing import Optional, Iterable, Dict, List, Mapping, Set, Tuple, Iterator, Union
 import user_errors
 
 
@@ -423,9 +423,9 @@ def collapse_item(item: Item) -> None:
     item.inst.remove()
 
 
-def read_configs(all_items: Iterable[editoritems.Item]) -> None:
+def read_configs(all_items: Mapping[str, editoritems.Item]) -> None:
     """Load our connection configuration from the config files."""
-    for item in all_items:
+    for item in editoritems.item_summaries(all_items):
         if item.id.casefold() in ITEM_TYPES:
             raise ValueError('Duplicate item type "{}"'.format(item.id))
         if item.conn_config is None and (item.force_input or item.force_output):
@@ -842,6 +842,7 @@ def gen_item_outputs(vmf: VMF) -> None:
 
         for pan in item.ind_panels:
             pan['file'] = desired_panel_inst
+            conditions.INST_INDEX.refresh(pan)
             pan.fixup[consts.FixupVars.TIM_ENABLED] = item.timer is not None
         if item.ind_panels:
             conditions.ALL_INST.add(desired_panel_inst.casefold())
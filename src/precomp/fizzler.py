@@ -1202,6 +1202,7 @@ def generate_fizzlers(vmf: VMF) -> None:
             rng = rand.seed(b'fizz_base', fizz_name)
             fizz.base_inst['file'] = base_file = rng.choice(fizz_type.inst[FizzInst.BASE, is_static])
             conditions.ALL_INST.add(base_file.casefold())
+            conditions.INST_INDEX.refresh(fizz.base_inst)
 
         if not fizz.emitters:
             LOGGER.warning('No emitters for fizzler "{}"!', fizz_name)
@@ -1317,9 +1318,10 @@ def generate_fizzlers(vmf: VMF) -> None:
         trigger_hurt_name = ''
         trigger_hurt_start_disabled = '0'
 
+        seg_seeder = rand.seeder(b'fizz_seg')
         for seg_ind, (seg_min, seg_max) in enumerate(fizz.emitters, start=1):
             length = (seg_max - seg_min).mag()
-            rng = rand.seed(b'fizz_seg', seg_min, seg_max)
+            rng = seg_seeder(seg_min, seg_max)
             if length == 128 and fizz_type.inst[FizzInst.PAIR_SINGLE, is_static]:
                 # Assign to 'min' var so we can share some code.
                 min_inst = conditions.add_inst(
@@ -3,7 +3,7 @@
 Given a grid of positions, produce a set of rectangular boxes that efficiently cover all
 set positions.
 """
-from typing import Mapping, Tuple, Iterator, TypeVar, Union, Any
+from typing import Dict, List, Mapping, Tuple, Iterator, TypeVar, Union, Any
 
 from plane import Plane
 
@@ -21,62 +21,83 @@ def optimise(
     The grid should be a (x, y): T dict.
     This yields (min_x, min_y, max_x, max_y, T) tuples, where this region has the same value.
     The values are compared by identity.
-    """
-    full_grid: Plane[T] = Plane(grid, default=VOID)
-    x_min, y_min = full_grid.mins
-    x_max, y_max = full_grid.maxes
-    x_max += 1
-    y_max += 1
-
-    for x in range(x_min, x_max):
-        for y in range(y_min, y_max):
-            value = full_grid[x, y]
-            if value is VOID:
-                continue
-            yield _do_cell(full_grid, value, x, y, x_max, y_max)
-
-    assert all(v is VOID for v in full_grid.values()), full_grid
-
-
-def _do_cell(
-    grid: Plane[T],
-    value: T,
-    min_x: int,
-    min_y: int,
-    max_x: int,
-    max_y: int,
-) -> Tuple[int, int, int, int, T]:
-    """From a cell (min x/y) find a good rectangle."""
-    # We want to try both x,y and y,x order to see which is better.
-    x1 = x2 = min_x
-    y1 = y2 = min_y
 
-    # Extend in the x direction until we hit a boundary.
-    for x1 in range(min_x, max_x + 1):
-        if grid[x1, min_y] is not value:
-            break
-    # Then in y until we hit a boundary.
-    for y1 in range(min_y, max_y + 1):
-        if any(grid[x, y1] is not value for x in range(min_x, x1)):
-            break
-
-    # Then do it again but the other order.
-    for y2 in range(min_y, max_y + 1):
-        if grid[min_x, y2] is not value:
-            break
-    for x2 in range(min_x, max_x + 1):
-        if any(grid[x2, y] is not value for y in range(min_y, y2)):
-            break
-
-    # Check which has a larger area.
-    if (x1 - min_x) * (y1 - min_y) > (x2 - min_x) * (y2 - min_y):
-        max_x, max_y = x1, y1
-    else:
-        max_x, max_y = x2, y2
-
-    # Mark all spots as used.
-    for x in range(min_x, max_x):
-        for y in range(min_y, max_y):
-            del grid[x, y]
-
-    return min_x, min_y, max_x - 1, max_y - 1, value
+    Starting from the lowest x, then y position, this greedily picks the larger of the
+    rectangles found by extending in x then y, or y then x.
+    """
+    if not isinstance(grid, Plane):
+        grid = Plane(grid)
+    if not grid:
+        return
+    x_min, y_min = grid.mins
+    x_max, y_max = grid.maxes
+
+    # Label each cell with an integer for its value, 0 being empty. These are stored
+    # column-major in a flat list, so iterating matches the x then y order we want.
+    # An extra empty row and column is included, so runs always end at a zero.
+    height = y_max - y_min + 1
+    stride = height + 1
+    size = (x_max - x_min + 2) * stride
+    labels = [0] * size
+    values: List[Any] = [VOID]
+    value_labels: Dict[int, int] = {}
+    for (x, y), value in grid.items():
+        try:
+            label = value_labels[id(value)]
+        except KeyError:
+            label = value_labels[id(value)] = len(values)
+            values.append(value)
+        labels[(x - x_min) * stride + y - y_min] = label
+
+    # The number of cells with the same value, starting from each cell and going in +x or +y.
+    # Since we start with the lowest cells, cells to the left of a removed rectangle are
+    # always already removed. So run_x never needs to be updated, but run_y does.
+    run_x = [0] * size
+    run_y = [0] * size
+    for i in reversed(range(size - stride)):
+        label = labels[i]
+        if label:
+            run_x[i] = run_x[i + stride] + 1 if labels[i + stride] == label else 1
+            run_y[i] = run_y[i + 1] + 1 if labels[i + 1] == label else 1
+
+    for start, label in enumerate(labels):
+        if not label:
+            continue
+        # Extend in the x direction until we hit a boundary, then in y until a row is short.
+        width_1 = run_x[start]
+        height_1 = 1
+        i = start + 1
+        while labels[i] == label and run_x[i] >= width_1:
+            height_1 += 1
+            i += 1
+
+        # Then do it again but the other order.
+        height_2 = run_y[start]
+        width_2 = 1
+        i = start + stride
+        while labels[i] == label and run_y[i] >= height_2:
+            width_2 += 1
+            i += stride
+
+        # Check which has a larger area.
+        if width_1 * height_1 > width_2 * height_2:
+            width, rect_height = width_1, height_1
+        else:
+            width, rect_height = width_2, height_2
+
+        # Mark all spots as used, then cut off the runs leading into the rectangle.
+        for col in range(start, start + width * stride, stride):
+            labels[col:col + rect_height] = [0] * rect_height
+            i = col - 1
+            run = 1
+            while labels[i] == label:
+                run_y[i] = run
+                run += 1
+                i -= 1
+
+        x, y = divmod(start, stride)
+        yield (
+            x_min + x, y_min + y,
+            x_min + x + width - 1, y_min + y + rect_height - 1,
+            values[label],
+        )
@@ -13,7 +13,7 @@ import srctools.logger
 
 from typing import (
     Callable, Optional, Union,
-    List, Dict, Tuple, TypeVar, Iterable,
+    List, Dict, Tuple, TypeVar, Mapping,
 )
 import corridor
 import user_errors
@@ -218,27 +218,27 @@ SPECIAL_INST_FOLDED = {
 }
 
 
-def load_conf(items: Iterable[editoritems.Item]) -> None:
+def load_conf(items: Mapping[str, editoritems.Item]) -> None:
     """Read the config and build our dictionaries."""
     cust_instances: dict[str, str]
-    EMPTY = editoritems.FSPath()
-    for item in items:
+    # Only the summaries are needed, so the items don't need to be decoded.
+    for item in editoritems.item_summaries(items):
         # Extra definitions: key -> filename.
         # Make sure to do this first, so numbered instances are set in
         # ITEM_FOR_FILE.
         if item.cust_instances:
             CUST_INST_FILES[item.id.casefold()] = cust_instances = {}
             for name, file in item.cust_instances.items():
-                cust_instances[name] = folded = str(file).casefold()
+                cust_instances[name] = folded = file.casefold()
                 ITEM_FOR_FILE[folded] = (item.id, name)
 
         # Normal instances: index -> filename
         INSTANCE_FILES[item.id.casefold()] = [
-            '' if inst.inst == EMPTY else str(inst.inst).casefold()
-            for inst in item.instances
+            '' if fname == '.' else fname.casefold()
+            for fname in item.instances
         ]
-        for ind, inst in enumerate(item.instances):
-            fname = str(inst.inst).casefold()
+        for ind, fname in enumerate(item.instances):
+            fname = fname.casefold()
             # Not real instances.
             if fname != '.' and not fname.startswith('instances/bee2_corridor/'):
                 ITEM_FOR_FILE[fname] = (item.id, ind)
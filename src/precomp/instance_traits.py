@@ -1,5 +1,5 @@
 """Adds various traits to instances, based on item classes."""
-from typing import List, MutableMapping, Optional, Dict, Set, Union
+from typing import List, Mapping, MutableMapping, Optional, Dict, Set, Union
 from weakref import WeakKeyDictionary
 
 import attrs
@@ -7,7 +7,7 @@ from srctools import Entity, VMF
 import srctools.logger
 
 from precomp.instanceLocs import ITEM_FOR_FILE
-from precomp.collisions import Collisions
+from precomp.collisions import BBox, Collisions, item_collisions
 from editoritems import Item, ItemClass
 from corridor import parse_filename as parse_corr_filename, CORR_TO_ID
 
@@ -184,8 +184,10 @@ def get_item_id(inst: Entity) -> Optional[str]:
         return None
 
 
-def set_traits(vmf: VMF, id_to_item: Dict[str, Item], coll: Collisions) -> None:
+def set_traits(vmf: VMF, id_to_item: Mapping[str, Item], coll: Collisions) -> None:
     """Scan through the map, apply traits to instances, and set initial collisions."""
+    # Collect the collisions, so they can all be added at once.
+    item_colls: List[BBox] = []
     for inst in vmf.by_class['func_instance']:
         inst_file = inst['file'].casefold()
         if not inst_file:
@@ -235,4 +237,5 @@ def set_traits(vmf: VMF, id_to_item: Dict[str, Item], coll: Collisions) -> None:
             info.traits.remove(SKIP_COLL)
             # Also skip if no name is set.
         elif item is not None and inst['targetname'] != '':
-            coll.add_item_coll(item, inst)
+            item_colls += item_collisions(item, inst)
+    coll.add_many(item_colls)
@@ -565,6 +565,20 @@ DEFAULTS = [
         A 128x128 room is added there, and logic ents are added inside.
         """),
 
+    Opt('fast_random', False,
+        """Use a faster random number generator for randomised choices.
+
+        This speeds up compiling large maps, but changes which textures and
+        variants are picked, so existing maps will look different.
+        """),
+
+    Opt('condition_stats', False,
+        """Record the cost of each condition, flag and result.
+
+        A table of the slowest is written to the log, and the full list to
+        `bee2/condition_stats.csv`. This slows down compiling slightly.
+        """),
+
     ######
     # The following are set by the BEE2.4 app automatically:
 
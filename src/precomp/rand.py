@@ -1,10 +1,11 @@
 """Handles randomising values in a repeatable way."""
 from __future__ import annotations
+from typing import Callable, Union
 from random import Random
 from struct import Struct
 import hashlib
 
-from precomp import instanceLocs
+from precomp import instanceLocs, options
 from srctools import VMF, Vec, Angle, Entity, logger, Matrix
 
 
@@ -17,6 +18,13 @@ NINE_FLOATS = Struct('<9e')  # Half-precision float, don't need the accuracy.
 THREE_INTS = Struct('<3i')
 LOGGER = logger.get_logger(__name__)
 
+# If set, use FastRandom instead of seeding Mersenne Twister generators.
+# This changes the results, so it's only done if enabled in the options.
+FAST_MODE = False
+MASK_64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9e3779b97f4a7c15
+FLOAT_SCALE = 2.0 ** -53
+
 
 def parse_weights(count: int, weights: str) -> list[int]:
     """Generate random indexes with weights.
@@ -71,10 +79,111 @@ def init_seed(vmf: VMF) -> str:
         MAP_HASH.update(name)
     LOGGER.debug('Map random seed: {}', MAP_HASH.hexdigest())
 
+    global FAST_MODE
+    FAST_MODE = options.get(bool, 'fast_random')
+    LOGGER.info('Using {} random generators.', 'fast' if FAST_MODE else 'compatible')
+
     return b'|'.join(light_names).decode()  # TODO Remove
 
 
-def seed(name: bytes, *values: str | Entity | Vec | Angle | Matrix | float | bytes | bytearray) -> Random:
+SeedValue = Union[str, Entity, Vec, Angle, Matrix, float, bytes, bytearray]
+
+
+def _value_bytes(val: SeedValue) -> bytes:
+    """Convert a value passed to seed() into the bytes hashed for it."""
+    if isinstance(val, str):
+        return val.encode('utf8')
+    elif isinstance(val, Vec):
+        return THREE_FLOATS.pack(round(val.x, 6), round(val.y, 6), round(val.z, 6))
+    elif isinstance(val, Angle):
+        a, b, c = val
+        return THREE_FLOATS.pack(round(a, 6), round(b, 6), round(c, 6))
+    elif isinstance(val, float):
+        return ONE_FLOAT.pack(val)
+    elif isinstance(val, Matrix):
+        return NINE_FLOATS.pack(
+            val[0, 0], val[0, 1], val[0, 2],
+            val[1, 0], val[1, 1], val[1, 2],
+            val[2, 0], val[2, 1], val[2, 2],
+        )
+    elif isinstance(val, Entity):
+        x, y, z = round(Vec.from_str(val['origin']), 6)
+        pos = THREE_FLOATS.pack(x, y, z)
+        # This was meant to be the angles, but must be kept for compatibility.
+        p, y, r = Vec.from_str(val['origin'])
+        return b''.join([
+            val['targetname'].encode('ascii', 'replace'),
+            pos,
+            THREE_FLOATS.pack(round(p, 6), round(y, 6), round(r, 6)),
+        ])
+    elif isinstance(val, (bytes, bytearray)):
+        return val
+    else:
+        raise TypeError(val)
+
+
+class FastRandom(Random):
+    """A counter-based random number generator, which is cheap to create.
+
+    Seeding the Mersenne Twister used by Random is relatively expensive, and most
+    generators here only produce one or two values. This instead produces each
+    output by scrambling a counter starting from the seed (SplitMix64), so creation
+    costs nothing. All the Random methods are usable, since they call random(),
+    getrandbits() or _randbelow().
+    """
+    _state: int
+
+    def seed(self, a: object = None, version: int = 2) -> None:
+        """Set the starting state for the generator."""
+        if not isinstance(a, int):
+            raise TypeError('FastRandom must be seeded with an integer!')
+        state = 0
+        while a:
+            state ^= a & MASK_64
+            a >>= 64
+        self._state = state
+
+    def _next(self) -> int:
+        """Produce 64 random bits."""
+        self._state = num = (self._state + GOLDEN_GAMMA) & MASK_64
+        num = ((num ^ (num >> 30)) * 0xbf58476d1ce4e5b9) & MASK_64
+        num = ((num ^ (num >> 27)) * 0x94d049bb133111eb) & MASK_64
+        return num ^ (num >> 31)
+
+    def _randbelow(self, n: int) -> int:
+        """Return a random int in the range [0, n)."""
+        if n <= 0:
+            return 0  # Matches Random, randrange() etc check beforehand.
+        if n.bit_length() > 32:
+            return self._randbelow_with_getrandbits(n)
+        # Multiply-shift, the bias is negligible for small n.
+        return (self._next() * n) >> 64
+
+    def getrandbits(self, k: int) -> int:
+        """Generate an integer with k random bits."""
+        if k < 0:
+            raise ValueError('Number of bits must be non-negative')
+        result = 0
+        for shift in range(0, k, 64):
+            result |= self._next() << shift
+        return result & ((1 << k) - 1)
+
+    def random(self) -> float:
+        """Return a float in the range [0, 1)."""
+        return (self._next() >> 11) * FLOAT_SCALE
+
+    def getstate(self) -> tuple[str, int]:
+        """Return the state of the generator, for setstate()."""
+        return 'FastRandom', self._state
+
+    def setstate(self, state: tuple[str, int]) -> None:
+        """Restore the state of the generator."""
+        kind, self._state = state
+        if kind != 'FastRandom':
+            raise ValueError(f'Invalid state {state!r}!')
+
+
+def seed(name: bytes, *values: SeedValue) -> Random:
     """Initialise a random number generator with these starting arguments.
 
     The name is used to make this unique among other calls, then the arguments
@@ -83,28 +192,35 @@ def seed(name: bytes, *values: str | Entity | Vec | Angle | Matrix | float | byt
     algo = MAP_HASH.copy()
     algo.update(name)
     for val in values:
-        if isinstance(val, str):
-            algo.update(val.encode('utf8'))
-        elif isinstance(val, (Vec, Angle)):
-            a, b, c = val
-            algo.update(THREE_FLOATS.pack(round(a, 6), round(b, 6), round(c, 6)))
-        elif isinstance(val, float):
-            algo.update(ONE_FLOAT.pack(val))
-        elif isinstance(val, Matrix):
-            algo.update(NINE_FLOATS.pack(
-                val[0, 0], val[0, 1], val[0, 2],
-                val[1, 0], val[1, 1], val[1, 2],
-                val[2, 0], val[2, 1], val[2, 2],
-            ))
-        elif isinstance(val, Entity):
-            algo.update(val['targetname'].encode('ascii', 'replace'))
-            x, y, z = round(Vec.from_str(val['origin']), 6)
-            algo.update(THREE_FLOATS.pack(x, y, z))
-            p, y, r = Vec.from_str(val['origin'])
-            algo.update(THREE_FLOATS.pack(round(p, 6), round(y, 6), round(r, 6)))
-        else:
+        try:
+            algo.update(_value_bytes(val))
+        except TypeError:
+            raise TypeError(values)
+    return (FastRandom if FAST_MODE else Random)(int.from_bytes(algo.digest(), 'little'))
+
+
+def seeder(name: bytes, *values: SeedValue) -> Callable[..., Random]:
+    """Prepare to produce many generators which share the starting arguments.
+
+    The name and values are hashed once. Then calling the result with additional
+    values is equivalent to seed(name, *values, *extra_values).
+    """
+    prefix = MAP_HASH.copy()
+    prefix.update(name)
+    for val in values:
+        try:
+            prefix.update(_value_bytes(val))
+        except TypeError:
+            raise TypeError(values)
+    rand_cls = FastRandom if FAST_MODE else Random
+
+    def make_rand(*extra_values: SeedValue) -> Random:
+        """Copy the prefix state, then hash the remaining values."""
+        algo = prefix.copy()
+        for val in extra_values:
             try:
-                algo.update(val)
+                algo.update(_value_bytes(val))
             except TypeError:
-                raise TypeError(values)
-    return Random(int.from_bytes(algo.digest(), 'little'))
+                raise TypeError(extra_values)
+        return rand_cls(int.from_bytes(algo.digest(), 'little'))
+    return make_rand
@@ -3,7 +3,8 @@ from __future__ import annotations
 
 import itertools
 import os
-from collections import defaultdict
+import threading
+from collections import OrderedDict, defaultdict
 from typing import AbstractSet, Callable, Union, Optional, Dict, Tuple, Mapping, Iterable, Iterator
 
 import trio
@@ -21,6 +22,7 @@ from srctools.vmf import EntityFixup, Entity, EntityGroup, Solid, Side, VMF, UVA
 from srctools.dmx import Element as DMElement
 import srctools.logger
 
+import template_bundle
 import user_errors
 from .texturing import Portalable, GenCat, TileSize
 from .tiling import TileType
@@ -36,6 +38,8 @@ LOGGER = srctools.logger.get_logger(__name__, alias='template')
 # _SCALE_TEMP is converted from Template. The frozenset is the visgroups.
 _TEMPLATES: dict[str, Union[UnparsedTemplate, Template]] = {}
 _SCALE_TEMP: dict[tuple[str, frozenset[str]], ScalingTemplate] = {}
+# Pre-parsed templates written by the app, if available.
+_BUNDLE: Optional[template_bundle.TemplateBundle] = None
 
 
 class InvalidTemplateName(LookupError):
@@ -441,38 +445,129 @@ def parse_temp_name(name) -> tuple[str, set[str]]:
         return name.casefold(), set()
 
 
-async def load_templates(path: str) -> None:
-    """Load in the template file, used for import_template()."""
+async def load_templates(path: str, bundle_path: Optional[str] = None) -> None:
+    """Load in the template file, used for import_template().
+
+    If the bundle is provided, pre-parsed templates are read from there.
+    """
+    global _BUNDLE
+    close_bundle()
+    if bundle_path is not None:
+        _BUNDLE = await trio.to_thread.run_sync(template_bundle.TemplateBundle.open, bundle_path)
+        if _BUNDLE is not None:
+            LOGGER.info('Loaded template bundle with {} templates.', len(_BUNDLE))
     with open(path, 'rb') as f:
         dmx, fmt_name, fmt_ver = await trio.to_thread.run_sync(lambda: DMElement.parse(f, unicode=True))
     if fmt_name != 'bee_templates' or fmt_ver not in [1]:
         raise ValueError(f'Invalid template file format "{fmt_name}" v{fmt_ver}')
+    pak_counts: dict[str, int] = defaultdict(int)
     for template in dmx['temp'].iter_elem():
-        _TEMPLATES[template.name.casefold()] = UnparsedTemplate(
+        temp = _TEMPLATES[template.name.casefold()] = UnparsedTemplate(
             template.name.upper(),
             template['package'].val_str,
             template['path'].val_str,
         )
+        pak_counts[temp.pak_path] += 1
+    # Templates are parsed as they're used, but open the packages with the most templates now
+    # while other files are loading. With the bundle, these are only needed if it's outdated.
+    if _BUNDLE is None:
+        await trio.to_thread.run_sync(
+            _preload_packages,
+            sorted(pak_counts, key=pak_counts.__getitem__, reverse=True),
+        )
 
 
-def _parse_template(loc: UnparsedTemplate) -> Template:
-    """Parse a template VMF."""
-    filesys: FileSystem
-    if os.path.isdir(loc.pak_path):
-        filesys = RawFileSystem(loc.pak_path)
+def close_bundle() -> None:
+    """Release the template bundle once compiling is done.
+
+    Any templates used afterward are parsed from their original files.
+    """
+    global _BUNDLE
+    if _BUNDLE is not None:
+        _BUNDLE.close()
+        _BUNDLE = None
+
+
+class FileSystemPool:
+    """Keeps package filesystems open, so templates in the same package don't reopen it.
+
+    Opening a zip requires reading its whole directory, which is expensive for large packages.
+    Once more than max_size are open, the least recently used are discarded.
+    """
+    def __init__(self, max_size: int = 16) -> None:
+        self.max_size = max_size
+        self._systems: OrderedDict[str, FileSystem] = OrderedDict()
+        # Templates may be loaded from another thread.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._systems)
+
+    def __contains__(self, pak_path: str) -> bool:
+        return os.path.normcase(pak_path) in self._systems
+
+    def get(self, pak_path: str) -> FileSystem:
+        """Return the filesystem for this package, opening it if required."""
+        key = os.path.normcase(pak_path)
+        with self._lock:
+            try:
+                self._systems.move_to_end(key)
+                return self._systems[key]
+            except KeyError:
+                pass
+        # Open outside the lock, so threads can open different packages.
+        filesys = _open_filesystem(pak_path)
+        with self._lock:
+            # If another thread opened it first, use that one.
+            filesys = self._systems.setdefault(key, filesys)
+            self._systems.move_to_end(key)
+            while len(self._systems) > self.max_size:
+                self._systems.popitem(last=False)
+        return filesys
+
+    def clear(self) -> None:
+        """Discard all open filesystems."""
+        with self._lock:
+            self._systems.clear()
+
+
+def _open_filesystem(pak_path: str) -> FileSystem:
+    """Open the filesystem for a package."""
+    if os.path.isdir(pak_path):
+        return RawFileSystem(pak_path)
+    ext = os.path.splitext(pak_path)[1].casefold()
+    if ext in ('.bee_pack', '.zip'):
+        return ZipFileSystem(pak_path)
+    elif ext == '.vpk':
+        return VPKFileSystem(pak_path)
     else:
-        ext = os.path.splitext(loc.pak_path)[1].casefold()
-        if ext in ('.bee_pack', '.zip'):
-            filesys = ZipFileSystem(loc.pak_path)
-        elif ext == '.vpk':
-            filesys = VPKFileSystem(loc.pak_path)
-        else:
-            raise ValueError(f'Unknown filesystem type for "{loc.pak_path}"!')
+        raise ValueError(f'Unknown filesystem type for "{pak_path}"!')
+
+
+# The packages templates are being loaded from.
+PACKAGES = FileSystemPool()
 
-    with filesys[loc.path].open_str() as f:
-        props = Property.parse(f, f'{loc.pak_path}:{loc.path}')
+
+def _preload_packages(pak_paths: Iterable[str]) -> None:
+    """Open package filesystems in advance, up to the pool size."""
+    for pak_path in itertools.islice(pak_paths, PACKAGES.max_size):
+        try:
+            PACKAGES.get(pak_path)
+        except (OSError, ValueError):
+            # Only report this if the template is actually used.
+            LOGGER.debug('Could not open package "{}":', pak_path, exc_info=True)
+
+
+def _parse_template(loc: UnparsedTemplate) -> Template:
+    """Parse a template VMF."""
+    props = _BUNDLE.get(loc.id, loc.pak_path, loc.path) if _BUNDLE is not None else None
+    if props is None:
+        filesys = PACKAGES.get(loc.pak_path)
+        with filesys[loc.path].open_str() as f:
+            props = Property.parse(f, f'{loc.pak_path}:{loc.path}')
+        del filesys, f
     vmf = srctools.VMF.parse(props, preserve_ids=True)
-    del props, filesys, f  # Discard all this data.
+    del props  # Discard all this data.
 
     # visgroup -> list of brushes/overlays
     detail_ents: dict[str, list[Solid]] = defaultdict(list)
@@ -2,7 +2,9 @@
 from typing import TYPE_CHECKING, Union, Type, Any, Dict, List, Tuple, Optional, Iterable, Set
 from pathlib import Path
 from enum import Enum
+from random import Random
 import itertools
+import struct
 import abc
 
 import attrs
@@ -856,6 +858,15 @@ class GenRandom(Generator):
         return rand.seed(b'tex_rand', loc).choice(self.textures[tex_name])
 
 
+# The size of the grid cells used to look up clumps.
+CLUMP_CELL = 512
+# Used to determine the table size of a set.
+_EMPTY_SET_SIZE = set().__sizeof__()
+_SET_ENTRY_SIZE = 2 * struct.calcsize('P')  # Key pointer + hash.
+# Whether _TileOrder matches this interpreter's set ordering, checked when first used.
+_TILE_ORDER_VALID: Optional[bool] = None
+
+
 @attrs.define
 class Clump:
     """Represents a region of map, used to create rectangular sections with the same pattern."""
@@ -868,6 +879,159 @@ class Clump:
     seed: bytes
 
 
+class _TileOrder:
+    """Tracks the tiles which have not yet been used in a clump.
+
+    Clumps were originally picked by indexing into the set of remaining tiles,
+    which requires iterating the whole set. Removing items from a set doesn't
+    reorder it, so indexing is equivalent to skipping over the removed values
+    in the original iteration order. A Fenwick tree of the remaining counts
+    allows doing that in logarithmic time, while picking the exact same tiles.
+
+    The exception is that difference_update() rebuilds the set's table once
+    more than a quarter of it is deleted entries. We keep the set around, and
+    recompute the order whenever that happens.
+    """
+    def __init__(self, tiles: Set[Tuple[float, float, float]]) -> None:
+        self._tiles = tiles
+        self._dummies = 0
+        self._order: List[Tuple[float, float, float]] = []
+        self._index: Dict[Tuple[float, float, float], int] = {}
+        self._tree: List[int] = []
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recompute the order from the set."""
+        self._order = list(self._tiles)
+        self._index = {pos: i for i, pos in enumerate(self._order)}
+        # Every entry starts at 1, so each node is the size of its range.
+        self._tree = [i & -i for i in range(len(self._order) + 1)]
+        self._dummies = 0
+
+    def _table_mask(self) -> int:
+        """Compute the hash table size of the set."""
+        table_size = (self._tiles.__sizeof__() - _EMPTY_SET_SIZE) // _SET_ENTRY_SIZE
+        # If not allocated, it's using the builtin small table.
+        return (table_size or 8) - 1
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def _remove_ind(self, pos: Tuple[float, float, float]) -> None:
+        """Remove this from the Fenwick tree."""
+        i = self._index[pos] + 1
+        while i < len(self._tree):
+            self._tree[i] -= 1
+            i += i & -i
+
+    def remove(self, pos: Tuple[float, float, float]) -> None:
+        """Remove a tile which is present."""
+        self._tiles.remove(pos)
+        self._remove_ind(pos)
+        self._dummies += 1
+
+    def difference_update(self, positions: Iterable[Tuple[float, float, float]]) -> None:
+        """Remove all the specified tiles."""
+        # Skip duplicates, they'd be removed from the tree twice.
+        removed = {pos for pos in positions if pos in self._tiles}
+        mask = self._table_mask()
+        self._tiles.difference_update(removed)
+        self._dummies += len(removed)
+        if self._dummies > mask // 4:
+            # The set was resized, reordering it.
+            self._rebuild()
+        else:
+            for pos in removed:
+                self._remove_ind(pos)
+
+    def __getitem__(self, ind: int) -> Tuple[float, float, float]:
+        """Find the nth remaining tile, in iteration order."""
+        if not 0 <= ind < len(self._tiles):
+            raise IndexError(ind)
+        pos = 0
+        remaining = ind + 1
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] < remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return self._order[pos]
+
+
+class _SetTileOrder:
+    """The fallback for _TileOrder, indexing into the set directly. This is O(n) per pick."""
+    def __init__(self, tiles: Set[Tuple[float, float, float]]) -> None:
+        self._tiles = tiles
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def remove(self, pos: Tuple[float, float, float]) -> None:
+        """Remove a tile which is present."""
+        self._tiles.remove(pos)
+
+    def difference_update(self, positions: Iterable[Tuple[float, float, float]]) -> None:
+        """Remove all the specified tiles."""
+        self._tiles.difference_update(positions)
+
+    def __getitem__(self, ind: int) -> Tuple[float, float, float]:
+        """Find the nth remaining tile, in iteration order."""
+        if not 0 <= ind < len(self._tiles):
+            raise IndexError(ind)
+        return next(itertools.islice(self._tiles, ind, None))
+
+
+def _check_tile_order(seed: int, count: int) -> bool:
+    """Check _TileOrder picks the same tiles as indexing a real set.
+
+    Random tiles are picked and removed along with surrounding boxes, like clumps do.
+    """
+    rng = Random(seed)
+    positions = [
+        (rng.randrange(-16, 16) * 128.0, rng.randrange(-16, 16) * 128.0, rng.randrange(-4, 4) * 128.0)
+        for _ in range(count)
+    ]
+    # Copying a set can change the order, so build both the same way.
+    tiles = {pos for pos in positions}
+    order = _TileOrder({pos for pos in positions})
+    while tiles:
+        if len(order) != len(tiles):
+            return False
+        ind = rng.randrange(len(tiles))
+        pos = next(itertools.islice(tiles, ind, None))
+        if order[ind] != pos:
+            return False
+        tiles.remove(pos)
+        order.remove(pos)
+        x, y, z = pos
+        box = [
+            (x + dx * 128.0, y + dy * 128.0, z + dz * 128.0)
+            for dx in range(-rng.randint(0, 2), rng.randint(0, 2) + 1)
+            for dy in range(-rng.randint(0, 2), rng.randint(0, 2) + 1)
+            for dz in range(-rng.randint(0, 1), rng.randint(0, 1) + 1)
+        ]
+        tiles.difference_update(iter(box))
+        order.difference_update(iter(box))
+    return len(order) == 0
+
+
+def _make_tile_order(
+    tiles: Set[Tuple[float, float, float]],
+) -> Union[_TileOrder, _SetTileOrder]:
+    """Use _TileOrder if it reproduces the set ordering, or fall back to the set itself."""
+    global _TILE_ORDER_VALID
+    if _TILE_ORDER_VALID is None:
+        _TILE_ORDER_VALID = all(_check_tile_order(seed, 300) for seed in range(2))
+        if not _TILE_ORDER_VALID:
+            LOGGER.warning('Set ordering differs from expected, using slower clump generation.')
+    if _TILE_ORDER_VALID:
+        return _TileOrder(tiles)
+    else:
+        return _SetTileOrder(tiles)
+
+
 @GEN_CLASSES('CLUMP')
 class GenClump(Generator):
     """The clumping generator for tiles.
@@ -881,6 +1045,8 @@ class GenClump(Generator):
         # A seed only unique to this generator.
         self.gen_seed = b''
         self._clump_locs: list[Clump] = []
+        # Clumps overlapping each grid cell, in the order they were created.
+        self._clump_grid: Dict[Tuple[int, int, int], List[Clump]] = {}
 
     def setup(self, vmf: VMF, tiles: List['TileDef']) -> None:
         """Build the list of clump locations."""
@@ -903,10 +1069,10 @@ class GenClump(Generator):
 
         # The tiles currently present in the map.
         orient_z = self.orient.z
-        remaining_tiles: Set[Tuple[float, float, float]] = {
+        remaining_tiles = _make_tile_order({
             (tile.pos + 64 * tile.normal // 128 * 128).as_tuple() for tile in tiles
             if tile.normal.z == orient_z
-        }
+        })
 
         # A global RNG for picking clump positions.
         clump_rand = rand.seed(b'clump_pos')
@@ -925,11 +1091,7 @@ class GenClump(Generator):
 
         while remaining_tiles:
             # Pick from a random tile.
-            tile_pos = next(itertools.islice(
-                remaining_tiles,
-                clump_rand.randrange(0, len(remaining_tiles)),
-                len(remaining_tiles),
-            ))
+            tile_pos = remaining_tiles[clump_rand.randrange(0, len(remaining_tiles))]
             remaining_tiles.remove(tile_pos)
 
             pos = Vec(tile_pos)
@@ -950,13 +1112,20 @@ class GenClump(Generator):
                 Vec.iter_grid(pos_min, pos_max, 128)
             ))
 
-            self._clump_locs.append(Clump(
+            clump = Clump(
                 pos_min.x, pos_min.y, pos_min.z,
                 pos_max.x, pos_max.y, pos_max.z,
                 # We use this to reseed an RNG, giving us the same textures
                 # each time for the same clump.
                 clump_rand.getrandbits(64).to_bytes(8, 'little'),
-            ))
+            )
+            self._clump_locs.append(clump)
+            for cell in itertools.product(
+                range(int(pos_min.x // CLUMP_CELL), int(pos_max.x // CLUMP_CELL) + 1),
+                range(int(pos_min.y // CLUMP_CELL), int(pos_max.y // CLUMP_CELL) + 1),
+                range(int(pos_min.z // CLUMP_CELL), int(pos_max.z // CLUMP_CELL) + 1),
+            ):
+                self._clump_grid.setdefault(cell, []).append(clump)
             if debug_visgroup is not None:
                 # noinspection PyUnboundLocalVariable
                 debug_brush: Solid = vmf.make_prism(
@@ -998,8 +1167,19 @@ class GenClump(Generator):
         return rng.choice(self.textures[tex_name])
 
     def _find_clump(self, loc: Vec) -> Optional[bytes]:
-        """Return the clump seed matching a location."""
-        for clump in self._clump_locs:
+        """Return the clump seed matching a location.
+
+        If multiple overlap, the first one created is used.
+        """
+        try:
+            clumps = self._clump_grid[
+                int(loc.x // CLUMP_CELL),
+                int(loc.y // CLUMP_CELL),
+                int(loc.z // CLUMP_CELL),
+            ]
+        except KeyError:
+            return None
+        for clump in clumps:
             if (
                 clump.x1 <= loc.x <= clump.x2 and
                 clump.y1 <= loc.y <= clump.y2 and
@@ -0,0 +1,153 @@
+"""Records how long each phase of the compilers takes, and writes a JSON report.
+
+The report is saved next to the compile log, so times can be compared between
+compiles, for instance to find regressions after updating packages.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional
+import contextlib
+import json
+import time
+
+import srctools.logger
+
+import utils
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+REPORT_VERSION = 1
+
+_tool = ''
+_started = time.time()
+_start_time = _last_time = time.perf_counter()
+# Phase name -> duration.
+_phases: Dict[str, float] = {}
+# Category -> name -> [total time, call count].
+_timings: Dict[str, Dict[str, List[float]]] = {}
+_counts: Dict[str, int] = {}
+
+
+def reset(tool: str) -> None:
+    """Start profiling for the specified compiler."""
+    global _tool, _started, _start_time, _last_time
+    _tool = tool
+    _started = time.time()
+    _start_time = _last_time = time.perf_counter()
+    _phases.clear()
+    _timings.clear()
+    _counts.clear()
+
+
+def checkpoint(name: str) -> None:
+    """Record the time since the previous checkpoint or phase as a phase of the compile.
+
+    Repeated phases are added together.
+    """
+    global _last_time
+    now = time.perf_counter()
+    _phases[name] = _phases.get(name, 0.0) + now - _last_time
+    _last_time = now
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block of code as a phase of the compile."""
+    checkpoint('other')
+    try:
+        yield
+    finally:
+        checkpoint(name)
+
+
+def add_time(category: str, name: str, duration: float) -> None:
+    """Record the time taken by something which may occur many times."""
+    try:
+        timing = _timings[category][name]
+    except KeyError:
+        _timings.setdefault(category, {})[name] = [duration, 1]
+    else:
+        timing[0] += duration
+        timing[1] += 1
+
+
+def set_count(name: str, value: int) -> None:
+    """Record the number of some item in the map."""
+    _counts[name] = value
+
+
+def peak_memory() -> Optional[int]:
+    """Return the peak memory usage of this process in bytes, if available."""
+    try:
+        if utils.WIN:
+            import ctypes
+            from ctypes import wintypes
+
+            class MemoryCounters(ctypes.Structure):
+                """PROCESS_MEMORY_COUNTERS."""
+                _fields_ = [
+                    ('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            get_process = ctypes.windll.kernel32.GetCurrentProcess
+            get_process.restype = wintypes.HANDLE
+            get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+            get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(MemoryCounters), wintypes.DWORD]
+            counters = MemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            if not get_info(get_process(), ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PeakWorkingSetSize
+        else:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux reports kilobytes, Mac bytes.
+            return peak if utils.MAC else peak * 1024
+    except Exception:
+        LOGGER.debug('Could not fetch memory usage:', exc_info=True)
+        return None
+
+
+def report() -> Dict[str, Any]:
+    """Produce the report data."""
+    return {
+        'version': REPORT_VERSION,
+        'tool': _tool,
+        'started': _started,
+        'total': time.perf_counter() - _start_time,
+        'peak_memory': peak_memory(),
+        'phases': dict(_phases),
+        'counts': dict(_counts),
+        'timings': {
+            category: {
+                name: {'time': total, 'calls': int(calls)}
+                for name, (total, calls) in sorted(
+                    timings.items(),
+                    key=lambda item: item[1][0],
+                    reverse=True,
+                )
+            }
+            for category, timings in _timings.items()
+        },
+    }
+
+
+def write_report(filename: str) -> None:
+    """Write the report to the specified file, and log the slowest phases."""
+    data = report()
+    LOGGER.info('Compile took {:.2f}s, slowest phases:', data['total'])
+    for name, duration in sorted(_phases.items(), key=lambda item: item[1], reverse=True)[:5]:
+        LOGGER.info(' - {}: {:.3f}s', name, duration)
+    try:
+        with srctools.AtomicWriter(filename) as f:
+            json.dump(data, f, indent=1)
+    except OSError:
+        LOGGER.warning('Could not write profile report:', exc_info=True)
@@ -0,0 +1,103 @@
+"""Coalesces loadscreen progress updates before they're sent to the background daemon.
+
+Loading packages or exporting steps the loadscreens thousands of times, and sending
+each as a separate message is costly for both processes. Instead steps and lengths
+are accumulated per stage, and sent as a single 'batch' message at most once per
+frame interval. Any other message flushes the pending updates first, so the order
+is preserved. If updates stop partway through a frame, a scheduled flush sends the
+remainder. This is a separate module so both processes can share it.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional, Tuple
+import time
+
+
+# The minimum time between batches, there's no point updating faster than the screen.
+FRAME_INTERVAL = 1 / 30
+# Screen ID -> (stage -> new length, stage -> number of steps).
+Batch = Dict[int, Tuple[Dict[str, int], Dict[str, int]]]
+# Calls the function after the specified delay in seconds.
+Scheduler = Callable[[float, Callable[[], object]], object]
+
+
+class ProgressBatcher:
+    """Accumulates steps and lengths for each screen, and sends them in batches.
+
+    Messages are (command, screen ID, args) tuples. Batches are sent as
+    ('batch', None, Batch). Skipping a stage is sent as a separate 'skip_stage'
+    message. If a scheduler is provided, it is used to flush updates which would
+    otherwise be left pending.
+    """
+    def __init__(
+        self,
+        send: Callable[[Tuple[str, Any, Any]], object],
+        interval: float = FRAME_INTERVAL,
+        clock: Callable[[], float] = time.perf_counter,
+        schedule: Optional[Scheduler] = None,
+    ) -> None:
+        self._send = send
+        self.interval = interval
+        self._clock = clock
+        self._schedule = schedule
+        self._flush_scheduled = False
+        self._next_flush = 0.0
+        self._lengths: Dict[int, Dict[str, int]] = {}
+        self._steps: Dict[int, Dict[str, int]] = {}
+
+    def step(self, scr_id: int, stage: str) -> bool:
+        """Increment a stage, returning whether a batch was sent."""
+        try:
+            steps = self._steps[scr_id]
+        except KeyError:
+            steps = self._steps[scr_id] = {}
+        steps[stage] = steps.get(stage, 0) + 1
+        return self._flush_if_due()
+
+    def set_length(self, scr_id: int, stage: str, num: int) -> bool:
+        """Set the length of a stage, returning whether a message was sent."""
+        if num == 0:
+            # This skips the stage, resetting any previous progress. That needs to be
+            # ordered relative to other updates to the stage, so it can't be batched.
+            self._steps.get(scr_id, {}).pop(stage, None)
+            self._lengths.get(scr_id, {}).pop(stage, None)
+            self.send(('skip_stage', scr_id, (stage, )))
+            return True
+        self._lengths.setdefault(scr_id, {})[stage] = num
+        return self._flush_if_due()
+
+    def send(self, msg: Tuple[str, Any, Any]) -> None:
+        """Send any other message, after the pending updates."""
+        self.flush()
+        self._send(msg)
+
+    def _flush_if_due(self) -> bool:
+        """Send the batch if enough time has passed since the last."""
+        now = self._clock()
+        if now >= self._next_flush:
+            self.flush()
+            return True
+        if self._schedule is not None and not self._flush_scheduled:
+            # Make sure these are sent, even if no more updates arrive.
+            self._flush_scheduled = True
+            self._schedule(self._next_flush - now, self._scheduled_flush)
+        return False
+
+    def _scheduled_flush(self) -> None:
+        """Called by the scheduler, to send updates left pending."""
+        self._flush_scheduled = False
+        self.flush()
+
+    def flush(self) -> None:
+        """Send all pending updates immediately."""
+        self._next_flush = self._clock() + self.interval
+        if not self._lengths and not self._steps:
+            return
+        batch: Batch = {
+            scr_id: (self._lengths.pop(scr_id, {}), steps)
+            for scr_id, steps in self._steps.items()
+        }
+        for scr_id, lengths in self._lengths.items():
+            batch[scr_id] = (lengths, {})
+        self._lengths.clear()
+        self._steps.clear()
+        self._send(('batch', None, batch))
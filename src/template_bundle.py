@@ -0,0 +1,147 @@
+"""A bundle of pre-parsed template VMFs, written on export for the compiler.
+
+The bundle starts with an index of template IDs, the location of the original
+file and its modification time, followed by each template's keyvalues tree in the
+marshal form from config_snapshot. The compiler memory-maps the file, and only
+decodes templates when used. If the original file was modified, it's ignored so
+the compiler reads the changed file.
+
+Only the keyvalues are stored, so this skips reading and tokenising the VMF. The
+compiler still needs to build the brushes and entities from the tree for each template.
+"""
+from __future__ import annotations
+from typing import IO, Dict, Iterable, Optional, Tuple
+import marshal
+import mmap
+import os
+import struct
+
+from srctools import Property
+import srctools.logger
+
+from config_snapshot import encode_props, decode_props
+
+
+LOGGER = srctools.logger.get_logger(__name__)
+MAGIC = b'BEE2TMPL'
+VERSION = 1
+# Magic, version, template count.
+HEADER = struct.Struct('<8sHI')
+# Modification time, data offset, data size, then the sizes of the ID, package and path.
+ENTRY = struct.Struct('<dIIHHH')
+
+
+def source_mtime(pak_path: str, path: str) -> float:
+    """Return the modification time of a template's file.
+
+    For zips this is the whole package, for folders the file itself.
+    """
+    if os.path.isdir(pak_path):
+        return os.stat(os.path.join(pak_path, path)).st_mtime
+    else:
+        return os.stat(pak_path).st_mtime
+
+
+def encode(props: Property) -> bytes:
+    """Encode a parsed template VMF."""
+    return marshal.dumps([encode_props(prop) for prop in props])
+
+
+def write(file: IO[bytes], templates: Iterable[Tuple[str, str, str, float, bytes]]) -> None:
+    """Write the bundle.
+
+    Templates should be (id, package path, path, modification time, encoded data) tuples.
+    """
+    index = bytearray()
+    data = bytearray()
+    count = 0
+    for temp_id, pak_path, path, mtime, encoded in templates:
+        temp_id_b = temp_id.casefold().encode('utf8')
+        pak_path_b = pak_path.encode('utf8')
+        path_b = path.encode('utf8')
+        index += ENTRY.pack(mtime, len(data), len(encoded), len(temp_id_b), len(pak_path_b), len(path_b))
+        index += temp_id_b + pak_path_b + path_b
+        data += encoded
+        count += 1
+    file.write(HEADER.pack(MAGIC, VERSION, count))
+    file.write(index)
+    file.write(data)
+
+
+class TemplateBundle:
+    """Reads templates from the bundle.
+
+    This keeps the file mapped, so it must be closed once no more templates are needed.
+    """
+    def __init__(self, file: IO[bytes]) -> None:
+        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a template bundle!')
+        if version != VERSION:
+            raise ValueError(f'Unknown template bundle version {version}!')
+        pos = HEADER.size
+        # ID -> package, path, mtime, offset, size.
+        self._index: Dict[str, Tuple[str, str, float, int, int]] = {}
+        for _ in range(count):
+            mtime, offset, size, id_size, pak_size, path_size = ENTRY.unpack_from(self._map, pos)
+            pos += ENTRY.size
+            temp_id = self._map[pos:pos + id_size].decode('utf8')
+            pos += id_size
+            pak_path = self._map[pos:pos + pak_size].decode('utf8')
+            pos += pak_size
+            path = self._map[pos:pos + path_size].decode('utf8')
+            pos += path_size
+            self._index[temp_id] = (pak_path, path, mtime, offset, size)
+        self._data_start = pos
+
+    @classmethod
+    def open(cls, filename: str) -> Optional[TemplateBundle]:
+        """Open the bundle, returning None if it is missing or invalid."""
+        try:
+            with open(filename, 'rb') as f:
+                # The map stays valid after the file is closed.
+                return cls(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error):
+            LOGGER.warning('Could not read template bundle:', exc_info=True)
+            return None
+
+    def __enter__(self) -> TemplateBundle:
+        return self
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, temp_id: str) -> bool:
+        return temp_id.casefold() in self._index
+
+    def get(self, temp_id: str, pak_path: str, path: str) -> Optional[Property]:
+        """Decode the specified template.
+
+        If it's not present, or the original file has changed since, return None.
+        """
+        if self._map.closed:
+            return None
+        try:
+            bundle_pak, bundle_path, mtime, offset, size = self._index[temp_id.casefold()]
+        except KeyError:
+            return None
+        if bundle_pak != pak_path or bundle_path != path:
+            return None
+        try:
+            if source_mtime(pak_path, path) != mtime:
+                LOGGER.info('Template "{}" was modified, reparsing.', temp_id)
+                return None
+        except FileNotFoundError:
+            return None
+        start = self._data_start + offset
+        return Property.root(*map(decode_props, marshal.loads(self._map[start:start + size])))
+
+    def close(self) -> None:
+        """Close the bundle, releasing the mapped file. Templates can no longer be read."""
+        self._map.close()
@@ -0,0 +1,85 @@
+"""Test caching of parsed package info files."""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import os
+import zipfile
+
+import pytest
+from srctools import Property
+from srctools.filesys import ZipFileSystem
+
+from packages import INFO_POOL_WORKERS, InfoCache, make_info_pool
+
+
+INFO = '''\
+"ID" "TEST_PACKAGE"
+"Name" "Test package"
+"Item"
+    {
+    "ID" "SOME_ITEM"
+    }
+'''
+
+
+def make_package(path: Path, info: str, mtime: int) -> ZipFileSystem:
+    """Write a package zip with the specified info.txt and modification time."""
+    with zipfile.ZipFile(path, 'w') as zipf:
+        zipf.writestr('info.txt', info)
+    os.utime(path, (mtime, mtime))
+    return ZipFileSystem(path)
+
+
+@pytest.mark.parametrize('use_pool', [None, 'thread', 'process'])
+async def test_info_cache(tmp_path: Path, use_pool: Optional[str]) -> None:
+    """Check info files are cached, and reparsed when modified."""
+    pack_path = tmp_path / 'test.bee_pack'
+    cache_path = tmp_path / 'cache.pickle'
+    expected = Property.parse(INFO)
+
+    async def parse(cache: InfoCache, fsys: ZipFileSystem) -> Property:
+        """Parse using the cache."""
+        if use_pool == 'thread':
+            with ThreadPoolExecutor() as cache.pool:
+                return await cache.parse(fsys, pack_path)
+        elif use_pool == 'process':
+            with make_info_pool() as cache.pool:
+                return await cache.parse(fsys, pack_path)
+        return await cache.parse(fsys, pack_path)
+
+    fsys = make_package(pack_path, INFO, 1000)
+    cache = InfoCache(cache_path)
+    cache.load()  # Missing, should be ignored.
+    info = await parse(cache, fsys)
+    assert info == expected
+    # Modifying the result must not affect the cache.
+    info.append(Property('extra', 'value'))
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.save()
+
+    cache = InfoCache(cache_path)
+    cache.load()
+    fsys = make_package(pack_path, 'bad " syntax', 1000)
+    # Unchanged, so the cached version is used without reading the file.
+    assert await parse(cache, fsys) == expected
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    fsys = make_package(pack_path, INFO + '"Desc" "Changed"\n', 2000)
+    cache = InfoCache(cache_path)
+    cache.load()
+    info = await parse(cache, fsys)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert info['desc'] == 'Changed'
+
+
+def test_info_pool_workers() -> None:
+    """Worker processes are limited, and don't import the application."""
+    with make_info_pool() as pool:
+        assert pool._max_workers <= INFO_POOL_WORKERS
+        assert pool.submit(Property.parse, INFO, 'info.txt').result() == Property.parse(INFO)
+        # Use a builtin, so the worker doesn't need to import this module.
+        modules = pool.submit(eval, 'set(__import__("sys").modules)').result()
+    assert 'srctools' in modules
+    assert 'tkinter' not in modules
+    assert 'app' not in modules
+    assert 'packages' not in modules
@@ -0,0 +1,84 @@
+"""Test reading puzzle files for the backup window."""
+from io import StringIO
+from pathlib import Path
+import os
+
+import pytest
+from srctools import Property
+
+import packages  # noqa - Import first to avoid a circular import.
+from app.backup import HeaderCache, P2C_HEADER_KEYS, parse_p2c_header
+from FakeZip import FakeZip
+
+
+PUZZLE = '''\
+"portal2_puzzle"
+{
+\t"AppID"\t\t"644"
+\t"Version"\t\t"12"
+\t"FileID"\t\t"0x0000000000000000"
+\t"Timestamp_Created"\t\t"0x000000005C3C1A2B"
+\t"Timestamp_Modified"\t\t"0x000000005C3C1B00"
+\t"CompileTime"\t\t"0x00000000"
+\t"Title"\t\t"Some Puzzle"
+\t"Description"\t\t"A description\\nwith an escape"
+\t"PreviewDirty"\t\t"0"
+\t"Coop"\t\t"1"
+\t"Voxels"
+\t{
+\t\t"Voxel"
+\t\t{
+\t\t\t"Position"\t\t"0 0 0"
+\t\t}
+\t}
+\t"Items"
+\t{
+\t}
+}
+'''
+
+
+def test_header() -> None:
+    """Check the header matches parsing the whole file."""
+    header = parse_p2c_header(StringIO(PUZZLE), 'test.p2c')
+    props = Property.parse(PUZZLE).find_key('portal2_puzzle')
+    assert header == {
+        key: props[key]
+        for key in P2C_HEADER_KEYS
+    }
+    assert header['title'] == 'Some Puzzle'
+
+
+def test_header_stops() -> None:
+    """The data after the header isn't read, even if it is invalid."""
+    text = PUZZLE.replace('"Coop"\t\t"1"', '') + '}\n'
+    with pytest.raises(Exception):
+        Property.parse(text)
+    header = parse_p2c_header(StringIO(text), 'test.p2c')
+    assert header['description'] == 'A description\nwith an escape'
+    assert 'coop' not in header
+
+
+def test_header_cache(tmp_path: Path) -> None:
+    """Check headers are cached until the file changes."""
+    folder = tmp_path / 'puzzles'
+    folder.mkdir()
+    (folder / 'a.p2c').write_text(PUZZLE)
+    (folder / 'b.p2c').write_text('bad syntax {')
+    zip_file = FakeZip(str(folder))
+
+    cache = HeaderCache(tmp_path / 'cache.pickle')
+    cache.load()
+    assert cache.read(zip_file, 'a')['title'] == 'Some Puzzle'
+    assert cache.read(zip_file, 'b') is None
+    assert (cache.hits, cache.misses) == (0, 2)
+    cache.save()
+
+    cache = HeaderCache(tmp_path / 'cache.pickle')
+    cache.load()
+    (folder / 'a.p2c').write_text(PUZZLE.replace('Some Puzzle', 'Renamed!!!!'))
+    os.utime(folder / 'a.p2c', ns=(1000, 1000))
+    assert cache.read(zip_file, 'b') is None
+    assert cache.read(zip_file, 'a')['title'] == 'Renamed!!!!'
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.read(zip_file, 'a')['title'] == 'Renamed!!!!'
@@ -0,0 +1,85 @@
+"""Test the automatic backup store."""
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZipFile
+
+import pytest
+
+from backup_store import MANIFEST_EXT, BackupStore, Snapshot, find_snapshots
+
+
+def test_dedup_and_restore(tmp_path: Path) -> None:
+    """Check files are stored once, and snapshots restore the same files."""
+    puzzles = tmp_path / 'puzzles'
+    puzzles.mkdir()
+    (puzzles / 'a.p2c').write_bytes(b'"portal2_puzzle"\r\n{\r\n}\r\n')
+    (puzzles / 'a.jpg').write_bytes(bytes(range(256)) * 8)
+    (puzzles / 'copy.p2c').write_bytes(b'"portal2_puzzle"\r\n{\r\n}\r\n')
+    store = BackupStore(str(tmp_path / 'backups'))
+
+    first = Snapshot({file.name: store.add_file(str(file)) for file in puzzles.iterdir()})
+    assert first.files['a.p2c'] == first.files['copy.p2c']
+    blobs = sorted((tmp_path / 'backups' / 'blobs').rglob('*.xz'))
+    assert len(blobs) == 2
+    mtimes = [blob.stat().st_mtime_ns for blob in blobs]
+    first.write(str(tmp_path / 'backups' / f'back_first{MANIFEST_EXT}'))
+
+    (puzzles / 'copy.p2c').write_bytes(b'"portal2_puzzle"\r\n{\r\n"changed" "1"\r\n}\r\n')
+    (puzzles / 'a.p2c').write_bytes(b'"portal2_puzzle"\r\n{\r\n"changed" "2"\r\n}\r\n')
+    second = Snapshot({file.name: store.add_file(str(file)) for file in puzzles.iterdir()})
+    # Unchanged files are not written again.
+    assert [blob.stat().st_mtime_ns for blob in blobs] == mtimes
+    assert len(list((tmp_path / 'backups' / 'blobs').rglob('*.xz'))) == 4
+    second.write(str(tmp_path / 'backups' / f'back_second{MANIFEST_EXT}'))
+
+    assert Snapshot.read(str(tmp_path / 'backups' / f'back_first{MANIFEST_EXT}')) == first
+    store.restore(first, str(tmp_path / 'restored'))
+    assert (tmp_path / 'restored' / 'copy.p2c').read_bytes() == b'"portal2_puzzle"\r\n{\r\n}\r\n'
+    assert (tmp_path / 'restored' / 'a.jpg').read_bytes() == (puzzles / 'a.jpg').read_bytes()
+
+    buf = BytesIO()
+    store.write_zip(second, buf)
+    with ZipFile(buf) as zip_file:
+        assert sorted(zip_file.namelist()) == ['a.jpg', 'a.p2c', 'copy.p2c']
+        for name in zip_file.namelist():
+            assert zip_file.read(name) == (puzzles / name).read_bytes()
+
+    # Removing the first snapshot frees only the original puzzle, the screenshot is still used.
+    (tmp_path / 'backups' / f'back_first{MANIFEST_EXT}').unlink()
+    assert store.collect_garbage(find_snapshots(str(tmp_path / 'backups'))) == 1
+    store.restore(second, str(tmp_path / 'restored_2'))
+
+
+def test_corrupt_manifest(tmp_path: Path) -> None:
+    """If a manifest can't be read, blobs must not be removed."""
+    file = tmp_path / 'file.p2c'
+    file.write_bytes(b'data')
+    store = BackupStore(str(tmp_path))
+    store.add_file(str(file))
+    (tmp_path / f'back_bad{MANIFEST_EXT}').write_text('{"version": 1, "created"')
+    assert store.collect_garbage(find_snapshots(str(tmp_path))) is None
+    assert store.collect_garbage([]) == 1
+
+    (tmp_path / f'back_bad{MANIFEST_EXT}').write_text('{"version": 1000, "created": 0, "files": {}}')
+    with pytest.raises(ValueError):
+        Snapshot.read(str(tmp_path / f'back_bad{MANIFEST_EXT}'))
+
+
+def test_other_files(tmp_path: Path) -> None:
+    """Other files in the backup folder are not treated as manifests."""
+    file = tmp_path / 'file.p2c'
+    file.write_bytes(b'data')
+    store = BackupStore(str(tmp_path))
+    blob_hash = store.add_file(str(file))
+    Snapshot({'file.p2c': blob_hash}).write(str(tmp_path / f'back_game{MANIFEST_EXT}'))
+    (tmp_path / 'settings.json').write_text('[1, 2, 3]')
+    (tmp_path / 'back_old.zip').write_bytes(b'PK')
+    assert find_snapshots(str(tmp_path)) == [str(tmp_path / f'back_game{MANIFEST_EXT}')]
+    assert store.collect_garbage(find_snapshots(str(tmp_path))) == 0
+
+    # Manifests which aren't objects are invalid, not a crash.
+    for data in ['[1, 2, 3]', '"text"', '{"version": 1, "created": 0, "files": []}']:
+        (tmp_path / f'back_bad{MANIFEST_EXT}').write_text(data)
+        with pytest.raises(ValueError):
+            Snapshot.read(str(tmp_path / f'back_bad{MANIFEST_EXT}'))
+    assert store.collect_garbage(find_snapshots(str(tmp_path))) is None
@@ -0,0 +1,116 @@
+"""Test the brush location grid."""
+from __future__ import annotations
+from random import Random
+
+import pytest
+from srctools import Vec
+
+from precomp.brushLoc import Block, DenseGrid, Grid
+import user_errors
+
+
+DIRECTIONS = [
+    Vec(1, 0, 0), Vec(-1, 0, 0),
+    Vec(0, 1, 0), Vec(0, -1, 0),
+    Vec(0, 0, 1), Vec(0, 0, -1),
+    Vec(1, 1, 0), Vec(0, 2, -1),
+]
+
+
+def build_map(grid: Grid, seed: int) -> None:
+    """Build a random sealed map, with goo and some positions outside the array."""
+    rand = Random(seed)
+    size = rand.randint(4, 20)
+    for x in range(-1, size + 1):
+        for y in range(-1, size + 1):
+            for z in range(-1, size + 1):
+                if x in (-1, size) or y in (-1, size) or z in (-1, size):
+                    grid[x, y, z] = Block.SOLID
+                elif rand.random() < 0.1:
+                    grid[x, y, z] = rand.choice([Block.SOLID, Block.EMBED, Block.OCCUPIED])
+    for x in range(size):
+        for y in range(size // 2):
+            grid[x, y, 0] = Block.GOO_TOP if y == 0 else Block.PIT_MID
+    grid[60, 3, 4] = Block.EMBED
+    grid[1.5, 2, 3] = Block.SOLID
+    grid[2, -30, 3] = Block.VOID
+    # Delete and re-add, to check order is kept.
+    del grid[0, 0, -1]
+    grid[0, 0, -1] = Block.SOLID
+    grid.fill_air([
+        (Vec(x, 0, 0), True) for x in range(size)
+    ] + [
+        (Vec(rand.randrange(size), rand.randrange(size), rand.randrange(size)), False)
+        for _ in range(4)
+    ])
+
+
+def as_set(positions: list[Vec]) -> set[tuple[float, float, float]]:
+    """Convert a list of positions to a set, checking there aren't duplicates."""
+    result = {pos.as_tuple() for pos in positions}
+    assert len(result) == len(positions)
+    return result
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_dense_matches(seed: int) -> None:
+    """Check the dense grid behaves identically to the dict version."""
+    grid = Grid()
+    dense = DenseGrid()
+    build_map(grid, seed)
+    build_map(dense, seed)
+    assert len(dense) == len(grid)
+    assert list(dense.items()) == list(grid.items())
+    assert list(dense) == list(grid)
+    for pos, block in grid.items():
+        assert pos in dense
+        assert (pos, block) in dense.items()
+        assert dense[pos] is block
+    assert (1, 2, 40) not in dense
+    assert dense[1, 2, 40] is Block.VOID
+
+    rand = Random(seed)
+    for block_set in [{Block.AIR}, {Block.SOLID, Block.EMBED}, {Block.VOID}]:
+        assert as_set(dense.find_blocks(block_set)) == as_set(grid.find_blocks(block_set))
+    start = grid.find_blocks({Block.AIR})[0]
+    filled = as_set(dense.flood_fill(start, {Block.AIR}))
+    assert start.as_tuple() in filled
+    assert filled == as_set(grid.flood_fill(start, {Block.AIR}))
+    solid = as_set(dense.flood_fill((-1, -1, -1), {Block.SOLID}))
+    assert solid == as_set(grid.flood_fill((-1, -1, -1), {Block.SOLID}))
+
+    positions = []
+    directions = []
+    for _ in range(200):
+        pos = Vec(rand.randrange(-2, 22), rand.randrange(-2, 22), rand.randrange(-2, 22))
+        direction = rand.choice(DIRECTIONS)
+        try:
+            expected = grid.raycast(pos, direction)
+        except ValueError as exc:
+            with pytest.raises(ValueError) as dense_exc:
+                dense.raycast(pos, direction)
+            assert str(dense_exc.value) == str(exc)
+        else:
+            assert dense.raycast(pos, direction) == expected
+            positions.append(pos)
+            directions.append(direction)
+    assert dense.raycast_many(positions, directions) == grid.raycast_many(positions, directions)
+
+
+def test_dense_flood_fill_edge() -> None:
+    """Check flood fill doesn't wrap around the edge of the array."""
+    grid = DenseGrid()
+    grid[47, 0, 0] = Block.AIR
+    grid[-16, 0, 1] = Block.AIR
+    assert grid.flood_fill((47, 0, 0), {Block.AIR}) == [Vec(47, 0, 0)]
+    # If positions are outside the array, they should be found.
+    grid[48, 0, 0] = Block.AIR
+    assert as_set(grid.flood_fill((47, 0, 0), {Block.AIR})) == {(47, 0, 0), (48, 0, 0)}
+
+
+def test_dense_leak() -> None:
+    """Check leaks are still detected."""
+    grid = DenseGrid()
+    grid[0, 0, 0] = Block.SOLID
+    with pytest.raises(user_errors.UserError):
+        grid.fill_air([(Vec(1, 0, 0), False)])
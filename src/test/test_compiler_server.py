@@ -0,0 +1,100 @@
+"""Test the resident compiler server protocol."""
+from pathlib import Path
+import contextlib
+import os
+import stat
+import sys
+import tempfile
+import threading
+
+import pytest
+
+import compiler_server
+
+
+pytestmark = pytest.mark.skipif(not compiler_server.SUPPORTED, reason='Requires os.fork().')
+
+
+def test_socket_path(tmp_path: Path) -> None:
+    """The socket path depends only on the game's location."""
+    path = compiler_server.socket_path(str(tmp_path))
+    assert path == compiler_server.socket_path(str(tmp_path / 'bee2' / '..'))
+    assert path != compiler_server.socket_path(str(tmp_path / 'bee2'))
+    assert len(path) < 100
+
+
+def test_socket_folder(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sockets are placed in a folder only accessible to the current user."""
+    runtime = tmp_path / 'runtime'
+    runtime.mkdir()
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(runtime))
+    assert compiler_server.socket_folder() == str(runtime)
+    assert os.path.dirname(compiler_server.socket_path(str(tmp_path))) == str(runtime)
+
+    # Without it, a private folder is created in the temporary directory.
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    folder = compiler_server.socket_folder()
+    assert os.path.dirname(folder) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(folder).st_mode) == 0o700
+    assert compiler_server.socket_folder() == folder
+
+    # If others can access it, it isn't used.
+    os.chmod(folder, 0o777)
+    with pytest.raises(OSError):
+        compiler_server.socket_folder()
+    with pytest.raises(OSError):
+        compiler_server.socket_path(str(tmp_path))
+    assert compiler_server.listen(str(tmp_path)) is None
+    assert not compiler_server.stop(str(tmp_path))
+
+
+def test_no_server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Without a server, the client compiles in-process."""
+    monkeypatch.chdir(tmp_path)
+    assert compiler_server.run_client() is None
+    assert not compiler_server.stop(str(tmp_path))
+
+
+def test_compile(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Compile in a worker, then quit once the game is exported again."""
+    (tmp_path / 'bee2').mkdir()
+    compiler_server.write_stamp(str(tmp_path))
+    stamp = compiler_server.read_stamp(str(tmp_path))
+    assert stamp is not None
+    result_file = tmp_path / 'result.txt'
+
+    def compile_map() -> None:
+        """Record the arguments, then fail with a specific code."""
+        result_file.write_text(f'{os.getcwd()}|{" ".join(sys.argv)}|{os.environ["BEE2_TEST"]}')
+        sys.exit(3)
+
+    listener = compiler_server.listen(str(tmp_path))
+    assert listener is not None
+    server = threading.Thread(
+        target=compiler_server.serve,
+        args=(listener, str(tmp_path), stamp, compile_map),
+    )
+    server.start()
+    stack = contextlib.ExitStack()
+    try:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(sys, 'argv', ['vbsp_linux', '-game', 'portal2', 'map.vmf'])
+        monkeypatch.setenv('BEE2_TEST', 'env')
+        # Pytest replaces the console streams, send real files to the worker instead.
+        for name in ['stdin', 'stdout', 'stderr']:
+            monkeypatch.setattr(sys, name, stack.enter_context(open(tmp_path / name, 'a+')))
+        assert compiler_server.run_client() == 3
+        assert result_file.read_text() == f'{os.getcwd()}|vbsp_linux -game portal2 map.vmf|env'
+
+        # Exporting again makes the server quit, leaving the client to compile.
+        (tmp_path / compiler_server.STAMP_FILE).write_text('different')
+        assert compiler_server.run_client() is None
+        server.join(10.0)
+        assert not server.is_alive()
+        assert not os.path.exists(compiler_server.socket_path(str(tmp_path)))
+    finally:
+        stack.close()
+        if server.is_alive():
+            compiler_server.stop(str(tmp_path))
+            server.join(10.0)
@@ -0,0 +1,231 @@
+"""Test parts of the conditions system."""
+from __future__ import annotations
+from pathlib import Path
+from random import Random
+from typing import Callable
+
+import pytest
+from srctools import Entity, Property, VMF
+from srctools.vmf import CopySet
+
+from precomp import conditions
+from precomp.conditions import CondCall, FlagScope, InstanceIndex
+import precomp.conditions.logical  # noqa: F401 - Registers NOT.
+
+
+class FakeInst:
+    """Mimics the part of an instance the index uses, with a reproducible hash.
+
+    Entities hash by identity, which would make iteration order differ between runs.
+    """
+    def __init__(self, num: int, filename: str) -> None:
+        self.num = num
+        self.file = filename
+
+    def __hash__(self) -> int:
+        return self.num
+
+    def __getitem__(self, key: str) -> str:
+        assert key == 'file', key
+        return self.file
+
+
+def run_conditions(indexed: bool, seed: int) -> list[int]:
+    """Simulate a condition modifying the map, and return the visited instances."""
+    start_rand = Random(1234)
+    instances: CopySet[FakeInst] = CopySet(
+        FakeInst(i, start_rand.choice('abcd'))
+        for i in range(400)
+    )
+    all_inst = sorted(instances, key=lambda inst: inst.num)
+    index = InstanceIndex()
+    index.sync(instances)  # type: ignore
+
+    rand = Random(seed)
+    visited = []
+    for inst in (index.iter_matching(instances, 'ab') if indexed else instances):  # type: ignore
+        if inst.file not in 'ab':
+            continue
+        visited.append(inst.num)
+        action = rand.random()
+        if action < 0.3:  # Change a random instance.
+            other = rand.choice(all_inst)
+            other.file = rand.choice('abcd')
+            index.refresh(other)  # type: ignore
+        elif action < 0.45:
+            new_inst = FakeInst(len(all_inst), rand.choice('abcd'))
+            instances.add(new_inst)
+            all_inst.append(new_inst)
+        elif action < 0.5:
+            instances.discard(inst)
+        if rand.random() < 0.3:  # Change ourselves.
+            inst.file = rand.choice('abcd')
+            index.refresh(inst)  # type: ignore
+    return visited
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_index_matches_full_scan(seed: int) -> None:
+    """Check the index visits the same instances in the same order as a full scan."""
+    assert run_conditions(True, seed) == run_conditions(False, seed)
+
+
+def test_condition_stats(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Check the cost of conditions is counted when enabled."""
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_even', lambda coll, info, inst, flag: int(inst['num']) % 2 == 0)
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_always', lambda coll, info, inst, flag: True)
+    results = []
+    monkeypatch.setitem(conditions.RESULT_LOOKUP, 'test_record', lambda coll, info, inst, res: results.append(inst['num']))
+    monkeypatch.setattr(conditions, 'STATS', conditions.ConditionStats())
+
+    cond = conditions.Condition.parse(Property('Condition', [
+        Property('__src__', 'TEST_PACKAGE:test.cfg'),
+        Property('test_even', ''),
+        Property('!test_always', ''),
+        Property('test_always', ''),
+        Property('Result', [Property('test_record', '')]),
+        Property('Else', [Property('test_record', '')]),
+    ]), toplevel=True)
+    vmf = VMF()
+    for i in range(10):
+        cond.test(None, None, vmf.create_ent('func_instance', num=i, file='a.vmf'))  # type: ignore
+    assert results == [str(i) for i in range(10)]
+
+    stats = conditions.STATS
+    assert stats.condition(cond) == conditions.CostStats(calls=10, passed=5, time=0.0)
+    assert stats.flags['test_even'].calls == 10
+    assert stats.flags['test_even'].passed == 5
+    assert stats.flags['test_always'].calls == 5
+    assert stats.flags['test_always'].passed == 0  # Inverted.
+    assert stats.results['test_record'].calls == 10
+
+    filename = tmp_path / 'stats.csv'
+    stats.write_csv(str(filename))
+    lines = filename.read_text().splitlines()
+    assert lines[0] == 'kind,name,calls,passed,time_ms'
+    assert sorted(line.split(',')[1] for line in lines[1:]) == [
+        '#0 TEST_PACKAGE:test.cfg', 'test_always', 'test_even', 'test_record',
+    ]
+
+
+def test_compiled_flags(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check compiled conditions reuse the results of global and file flags."""
+    calls: dict[str, int] = {'global': 0, 'file': 0, 'inst': 0}
+    style_var = [True]
+
+    def flag_global(flag: Property) -> Callable[[Entity], bool]:
+        def check(inst: Entity) -> bool:
+            calls['global'] += 1
+            return style_var[0]
+        return check
+
+    def flag_file(inst: Entity, flag: Property) -> bool:
+        calls['file'] += 1
+        return inst['file'] == flag.value
+
+    def flag_inst(inst: Entity, flag: Property) -> bool:
+        calls['inst'] += 1
+        return int(inst['num']) % 2 == 0
+
+    results = []
+
+    def res_record(inst: Entity, res: Property) -> None:
+        results.append(int(inst['num']))
+        if res.value == 'disable':
+            style_var[0] = False
+
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_global', CondCall(flag_global, 'Test', FlagScope.GLOBAL))
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_file', CondCall(flag_file, 'Test', FlagScope.FILE))
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_inst', CondCall(flag_inst, 'Test', FlagScope.INSTANCE))
+    monkeypatch.setitem(conditions.RESULT_LOOKUP, 'test_record', CondCall(res_record, 'Test'))
+
+    vmf = VMF()
+    instances = [
+        vmf.create_ent('func_instance', num=i, file='abc'[i % 3])
+        for i in range(30)
+    ]
+
+    cond = conditions.Condition.parse(Property('Condition', [
+        Property('test_global', ''),
+        Property('NOT', [Property('test_file', 'c')]),
+        Property('test_inst', ''),
+        Property('Result', [Property('test_record', '')]),
+    ]), toplevel=True)
+    assert conditions.flag_scope(cond.flags[1]) is FlagScope.FILE
+    assert cond.scope() is FlagScope.INSTANCE
+    cond.compile()
+    for inst in instances:
+        cond.test(None, None, inst)  # type: ignore
+    assert results == [i for i in range(30) if i % 2 == 0 and i % 3 != 2]
+    # The file flag is only called once per file. Results may change
+    # global state, so the global flag is checked again after each.
+    assert calls == {'global': 1 + len(results), 'file': 3, 'inst': 20}
+
+    # The global flag is cleared after results run, so this only succeeds once.
+    results.clear()
+    cond = conditions.Condition.parse(Property('Condition', [
+        Property('test_global', ''),
+        Property('Result', [Property('test_record', 'disable')]),
+    ]), toplevel=True)
+    assert cond.scope() is FlagScope.GLOBAL
+    cond.compile()
+    assert cond.test_global(vmf, None, None)  # type: ignore
+    for inst in instances:
+        cond.test(None, None, inst)  # type: ignore
+    assert results == [0]
+    cond.compile()
+    assert not cond.test_global(vmf, None, None)  # type: ignore
+
+
+def test_global_logical_flags(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check logical flags wrapping global flags can be checked without an instance."""
+    style_var = [False]
+    seen_vmfs: list[VMF] = []
+
+    def flag_global(vmf: VMF, flag: Property) -> Callable[[Entity], bool]:
+        seen_vmfs.append(vmf)
+        return lambda inst: style_var[0]
+
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_global', CondCall(flag_global, 'Test', FlagScope.GLOBAL))
+    vmf = VMF()
+    for logic, expected in [('NOT', True), ('OR', False), ('AND', False), ('NAND', True)]:
+        cond = conditions.Condition.parse(Property('Condition', [
+            Property(logic, [Property('test_global', '')]),
+        ]), toplevel=True)
+        assert cond.scope() is FlagScope.GLOBAL, logic
+        cond.compile()
+        assert cond.test_global(vmf, None, None) is expected, logic  # type: ignore
+    assert seen_vmfs and all(seen is vmf for seen in seen_vmfs)
+
+
+def test_global_flag_not_setup(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Flags which don't take an entity and aren't setup functions are only called once per check."""
+    calls = 0
+    style_var = [True]
+
+    def flag_global(flag: Property) -> bool:
+        nonlocal calls
+        calls += 1
+        return style_var[0]
+
+    results = []
+
+    def res_record(inst: Entity, res: Property) -> None:
+        results.append(int(inst['num']))
+
+    monkeypatch.setitem(conditions.FLAG_LOOKUP, 'test_global', CondCall(flag_global, 'Test', FlagScope.GLOBAL))
+    monkeypatch.setitem(conditions.RESULT_LOOKUP, 'test_record', CondCall(res_record, 'Test'))
+    vmf = VMF()
+    cond = conditions.Condition.parse(Property('Condition', [
+        Property('test_global', ''),
+        Property('Result', [Property('test_record', '')]),
+    ]), toplevel=True)
+    cond.compile()
+    assert cond.test_global(vmf, None, None)  # type: ignore
+    assert calls == 1
+    # The first instance reuses that result, but results may change global state,
+    # so later instances check it again.
+    for i in range(3):
+        cond.test(None, None, vmf.create_ent('func_instance', num=i))  # type: ignore
+    assert results == [0, 1, 2]
+    assert calls == 3
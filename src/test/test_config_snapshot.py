@@ -0,0 +1,53 @@
+"""Test the pre-parsed vbsp_config snapshot."""
+from pathlib import Path
+
+from srctools import Property
+
+import config_snapshot
+
+
+CONFIG = '''\
+"Options"
+    {
+    "Game_ID" "620"
+    "Some_Option" "1"
+    }
+"Conditions"
+    {
+    "Condition"
+        {
+        "Instance" "<ITEM_TEST>"
+        "Result" { "ChangeInstance" "instances/other.vmf" }
+        }
+    }
+"Textures"
+    {
+    "Black.Wall" { "4x4" "tile/black_wall_4x4" }
+    "Empty" {}
+    }
+'''
+
+
+def test_snapshot(tmp_path: Path) -> None:
+    """Check the snapshot matches the text, and is ignored if the text changes."""
+    text_path = tmp_path / 'vbsp_config.cfg'
+    snapshot_path = tmp_path / 'vbsp_config.bin'
+    # Snapshot missing, use the text.
+    text_path.write_text(CONFIG, newline='\r\n')
+    expected = Property.parse(CONFIG)
+    assert config_snapshot.load(str(text_path), str(snapshot_path)) == expected
+
+    config_snapshot.write(str(text_path), str(snapshot_path))
+    assert snapshot_path.exists()
+    conf = config_snapshot.load(str(text_path), str(snapshot_path))
+    assert conf == expected
+    assert conf.find_key('Textures').find_key('Empty').has_children()
+
+    # Make the snapshot invalid, so we can tell if it's used.
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:-10])
+    assert config_snapshot.load(str(text_path), str(snapshot_path)) == expected
+
+    config_snapshot.write(str(text_path), str(snapshot_path))
+    text_path.write_text(CONFIG + '"Extra" "1"\n')
+    conf = config_snapshot.load(str(text_path), str(snapshot_path))
+    assert conf['extra'] == '1'
@@ -1,8 +1,13 @@
 """Test Editoritems syntax."""
+import io
+import pickle
+
+import pytest
 from srctools import Vec
 from editoritems import (
     Item, ItemClass,
     OccupiedVoxel, Coord, OccuType, DesiredFacing, FSPath, Sound, Handle, ConnSide, InstCount,
+    ItemDatabase, ItemSummary, item_summaries,
 )
 
 from app.localisation import TransToken
@@ -193,3 +198,61 @@ def test_instances() -> None:
         "second_cust": FSPath("instances/even_more.vmf"),
         "cust_name": FSPath("instances/a_custom_item.vmf"),
     }
+
+
+def test_item_database() -> None:
+    """Test the indexed item database round-trips, and decodes items lazily."""
+    [[goo, other], _] = Item.parse('''
+    Item
+    {
+        "Type"		"ITEM_GOO"
+        "ItemClass"	"ItemGoo"
+        "Editor" { "SubType" { "Name" "goo" } }
+        "Exporting"
+        {
+            "Instances"
+            {
+                "0" "instances/goo.vmf"
+                "2" "instances/goo_2.vmf"
+                "bee2_Custom" "instances/goo_custom.vmf"
+            }
+        }
+    }
+    Item
+    {
+        "Type"		"ITEM_Other"
+        "Editor" { "SubType" { "Name" "other" } }
+        "Exporting" { "TargetName" "other" }
+    }
+    ''')
+    buf = io.BytesIO()
+    ItemDatabase.write(buf, [goo, other])
+    buf.seek(0)
+    database = ItemDatabase.read(buf)
+
+    assert len(database) == 2
+    assert list(database) == ['item_goo', 'item_other']
+    assert 'Item_Goo' in database
+    assert 'item_missing' not in database
+    assert database._items == {}
+
+    assert [summary.id for summary in database.summaries()] == ['ITEM_GOO', 'ITEM_OTHER']
+    goo_summary = database.summaries()[0]
+    assert goo_summary == ItemSummary.from_item(goo)
+    assert goo_summary.instances == ['instances/goo.vmf', '.', 'instances/goo_2.vmf']
+    assert goo_summary.cust_instances == {'custom': 'instances/goo_custom.vmf'}
+    assert list(item_summaries({'item_goo': goo})) == [goo_summary]
+    # Summaries don't need the items.
+    assert database._items == {}
+
+    # Pickling drops blank sounds, so compare to a regular pickle.
+    read_other = database['item_OTHER']
+    assert read_other.__getstate__() == pickle.loads(pickle.dumps(other)).__getstate__()
+    assert database['ITEM_OTHER'] is read_other
+    assert list(database._items) == ['item_other']
+    assert database['item_goo'].__getstate__() == pickle.loads(pickle.dumps(goo)).__getstate__()
+
+    with pytest.raises(KeyError):
+        database['item_missing']
+    with pytest.raises(ValueError):
+        ItemDatabase(b'not a database' * 4)
@@ -0,0 +1,136 @@
+"""Test copying package resources into the game, using the resource manifest."""
+from pathlib import Path
+from typing import Dict, List
+import os
+import zipfile
+
+import pytest
+from srctools.filesys import File, FileSystem, FileSystemChain, RawFileSystem, ZipFileSystem
+
+import packages
+from app import gameMan
+
+
+class FakeScreen:
+    """Ignores progress updates."""
+    def step(self, stage: str, disp_name: str = '') -> None:
+        """Ignored."""
+
+    def set_bytes(self, stage: str, done: int, total: int) -> None:
+        """Ignored."""
+
+
+class Resources:
+    """Sets up packages, and records which files are copied."""
+    def __init__(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.zip_path = tmp_path / 'zip_pack.bee_pack'
+        self.folder_path = tmp_path / 'folder_pack'
+        (self.folder_path / 'resources' / 'models').mkdir(parents=True)
+        self.game_path = tmp_path / 'game'
+        self.game_path.mkdir()
+        self.game = gameMan.Game('Test', '620', str(self.game_path))
+        self.copied: List[str] = []
+        self._monkeypatch = monkeypatch
+
+        def copy_resource(file: File, dest: str) -> None:
+            """Record the copied files."""
+            self.copied.append(os.path.relpath(dest, self.game_path).replace('\\', '/'))
+            orig_copy(file, dest)
+
+        orig_copy = gameMan._copy_resource
+        monkeypatch.setattr(gameMan, '_copy_resource', copy_resource)
+        monkeypatch.setattr(gameMan, 'export_screen', FakeScreen())
+        monkeypatch.setattr(packages, 'LOADED', packages.PackagesSet())
+        monkeypatch.setattr(gameMan.Game, 'save', lambda self: None)
+        monkeypatch.setattr(gameMan.CONFIG, 'save_check', lambda: None)
+
+    def write_zip(self, files: Dict[str, bytes]) -> None:
+        """Write the contents of the zip package."""
+        with zipfile.ZipFile(self.zip_path, 'w') as zipf:
+            for name, data in files.items():
+                zipf.writestr(name, data)
+
+    async def refresh(self) -> List[str]:
+        """Load the packages, then refresh the cache and return the files copied."""
+        systems: Dict[str, FileSystem] = {
+            'zip_pack': ZipFileSystem(self.zip_path),
+            'folder_pack': RawFileSystem(self.folder_path),
+        }
+        chain = FileSystemChain()
+        for filesys in systems.values():
+            chain.add_sys(filesys, prefix='resources/')
+        self._monkeypatch.setattr(gameMan, 'res_system', chain)
+        self._monkeypatch.setattr(packages, 'PACKAGE_SYS', systems)
+        self.copied.clear()
+        await self.game.refresh_cache(set())
+        return sorted(self.copied)
+
+
+async def test_refresh_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Only new or changed files are copied, and only removed files are deleted."""
+    res = Resources(tmp_path, monkeypatch)
+    res.write_zip({
+        'resources/materials/test.vmt': b'"LightmappedGeneric" {}',
+        'resources/instances/Some_Inst.vmf': b'world {}',
+    })
+    model = res.folder_path / 'resources' / 'models' / 'test.mdl'
+    model.write_bytes(b'IDST')
+    os.utime(model, (1000, 1000))
+    game = res.game_path
+    vmt = game / 'bee2' / 'materials' / 'test.vmt'
+    # Without a manifest, everything is copied and unknown files removed.
+    (game / 'bee2' / 'materials').mkdir(parents=True)
+    (game / 'bee2' / 'materials' / 'old.vmt').write_bytes(b'old')
+    (game / 'bee2' / 'materials' / 'backup.vmx').write_bytes(b'keep')
+
+    assert await res.refresh() == [
+        'bee2/materials/test.vmt',
+        'bee2/models/test.mdl',
+        'sdk_content/maps/instances/BEE2/some_inst.vmf',
+    ]
+    assert vmt.read_bytes() == b'"LightmappedGeneric" {}'
+    assert not (game / 'bee2' / 'materials' / 'old.vmt').exists()
+    assert (game / 'bee2' / 'materials' / 'backup.vmx').exists()
+    assert (game / gameMan.RES_MANIFEST_LOC).exists()
+
+    # Unchanged, nothing needs to be copied.
+    assert await res.refresh() == []
+
+    # Same size, but different contents, so the CRC changes.
+    res.write_zip({
+        'resources/materials/test.vmt': b'"UnlitGeneric"      {}',
+        'resources/instances/Some_Inst.vmf': b'world {}',
+    })
+    assert await res.refresh() == ['bee2/materials/test.vmt']
+    assert vmt.read_bytes() == b'"UnlitGeneric"      {}'
+
+    # Modifying a file in a folder package, or the copy in the game.
+    os.utime(model, (2000, 2000))
+    (game / 'sdk_content/maps/instances/BEE2/some_inst.vmf').unlink()
+    assert await res.refresh() == [
+        'bee2/models/test.mdl',
+        'sdk_content/maps/instances/BEE2/some_inst.vmf',
+    ]
+
+    # Removing a file from the package removes the copy, but not other files.
+    (game / 'bee2' / 'materials' / 'user.vmt').write_bytes(b'user')
+    res.write_zip({'resources/materials/test.vmt': b'"UnlitGeneric"      {}'})
+    assert await res.refresh() == []
+    assert not (game / 'sdk_content/maps/instances/BEE2/some_inst.vmf').exists()
+    assert (game / 'bee2' / 'materials' / 'user.vmt').exists()
+    assert 'sdk_content/maps/instances/BEE2/some_inst.vmf' not in res.game.load_res_manifest()
+
+
+async def test_invalid_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """If the manifest can't be read, everything is checked again."""
+    res = Resources(tmp_path, monkeypatch)
+    res.write_zip({'resources/materials/test.vmt': b'"LightmappedGeneric" {}'})
+    assert await res.refresh() == ['bee2/materials/test.vmt']
+    manifest = res.game_path / gameMan.RES_MANIFEST_LOC
+
+    for data in ['not json', '[1, 2, 3]', '{"version": 1, "files": {}}', '{"version": 2, "files": {"a": 1}}']:
+        manifest.write_text(data)
+        assert res.game.load_res_manifest() is None
+        (res.game_path / 'bee2' / 'stale.vmt').write_bytes(b'stale')
+        assert await res.refresh() == ['bee2/materials/test.vmt']
+        assert not (res.game_path / 'bee2' / 'stale.vmt').exists()
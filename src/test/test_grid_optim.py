@@ -0,0 +1,43 @@
+"""Test the grid optimiser."""
+from __future__ import annotations
+from random import Random
+
+import pytest
+
+from plane import Plane
+from precomp.grid_optim import optimise
+
+
+def test_simple() -> None:
+    """Test a few simple shapes, including the choice between x and y first."""
+    assert list(optimise({})) == []
+    assert list(optimise({(3, 4): 'a'})) == [(3, 4, 3, 4, 'a')]
+    # An L-shape, which is wider in the y direction.
+    grid = {(0, 0): 'a', (1, 0): 'a'}
+    grid.update({(0, y): 'a' for y in range(5)})
+    assert list(optimise(grid)) == [(0, 0, 0, 4, 'a'), (1, 0, 1, 0, 'a')]
+    # And wider in the x direction.
+    grid = {(x, 0): 'a' for x in range(5)}
+    grid[0, 1] = 'a'
+    assert list(optimise(grid)) == [(0, 0, 4, 0, 'a'), (0, 1, 0, 1, 'a')]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_coverage(seed: int) -> None:
+    """Check random grids are exactly covered by rectangles of the same value."""
+    rand = Random(seed)
+    values = [object() for _ in range(3)]
+    grid: Plane[object] = Plane()
+    for x in range(rand.randint(1, 15)):
+        for y in range(rand.randint(1, 15)):
+            if rand.random() < 0.8:
+                grid[x - 4, y - 7] = rand.choice(values)
+    covered: dict[tuple[int, int], object] = {}
+    for min_x, min_y, max_x, max_y, value in optimise(grid):
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                assert (x, y) not in covered
+                covered[x, y] = value
+    assert covered.keys() == dict(grid.items()).keys()
+    for pos, value in covered.items():
+        assert grid[pos] is value
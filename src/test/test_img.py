@@ -0,0 +1,53 @@
+"""Test the image loading scheduler."""
+from typing import List
+
+import trio
+
+import packages  # noqa - Import first to avoid a circular import.
+from app.img import LoadScheduler
+
+
+class FakeHandle:
+    """Records when it is loaded."""
+    def __init__(self, name: str, visible: bool, order: List[str]) -> None:
+        self.name = name
+        self.visible = visible
+        self.order = order
+        self._loading = True
+
+    def _is_visible(self) -> bool:
+        return self.visible
+
+    async def _load_task(self) -> None:
+        self.order.append(self.name)
+        await trio.sleep(0.01)
+
+
+async def test_scheduler_order() -> None:
+    """Visible images load first, then the rest in order. Cancelled ones are skipped."""
+    order: List[str] = []
+    sched = LoadScheduler()
+    handles = [FakeHandle(f'img_{i}', i % 3 == 0, order) for i in range(10)]
+    for handle in handles:
+        sched.add(handle)  # type: ignore
+    sched.add(handles[4])  # type: ignore  # Already queued, no effect.
+    sched.cancel(handles[1])  # type: ignore
+    assert not handles[1]._loading
+    assert len(sched) == 9
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(sched.worker)
+        nursery.start_soon(sched.worker)
+        await trio.sleep(0.2)
+        sched.add(FakeHandle('late', False, order))  # type: ignore
+        await trio.sleep(0.1)
+        nursery.cancel_scope.cancel()
+
+    assert order == [
+        'img_0', 'img_3', 'img_6', 'img_9',
+        'img_2', 'img_4', 'img_5', 'img_7', 'img_8',
+        'late',
+    ]
+    assert len(sched) == 0
+    assert len(sched.latencies) == 10
+    assert sched.cancelled == 1
@@ -0,0 +1,63 @@
+"""Test the thumbnail cache."""
+from pathlib import Path
+
+from PIL import Image
+
+from app.img_cache import ThumbnailCache
+
+
+def make_image(color: tuple, size: tuple) -> Image.Image:
+    """Make a simple image."""
+    img = Image.new('RGBA', size, color)
+    img.putpixel((0, 0), (1, 2, 3, 4))
+    return img
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    """Check images are stored, and discarded when the package changes."""
+    red = make_image((255, 0, 0, 255), (64, 64))
+    blue = make_image((0, 0, 255, 128), (32, 16))
+    green = make_image((0, 255, 0, 0), (64, 64))
+
+    cache = ThumbnailCache(tmp_path)
+    cache.load()  # Missing, ignored.
+    assert cache.get(('pack_a', 'red', 100, 64, 64)) is None
+    cache.add(('pack_a', 'red', 100, 64, 64), red)
+    cache.add(('pack_b', 'blue', 200, 32, 16), blue)
+    # Pending images are available immediately.
+    assert cache.get(('pack_a', 'red', 100, 64, 64)).tobytes() == red.tobytes()
+    cache.save({'pack_a': 100, 'pack_b': 200})
+    cache.close()
+
+    cache = ThumbnailCache(tmp_path)
+    cache.load()
+    assert len(cache) == 2
+    assert cache.get(('pack_a', 'red', 100, 64, 64)).tobytes() == red.tobytes()
+    assert cache.get(('pack_b', 'blue', 200, 32, 16)).tobytes() == blue.tobytes()
+    assert cache.get(('pack_b', 'blue', 200, 64, 64)) is None
+    # Appended to the existing file.
+    cache.add(('pack_a', 'green', 100, 64, 64), green)
+    cache.save({'pack_a': 100, 'pack_b': 200})
+    assert len(cache) == 3
+    assert cache.get(('pack_b', 'blue', 200, 32, 16)).tobytes() == blue.tobytes()
+    assert cache.get(('pack_a', 'green', 100, 64, 64)).tobytes() == green.tobytes()
+    cache.close()
+
+    cache = ThumbnailCache(tmp_path)
+    cache.load()
+    assert len(cache) == 3
+    size = (tmp_path / 'thumbnails.bin').stat().st_size
+    # Package A was modified, so its images are discarded.
+    cache.save({'pack_a': 150, 'pack_b': 200})
+    assert len(cache) == 1
+    assert (tmp_path / 'thumbnails.bin').stat().st_size < size
+    assert cache.get(('pack_a', 'green', 100, 64, 64)) is None
+    assert cache.get(('pack_b', 'blue', 200, 32, 16)).tobytes() == blue.tobytes()
+    cache.close()
+
+    cache = ThumbnailCache(tmp_path)
+    cache.load()
+    cache.save({})
+    assert len(cache) == 0
+    cache.load()
+    assert len(cache) == 0
@@ -0,0 +1,77 @@
+"""Test lazily loaded configs."""
+from pathlib import Path
+import os
+
+import pytest
+from srctools import Property
+from srctools.filesys import RawFileSystem
+
+import packages
+import utils
+from app import lazy_conf
+import app
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Add a package with some configs, and use a new cache."""
+    (tmp_path / 'a.cfg').write_text('"Key" "a"\n"Block" { "Value" "1" }\n')
+    (tmp_path / 'b.cfg').write_text('"Key" "b"\n')
+    monkeypatch.setitem(packages.PACKAGE_SYS, 'test_pack', RawFileSystem(str(tmp_path)))
+    monkeypatch.setattr(lazy_conf, 'PARSE_CACHE', lazy_conf.ParseCache())
+    # Skip the dev-mode syntax check.
+    monkeypatch.setattr(app.DEV_MODE, 'get', lambda: False)
+    return tmp_path
+
+
+def test_parse_cache(package: Path) -> None:
+    """Check parsed files are cached, and the cached trees can't be modified."""
+    cache = lazy_conf.PARSE_CACHE
+    conf_a = lazy_conf.from_file(utils.PackagePath('test_pack', 'a.cfg'))
+    conf_b = lazy_conf.from_file(utils.PackagePath('test_pack', 'b.cfg'))
+    both = lazy_conf.concat(conf_a, conf_b)
+
+    expected = Property.root(
+        Property('Key', 'a'),
+        Property('Block', [Property('Value', '1')]),
+        Property('Key', 'b'),
+    )
+    assert both() == expected
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 2)
+
+    result = both()
+    assert result == expected
+    assert (cache.hits, cache.misses) == (2, 2)
+    result.find_key('Block')['Value'] = '2'
+    result.append(Property('Extra', ''))
+    assert both() == expected
+    assert conf_a() == Property.root(
+        Property('Key', 'a'),
+        Property('Block', [Property('Value', '1')]),
+    )
+
+    # Modifying the file causes it to be reparsed.
+    path = package / 'b.cfg'
+    path.write_text('"Key" "changed"\n')
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+    hits, misses = cache.hits, cache.misses
+    assert conf_b() == Property.root(Property('Key', 'changed'))
+    assert (cache.hits, cache.misses) == (hits, misses + 1)
+
+
+def test_cache_eviction(package: Path) -> None:
+    """Check the least recently used files are discarded when the cache is full."""
+    size_a = len((package / 'a.cfg').read_text())
+    size_b = len((package / 'b.cfg').read_text())
+    cache = lazy_conf.PARSE_CACHE = lazy_conf.ParseCache(max_size=size_a + 4)
+    conf_a = lazy_conf.from_file(utils.PackagePath('test_pack', 'a.cfg'))
+    conf_b = lazy_conf.from_file(utils.PackagePath('test_pack', 'b.cfg'))
+    conf_a()
+    conf_b()
+    # Both don't fit, so a.cfg is removed.
+    assert (cache.misses, len(cache), cache.size) == (2, 1, size_b)
+    conf_b()
+    assert cache.hits == 1
+    conf_a()
+    assert (cache.misses, len(cache), cache.size) == (3, 1, size_a)
@@ -0,0 +1,37 @@
+"""Test the compile profiler."""
+from pathlib import Path
+import json
+
+import profiler
+
+
+def test_report(tmp_path: Path) -> None:
+    """Check phases, timings and counts are recorded."""
+    profiler.reset('test')
+    profiler.checkpoint('first')
+    with profiler.phase('block'):
+        pass
+    profiler.checkpoint('first')
+    profiler.add_time('result', 'slow', 2.0)
+    profiler.add_time('result', 'fast', 0.5)
+    profiler.add_time('result', 'fast', 0.25)
+    profiler.set_count('instances', 42)
+
+    filename = tmp_path / 'profile.json'
+    profiler.write_report(str(filename))
+    with filename.open() as f:
+        data = json.load(f)
+    assert data['tool'] == 'test'
+    assert list(data['phases']) == ['first', 'other', 'block']
+    assert data['counts'] == {'instances': 42}
+    # Sorted by time.
+    assert data['timings'] == {'result': {
+        'slow': {'time': 2.0, 'calls': 1},
+        'fast': {'time': 0.75, 'calls': 2},
+    }}
+    assert list(data['timings']['result']) == ['slow', 'fast']
+    assert data['total'] >= sum(data['phases'].values())
+    assert data['peak_memory'] is None or data['peak_memory'] > 0
+
+    profiler.reset('other')
+    assert profiler.report()['phases'] == {}
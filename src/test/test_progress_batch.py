@@ -0,0 +1,167 @@
+"""Test coalescing of loadscreen progress messages."""
+from typing import Any, Callable, Dict, List, Tuple
+import multiprocessing
+import time
+
+from progress_batch import ProgressBatcher
+
+
+class FakeClock:
+    """A clock which is advanced manually."""
+    def __init__(self) -> None:
+        self.time = 100.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def apply(messages: List[Tuple[str, Any, Any]]) -> Dict[Tuple[int, str], List[int]]:
+    """Replay messages the same way as the daemon, returning [value, max] for each stage."""
+    stages: Dict[Tuple[int, str], List[int]] = {}
+    for command, scr_id, args in messages:
+        if command == 'batch':
+            for batch_id, (lengths, steps) in args.items():
+                for stage, num in lengths.items():
+                    stage_data = stages.setdefault((batch_id, stage), [0, 10])
+                    if num == 0:
+                        stage_data[:] = [0, 0]
+                    else:
+                        stage_data[1] = num
+                for stage, count in steps.items():
+                    stages.setdefault((batch_id, stage), [0, 10])[0] += count
+        elif command == 'skip_stage':
+            [stage] = args
+            stages[scr_id, stage] = [0, 0]
+        elif command == 'reset':
+            for (stage_id, stage), stage_data in stages.items():
+                if stage_id == scr_id:
+                    stage_data[:] = [0, 10]
+    return stages
+
+
+def test_coalescing() -> None:
+    """Updates within a frame are combined into one message."""
+    messages: List[Tuple[str, Any, Any]] = []
+    clock = FakeClock()
+    batcher = ProgressBatcher(messages.append, 0.05, clock)
+
+    # The first update after a pause is sent immediately.
+    assert batcher.set_length(1, 'PAK', 3)
+    assert messages == [('batch', None, {1: ({'PAK': 3}, {})})]
+    messages.clear()
+
+    assert not batcher.step(1, 'PAK')
+    assert not batcher.step(1, 'PAK')
+    assert not batcher.step(2, 'OBJ')
+    assert not batcher.set_length(2, 'OBJ', 8)
+    assert messages == []
+    clock.time += 0.05
+    assert batcher.step(1, 'PAK')
+    assert messages == [('batch', None, {
+        1: ({}, {'PAK': 3}),
+        2: ({'OBJ': 8}, {'OBJ': 1}),
+    })]
+    messages.clear()
+
+    # Other messages flush pending updates first, to keep the order.
+    assert not batcher.step(1, 'PAK')
+    batcher.send(('reset', 1, ()))
+    assert messages == [
+        ('batch', None, {1: ({}, {'PAK': 1})}),
+        ('reset', 1, ()),
+    ]
+    messages.clear()
+    # Nothing pending, so nothing extra is sent.
+    batcher.send(('hide', 1, ()))
+    assert messages == [('hide', 1, ())]
+
+
+def test_skip_stage() -> None:
+    """Skipping a stage discards previous steps, but not later ones."""
+    messages: List[Tuple[str, Any, Any]] = []
+    clock = FakeClock()
+    batcher = ProgressBatcher(messages.append, 0.05, clock)
+    batcher.flush()
+    batcher.step(1, 'UI')
+    batcher.step(1, 'UI')
+    batcher.step(1, 'PAK')
+    assert batcher.set_length(1, 'UI', 0)
+    batcher.step(1, 'UI')
+    batcher.flush()
+    assert messages == [
+        ('batch', None, {1: ({}, {'PAK': 1})}),
+        ('skip_stage', 1, ('UI', )),
+        ('batch', None, {1: ({}, {'UI': 1})}),
+    ]
+    assert apply(messages) == {(1, 'PAK'): [1, 10], (1, 'UI'): [1, 0]}
+
+    # Setting a length afterward in the same frame must not undo the skip.
+    messages.clear()
+    batcher.set_length(1, 'OBJ', 0)
+    batcher.set_length(1, 'OBJ', 5)
+    batcher.step(1, 'OBJ')
+    batcher.flush()
+    assert messages == [
+        ('skip_stage', 1, ('OBJ', )),
+        ('batch', None, {1: ({'OBJ': 5}, {'OBJ': 1})}),
+    ]
+    assert apply(messages) == {(1, 'OBJ'): [1, 5]}
+
+
+def test_trailing_flush() -> None:
+    """If updates stop, the remainder is sent by the scheduler."""
+    messages: List[Tuple[str, Any, Any]] = []
+    scheduled: List[Tuple[float, Callable[[], object]]] = []
+    clock = FakeClock()
+    batcher = ProgressBatcher(
+        messages.append, 0.05, clock,
+        lambda delay, func: scheduled.append((delay, func)),
+    )
+    assert batcher.step(1, 'PAK')
+    assert scheduled == []
+    messages.clear()
+
+    clock.time += 0.02
+    assert not batcher.step(1, 'PAK')
+    assert not batcher.step(1, 'PAK')
+    # Only scheduled once, for the end of the frame.
+    [(delay, func)] = scheduled
+    assert abs(delay - 0.03) < 1e-6
+    assert messages == []
+
+    clock.time += delay
+    func()
+    assert messages == [('batch', None, {1: ({}, {'PAK': 2})})]
+    messages.clear()
+    # Further updates schedule again.
+    scheduled.clear()
+    assert not batcher.step(1, 'PAK')
+    assert len(scheduled) == 1
+
+
+def test_throughput() -> None:
+    """Check 50k steps through a real pipe are sent in only a few messages."""
+    rec, send = multiprocessing.Pipe(duplex=False)
+    batcher = ProgressBatcher(send.send)
+    try:
+        start = time.perf_counter()
+        batcher.set_length(1, 'PAK', 50_000)
+        for _ in range(25_000):
+            batcher.step(1, 'PAK')
+            batcher.step(2, 'OBJ')
+        batcher.flush()
+        duration = time.perf_counter() - start
+
+        messages = []
+        while rec.poll():
+            messages.append(rec.recv())
+    finally:
+        rec.close()
+        send.close()
+    # One for the first length, one for the final flush, and one per frame in between.
+    assert len(messages) <= duration / batcher.interval + 2
+    assert all(command == 'batch' for command, scr_id, args in messages)
+    assert apply(messages) == {
+        (1, 'PAK'): [25_000, 50_000],
+        (2, 'OBJ'): [25_000, 10],
+    }
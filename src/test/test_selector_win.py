@@ -0,0 +1,21 @@
+"""Test the selector window's item layout."""
+import pytest
+
+from app.selector_win import visible_rows
+
+
+@pytest.mark.parametrize('top, bottom, expected', [
+    (0, 1000, range(0, 4)),  # Everything.
+    (-500, -10, range(0, 0)),  # Above the group.
+    (500, 900, range(0, 0)),  # Below the group.
+    (100, 140, range(0, 1)),  # Within the first row.
+    (150, 151, range(1, 2)),  # Just past the boundary.
+    (149, 150, range(0, 1)),  # Ends on the boundary.
+    (120, 320, range(0, 4)),
+    (190, 260, range(1, 4)),
+    (200, 250, range(2, 3)),
+])
+def test_visible_rows(top: float, bottom: float, expected: range) -> None:
+    """Check the rows visible in a region are computed correctly."""
+    # 10 items in 3 columns makes 4 rows, 50 pixels each starting at 100.
+    assert visible_rows(100, 10, 3, 50, top, bottom) == expected
@@ -0,0 +1,82 @@
+"""Test template loading."""
+from pathlib import Path
+import os
+import zipfile
+
+import pytest
+from srctools import Property
+from srctools.filesys import RawFileSystem, ZipFileSystem
+
+from precomp.template_brush import FileSystemPool
+import template_bundle
+
+
+def test_filesystem_pool(tmp_path: Path) -> None:
+    """Check package filesystems are reused, and discarded when the pool is full."""
+    zip_paths = []
+    for i in range(3):
+        path = tmp_path / f'pack_{i}.bee_pack'
+        with zipfile.ZipFile(path, 'w') as zipf:
+            zipf.writestr('templates/temp.vmf', f'"templates" "{i}"')
+        zip_paths.append(str(path))
+    folder = tmp_path / 'folder_pack'
+    folder.mkdir()
+
+    pool = FileSystemPool(max_size=2)
+    first = pool.get(zip_paths[0])
+    assert isinstance(first, ZipFileSystem)
+    assert pool.get(zip_paths[0]) is first
+    assert isinstance(pool.get(str(folder)), RawFileSystem)
+    assert len(pool) == 2
+
+    # Pack 0 was used most recently, so the folder is removed.
+    assert pool.get(zip_paths[0]) is first
+    pool.get(zip_paths[1])
+    assert len(pool) == 2
+    assert str(folder) not in pool
+    assert zip_paths[0] in pool
+    pool.get(zip_paths[2])
+    assert zip_paths[0] not in pool
+    assert pool.get(zip_paths[0]) is not first
+
+    with pytest.raises(ValueError):
+        pool.get(str(tmp_path / 'unknown.txt'))
+
+
+def test_bundle(tmp_path: Path) -> None:
+    """Check templates are read from the bundle, unless the original file changed."""
+    folder = tmp_path / 'folder_pack'
+    (folder / 'templates').mkdir(parents=True)
+    temp_path = folder / 'templates' / 'temp.vmf'
+    temp_path.write_text('world\n{\n"id" "1"\nsolid\n{\n"id" "2"\n}\n}\n')
+    os.utime(temp_path, (1000, 1000))
+    props = Property.parse(temp_path.read_text())
+    bundle_path = tmp_path / 'templates.bin'
+    with bundle_path.open('wb') as f:
+        template_bundle.write(f, [(
+            'Some_Template', str(folder), 'templates/temp.vmf',
+            template_bundle.source_mtime(str(folder), 'templates/temp.vmf'),
+            template_bundle.encode(props),
+        )])
+
+    bundle = template_bundle.TemplateBundle.open(str(bundle_path))
+    assert bundle is not None
+    with bundle:
+        assert len(bundle) == 1
+        assert 'some_template' in bundle
+        assert bundle.get('SOME_TEMPLATE', str(folder), 'templates/temp.vmf') == props
+        # Mismatched locations are ignored.
+        assert bundle.get('some_template', str(folder), 'templates/other.vmf') is None
+        assert bundle.get('other_template', str(folder), 'templates/temp.vmf') is None
+    # Once closed, the original file must be used.
+    assert bundle.get('SOME_TEMPLATE', str(folder), 'templates/temp.vmf') is None
+
+    bundle = template_bundle.TemplateBundle.open(str(bundle_path))
+    assert bundle is not None
+    os.utime(temp_path, (2000, 2000))
+    assert bundle.get('some_template', str(folder), 'templates/temp.vmf') is None
+    bundle.close()
+
+    assert template_bundle.TemplateBundle.open(str(tmp_path / 'missing.bin')) is None
+    bundle_path.write_bytes(b'not a bundle at all')
+    assert template_bundle.TemplateBundle.open(str(bundle_path)) is None
@@ -0,0 +1,82 @@
+"""Test the tile ordering used by the clump generator."""
+from __future__ import annotations
+from random import Random
+from typing import List, Set, Tuple
+import itertools
+
+import pytest
+
+from precomp import texturing
+from precomp.texturing import _SetTileOrder, _TileOrder, _check_tile_order, _make_tile_order
+
+
+Pos = Tuple[float, float, float]
+
+
+def random_positions(rng: Random, count: int) -> List[Pos]:
+    """Generate positions to insert, including duplicates."""
+    return [
+        (rng.randrange(-8, 8) * 128.0, rng.randrange(-8, 8) * 128.0, rng.randrange(-4, 4) * 128.0)
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('count', [1, 5, 40, 300, 3000])
+@pytest.mark.parametrize('seed', range(5))
+def test_tile_order_matches_set(seed: int, count: int) -> None:
+    """Picking tiles by index must produce the same tiles as iterating a real set."""
+    rng = Random(f'{seed}-{count}')
+    positions = random_positions(rng, count)
+    tiles: Set[Pos] = set()
+    for pos in positions:
+        tiles.add(pos)
+    order = _TileOrder({pos for pos in positions})
+    assert len(order) == len(tiles)
+
+    while tiles:
+        ind = rng.randrange(len(tiles))
+        expected = next(itertools.islice(tiles, ind, None))
+        assert order[ind] == expected
+        if rng.random() < 0.5:
+            tiles.remove(expected)
+            order.remove(expected)
+        else:
+            # Remove a random batch, including some already removed or never present.
+            batch = rng.sample(positions, rng.randint(1, min(len(positions), 50)))
+            batch += random_positions(rng, 5)
+            tiles.difference_update(iter(batch))
+            order.difference_update(iter(batch))
+        assert len(order) == len(tiles)
+    with pytest.raises(IndexError):
+        order[0]
+
+
+def test_self_check(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The self-check passes, but detects if the order differs."""
+    assert _check_tile_order(0, 300)
+
+    class NoResize(_TileOrder):
+        """Pretend the set never gets resized."""
+        def _table_mask(self) -> int:
+            return 1 << 30
+
+    monkeypatch.setattr(texturing, '_TileOrder', NoResize)
+    assert not _check_tile_order(0, 300)
+
+
+def test_set_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    """If the order doesn't match, the set is indexed directly instead."""
+    monkeypatch.setattr(texturing, '_TILE_ORDER_VALID', False)
+    positions = random_positions(Random(42), 200)
+    tiles = {pos for pos in positions}
+    order = _make_tile_order({pos for pos in positions})
+    assert isinstance(order, _SetTileOrder)
+    assert [order[i] for i in range(len(order))] == list(tiles)
+    order.remove(positions[0])
+    order.difference_update(positions[1:20])
+    tiles.remove(positions[0])
+    tiles.difference_update(positions[1:20])
+    assert [order[i] for i in range(len(order))] == list(tiles)
+
+    monkeypatch.setattr(texturing, '_TILE_ORDER_VALID', True)
+    assert isinstance(_make_tile_order(tiles), _TileOrder)
@@ -1,7 +1,12 @@
 """Test the tree wrapper."""
+from __future__ import annotations
+from random import Random
+
+import pytest
 from srctools import Vec
+
+import tree
 from tree import RTree
-from random import Random
 
 
 def test_duplicate_insertion() -> None:
@@ -72,3 +77,87 @@ def test_bbox() -> None:
     found = set(tree.find_bbox(bb_min, bb_max))
     # Order is irrelevant, but duplicates must all match.
     assert sorted(expected) == sorted(found)
+
+
+@pytest.fixture(params=['native', 'fallback'])
+def backend(request, monkeypatch) -> None:
+    """Run with both the rtree library and the pure-Python fallback."""
+    if request.param == 'fallback':
+        monkeypatch.setattr(tree, 'index', None)
+    elif tree.index is None:
+        pytest.skip('rtree library not installed.')
+
+
+def random_boxes(rand: Random, count: int, size: float = 128.0) -> list[tuple[Vec, Vec, int]]:
+    """Generate random bounding boxes."""
+    return [
+        (
+            Vec(rand.uniform(-size, size), rand.uniform(-size, size), rand.uniform(-size, size)),
+            Vec(rand.uniform(-size, size), rand.uniform(-size, size), rand.uniform(-size, size)) / 4,
+            i,
+        )
+        for i in range(count)
+    ]
+
+
+def brute_force(points: list[tuple[Vec, Vec, int]], bb_min: Vec, bb_max: Vec) -> list[int]:
+    """Find the intersecting boxes by checking each."""
+    return sorted(
+        data for a, b, data in points
+        if Vec.bbox_intersect(*Vec.bbox(a, b), bb_min, bb_max)
+    )
+
+
+@pytest.mark.parametrize('bulk', [False, True], ids=['insert', 'bulk'])
+def test_many_queries(backend: None, bulk: bool) -> None:
+    """Test bulk loading and batched queries against a brute-force loop."""
+    rand = Random(5678)
+    points = random_boxes(rand, 500)
+    # A duplicate bbox.
+    points.append((points[0][0], points[0][1], 500))
+    rtree: RTree[int]
+    if bulk:
+        rtree = RTree.bulk_load(points)
+    else:
+        rtree = RTree()
+        for a, b, data in points:
+            rtree.insert(a, b, data)
+    assert len(rtree) == len(points)
+
+    # Remove and re-add some, to check modifications are handled.
+    for a, b, data in points[100:300]:
+        rtree.remove(a, b, data)
+    del points[100:200]
+    for a, b, data in points[100:200]:
+        rtree.insert(a, b, data)
+    assert len(rtree) == len(points)
+
+    queries = [(a, b) for a, b, _ in random_boxes(rand, 100)]
+    results = rtree.find_bbox_many(queries)
+    assert len(results) == len(queries)
+    for (a, b), found in zip(queries, results):
+        bb_min, bb_max = Vec.bbox(a, b)
+        assert sorted(found) == brute_force(points, bb_min, bb_max)
+        assert sorted(rtree.find_bbox(a, b)) == sorted(found)
+
+    pairs = rtree.find_all_intersecting()
+    expected = set()
+    for i, (a1, b1, data1) in enumerate(points):
+        for a2, b2, data2 in points[i + 1:]:
+            if Vec.bbox_intersect(*Vec.bbox(a1, b1), *Vec.bbox(a2, b2)):
+                expected.add(frozenset({data1, data2}))
+    assert len(pairs) == len(expected)
+    assert {frozenset(pair) for pair in pairs} == expected
+
+
+def test_fallback_nearest(monkeypatch) -> None:
+    """Test nearest queries in the fallback tree."""
+    monkeypatch.setattr(tree, 'index', None)
+    rtree: RTree[str] = RTree()
+    rtree.insert(Vec(0, 0, 0), Vec(10, 10, 10), 'origin')
+    rtree.insert(Vec(40, 0, 0), Vec(50, 10, 10), 'right')
+    rtree.insert(Vec(0, 40, 0), Vec(10, 50, 10), 'up')
+    assert list(rtree.find_nearest(Vec(5, 5, 5))) == ['origin']
+    assert sorted(rtree.find_nearest(Vec(25, 5, 5), 2)) == ['origin', 'right']
+    # Equidistant, so both are returned.
+    assert sorted(rtree.find_nearest(Vec(30, 30, 5))) == ['right', 'up']
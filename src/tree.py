@@ -1,13 +1,30 @@
-"""Wraps the Rtree package, adding typing and usage of our Vec class."""
+"""Wraps the Rtree package, adding typing and usage of our Vec class.
+
+If the package is unavailable, a pure-Python tree is used instead.
+"""
 from srctools.math import Vec
-from typing import Generic, TypeVar, Iterator, List, Tuple
+from typing import (
+    Any, Callable, Dict, Generic, Iterable, Optional, TypeVar, Iterator, List, Tuple,
+)
+import math
 
 import attrs
-from rtree import index  # type: ignore
+try:
+    from rtree import index  # type: ignore
+except ImportError:
+    index = None
 
 ValueT = TypeVar('ValueT')
-PROPS = index.Property()
-PROPS.dimension = 3
+T = TypeVar('T')
+Coords = Tuple[float, float, float, float, float, float]
+if index is not None:
+    PROPS = index.Property()
+    PROPS.dimension = 3
+# The maximum number of children in each node of the fallback tree.
+NODE_SIZE = 16
+# Each node is a (is_leaf, entries) tuple. Entries are (bbox, child node) pairs, or
+# (bbox, ID) in leaves.
+_Node = Tuple[bool, List[Tuple[Coords, Any]]]
 
 
 @attrs.frozen
@@ -22,10 +39,161 @@ class ValueHolder(Generic[ValueT]):
     max_z: float
 
 
+def _str_pack(items: List[T], get_box: Callable[[T], Coords]) -> List[List[T]]:
+    """Group items into nodes, using Sort-Tile-Recursive packing.
+
+    The items are sorted into slabs along the X axis, then each is split along Y, then Z.
+    """
+    node_count = math.ceil(len(items) / NODE_SIZE)
+    slices = math.ceil(node_count ** (1 / 3))
+    slice_size = NODE_SIZE * slices
+
+    def center(axis: int) -> Callable[[T], float]:
+        """Sort by the center of the box along this axis."""
+        return lambda item: get_box(item)[axis] + get_box(item)[axis + 3]
+
+    nodes = []
+    items = sorted(items, key=center(0))
+    for x_ind in range(0, len(items), slice_size * slices):
+        x_slab = sorted(items[x_ind: x_ind + slice_size * slices], key=center(1))
+        for y_ind in range(0, len(x_slab), slice_size):
+            y_slab = sorted(x_slab[y_ind: y_ind + slice_size], key=center(2))
+            for z_ind in range(0, len(y_slab), NODE_SIZE):
+                nodes.append(y_slab[z_ind: z_ind + NODE_SIZE])
+    return nodes
+
+
+def _bbox_of(entries: Iterable[Tuple[Coords, Any]]) -> Coords:
+    """Compute the bounding box enclosing these entries."""
+    x0, y0, z0, x1, y1, z1 = zip(*[coords for coords, _ in entries])
+    return min(x0), min(y0), min(z0), max(x1), max(y1), max(z1)
+
+
+class PackedIndex:
+    """A pure-Python 3D R-tree, used if the rtree library is unavailable.
+
+    This implements the parts of rtree.index.Index that RTree uses. Boxes are packed into
+    a static tree using Sort-Tile-Recursive (STR) bulk loading. Inserted or deleted boxes are
+    tracked separately, then the tree is repacked once enough have built up.
+    """
+    def __init__(self, stream: Iterable[Tuple[int, Coords, object]] = ()) -> None:
+        # ID -> coordinates. The tree's copy of the coordinates must be the same object,
+        # so we can discard entries for deleted IDs.
+        self._boxes: Dict[int, Coords] = {}
+        self._root: Optional[_Node] = None
+        # Entries not in the packed tree yet.
+        self._pending: List[Tuple[Coords, int]] = []
+        # The number of entries deleted from the packed tree.
+        self._deleted = 0
+        for ident, coords, _ in stream:
+            self._boxes[ident] = coords
+        self._pack()
+
+    def _pack(self) -> None:
+        """Rebuild the tree from all current entries."""
+        self._pending.clear()
+        self._deleted = 0
+        entries: List[Tuple[Coords, Any]] = [
+            (coords, ident)
+            for ident, coords in self._boxes.items()
+        ]
+        if not entries:
+            self._root = None
+            return
+        is_leaf = True
+        while True:
+            nodes = [
+                (_bbox_of(group), (is_leaf, group))
+                for group in _str_pack(entries, lambda entry: entry[0])
+            ]
+            if len(nodes) == 1:
+                self._root = nodes[0][1]
+                return
+            entries = nodes  # type: ignore
+            is_leaf = False
+
+    def _check_repack(self) -> None:
+        """If enough has changed since we packed, rebuild."""
+        if len(self._pending) + self._deleted > max(4 * NODE_SIZE, len(self._boxes) // 4):
+            self._pack()
+
+    def insert(self, ident: int, coords: Coords) -> None:
+        """Add a bounding box with this ID."""
+        coords = self._boxes[ident] = tuple(coords)  # type: ignore
+        self._pending.append((coords, ident))
+        self._check_repack()
+
+    def delete(self, ident: int, coords: Coords) -> None:
+        """Remove the bounding box with this ID."""
+        del self._boxes[ident]
+        self._deleted += 1
+        self._check_repack()
+
+    def intersection(self, coords: Coords) -> List[int]:
+        """Find the IDs of all boxes intersecting this bounding box."""
+        x0, y0, z0, x1, y1, z1 = coords
+        boxes = self._boxes
+        found = []
+        for box, ident in self._pending:
+            if (
+                box[0] <= x1 and x0 <= box[3] and
+                box[1] <= y1 and y0 <= box[4] and
+                box[2] <= z1 and z0 <= box[5]
+                and boxes.get(ident) is box
+            ):
+                found.append(ident)
+        if self._root is None:
+            return found
+        stack = [self._root]
+        while stack:
+            is_leaf, entries = stack.pop()
+            for box, child in entries:
+                if (
+                    box[0] <= x1 and x0 <= box[3] and
+                    box[1] <= y1 and y0 <= box[4] and
+                    box[2] <= z1 and z0 <= box[5]
+                ):
+                    if not is_leaf:
+                        stack.append(child)
+                    elif boxes.get(child) is box:
+                        found.append(child)
+        return found
+
+    def nearest(self, point: Tuple[float, float, float], count: int = 1) -> List[int]:
+        """Find the IDs of the boxes nearest to this point.
+
+        If boxes are equidistant, more than count may be returned.
+        """
+        x, y, z = point
+        distances = sorted(
+            (
+                max(box[0] - x, 0.0, x - box[3]) ** 2 +
+                max(box[1] - y, 0.0, y - box[4]) ** 2 +
+                max(box[2] - z, 0.0, z - box[5]) ** 2,
+                ident,
+            )
+            for ident, box in self._boxes.items()
+        )
+        if len(distances) <= count:
+            return [ident for _, ident in distances]
+        cutoff = distances[count - 1][0]
+        return [ident for dist, ident in distances if dist <= cutoff]
+
+
+def _make_index(stream: Iterable[Tuple[int, Coords, object]] = ()) -> Any:
+    """Create the underlying index, using the rtree library if available."""
+    if index is None:
+        return PackedIndex(stream)
+    stream = list(stream)
+    if stream:  # It raises an error if empty.
+        return index.Index(stream, properties=PROPS)
+    return index.Index(properties=PROPS)
+
+
 class RTree(Generic[ValueT]):
     """A 3-dimensional R-Tree. Multiple values with the same bbox are allowed."""
     def __init__(self) -> None:
-        self.tree = index.Index(properties=PROPS)
+        self.tree = _make_index()
         # id(holder) -> holder.
         # We can't store the object directly in the tree.
         self._by_id: dict[int, ValueHolder[ValueT]] = {}
@@ -34,6 +202,38 @@ class RTree(Generic[ValueT]):
             ValueHolder[ValueT]
         ] = {}
 
+    @classmethod
+    def bulk_load(cls, items: Iterable[Tuple[Vec, Vec, ValueT]]) -> 'RTree[ValueT]':
+        """Build a tree containing all these values at once.
+
+        This is equivalent to inserting each, but packs the tree more efficiently.
+        """
+        tree: RTree[ValueT] = cls()
+        for p1, p2, value in items:
+            mins, maxs = Vec.bbox(p1, p2)
+            coords = (mins.x, mins.y, mins.z, maxs.x, maxs.y, maxs.z)
+            try:
+                holder = tree._by_coord[coords]
+            except KeyError:
+                holder = ValueHolder([value], *coords)
+                tree._by_id[id(holder)] = tree._by_coord[coords] = holder
+            else:
+                if value not in holder.values:
+                    holder.values.append(value)
+        tree.tree = _make_index(
+            (holder_id, tree._coords(holder), None)
+            for holder_id, holder in tree._by_id.items()
+        )
+        return tree
+
+    @staticmethod
+    def _coords(holder: ValueHolder[Any]) -> Coords:
+        """Return the coordinates for a holder."""
+        return (
+            holder.min_x, holder.min_y, holder.min_z,
+            holder.max_x, holder.max_y, holder.max_z,
+        )
+
     def __len__(self) -> int:
         return sum(len(holder.values) for holder in self._by_id.values())
 
@@ -82,6 +282,46 @@ class RTree(Generic[ValueT]):
         for holder_id in self.tree.intersection((*mins, *maxs)):
             yield from self._by_id[holder_id].values
 
+    def find_bbox_many(self, bboxes: Iterable[Tuple[Vec, Vec]]) -> List[List[ValueT]]:
+        """Find the values intersecting each of several bounding boxes.
+
+        This returns a list of results, one for each bounding box.
+        """
+        by_id = self._by_id
+        intersection = self.tree.intersection
+        results: List[List[ValueT]] = []
+        for p1, p2 in bboxes:
+            mins, maxs = Vec.bbox(p1, p2)
+            found: List[ValueT] = []
+            for holder_id in intersection((*mins, *maxs)):
+                found += by_id[holder_id].values
+            results.append(found)
+        return results
+
+    def find_all_intersecting(self) -> List[Tuple[ValueT, ValueT]]:
+        """Find all pairs of values in the tree whose bounding boxes intersect each other.
+
+        Each pair is only produced once, in the order the values were inserted.
+        """
+        holders = list(self._by_id.values())
+        order = {holder_id: i for i, holder_id in enumerate(self._by_id)}
+        pairs: List[Tuple[ValueT, ValueT]] = []
+        for ind, holder in enumerate(holders):
+            # Values with the same bbox all intersect.
+            for i, first in enumerate(holder.values):
+                for second in holder.values[i + 1:]:
+                    pairs.append((first, second))
+            others = sorted(
+                order[other_id]
+                for other_id in self.tree.intersection(self._coords(holder))
+                if order[other_id] > ind
+            )
+            for other_ind in others:
+                for first in holder.values:
+                    for second in holders[other_ind].values:
+                        pairs.append((first, second))
+        return pairs
+
     def find_nearest(self, point: Vec, min_count: int = 1) -> Iterator[ValueT]:
         """Find the values nearest to a point.
 
@@ -53,8 +53,10 @@ from precomp import (
     cubes,
     errors,
 )
+import config_snapshot
 import consts
 import editoritems
+import profiler
 
 
 class _Settings(TypedDict):
@@ -91,23 +93,23 @@ PRESET_CLUMPS = []  # Additional clumps set by conditions, for certain areas.
 
 async def load_settings() -> Tuple[
     antlines.AntType, antlines.AntType,
-    Dict[str, editoritems.Item],
+    editoritems.ItemDatabase,
     corridor.ExportedConf,
 ]:
     """Load in all our settings from vbsp_config."""
     # Do all our file parsing concurrently.
     try:
         with contextlib.ExitStack() as file_stack:
-            file_config = file_stack.enter_context(open("bee2/vbsp_config.cfg", encoding='utf8'))
             file_editor = file_stack.enter_context(open('bee2/editor.bin', 'rb'))
             file_corridor = file_stack.enter_context(open('bee2/corridors.bin', 'rb'))
             file_packlist = file_stack.enter_context(open('bee2/pack_list.cfg'))
 
             async with trio.open_nursery() as nursery:
-                res_conf = utils.Result.sync(nursery, Property.parse, file_config)
-                res_editor: utils.Result[
-                    Iterable[editoritems.Item]
-                ] = utils.Result.sync(nursery, pickle.load, file_editor)
+                res_conf = utils.Result.sync(
+                    nursery,
+                    config_snapshot.load, 'bee2/vbsp_config.cfg', 'bee2/vbsp_config.bin',
+                )
+                res_editor = utils.Result.sync(nursery, editoritems.ItemDatabase.read, file_editor)
                 res_corr: utils.Result[corridor.ExportedConf] = utils.Result.sync(
                     nursery,
                     pickle.load, file_corridor,
@@ -117,7 +119,10 @@ async def load_settings() -> Tuple[
                     Property.parse, file_packlist, 'bee2/pack_list.cfg',
                 )
                 # Load in templates locations.
-                nursery.start_soon(template_brush.load_templates, 'bee2/templates.lst')
+                nursery.start_soon(
+                    template_brush.load_templates,
+                    'bee2/templates.lst', 'bee2/templates.bin',
+                )
     except FileNotFoundError:
         LOGGER.exception(
             'Failed to parse required config file. Recompile the compiler '
@@ -160,14 +165,12 @@ async def load_settings() -> Tuple[
         for var in stylevar_block:
             settings['style_vars'][var.name.casefold()] = srctools.conv_bool(var.value)
 
-    # Load a copy of the item configuration.
-    id_to_item: dict[str, editoritems.Item] = {}
-    for item in res_editor():
-        id_to_item[item.id.casefold()] = item
+    # Load a copy of the item configuration. Items are only decoded when used.
+    id_to_item = res_editor()
 
     # Send that data to the relevant modules.
-    instanceLocs.load_conf(id_to_item.values())
-    connections.read_configs(id_to_item.values())
+    instanceLocs.load_conf(id_to_item)
+    connections.read_configs(id_to_item)
 
     # Parse packlist data.
     packing.parse_packlists(res_packlist())
@@ -1499,11 +1502,17 @@ def process_vbsp_fail(output: str, missing_locs: Iterable[Vec]) -> None:
     BEE2_config.save_check()
 
 
-async def main() -> None:
+async def main(preloaded: Optional[Tuple[
+    antlines.AntType, antlines.AntType,
+    editoritems.ItemDatabase,
+    corridor.ExportedConf,
+]] = None) -> None:
     """Main program code.
 
+    If the compiler server is running, the result of load_settings() is passed in.
     """
     global MAP_RAND_SEED
+    profiler.reset('vbsp')
     LOGGER.info("BEE{} VBSP hook initiallised, srctools v{}.", utils.BEE_VERSION, srctools.__version__)
 
     # Warn if srctools Cython code isn't installed.
@@ -1611,17 +1620,22 @@ async def main() -> None:
 
         LOGGER.info("Loading settings...")
         async with trio.open_nursery() as nursery:
-            res_settings = utils.Result(nursery, load_settings)
+            if preloaded is None:
+                res_settings = utils.Result(nursery, load_settings)
             vmf_res = utils.Result(nursery, load_map, path)
 
-        ant_floor, ant_wall, id_to_item, corridor_conf = res_settings()
+        if preloaded is None:
+            preloaded = res_settings()
+        ant_floor, ant_wall, id_to_item, corridor_conf = preloaded
         vmf: VMF = vmf_res()
+        profiler.checkpoint('load_settings')
 
         coll = Collisions()
 
         instance_traits.set_traits(vmf, id_to_item, coll)
         # Must be before corridors!
         brushLoc.POS.read_from_map(vmf, settings['has_attr'], id_to_item)
+        profiler.checkpoint('read_from_map')
 
         rand.init_seed(vmf)
 
@@ -1631,6 +1645,7 @@ async def main() -> None:
             voice_attrs=settings['has_attr'],
         )
         is_publishing = info.is_publishing
+        profiler.checkpoint('corridors')
 
         ant, side_to_antline = antlines.parse_antlines(vmf)
 
@@ -1643,26 +1658,34 @@ async def main() -> None:
             antline_wall=ant_wall,
             antline_floor=ant_floor,
         )
+        profiler.checkpoint('calc_connections')
         change_ents(vmf)
 
         fizzler.parse_map(vmf, info)
         barriers.parse_map(vmf, info)
         # We have barriers, pass to our error display.
         errors.load_barriers(barriers.BARRIERS)
+        profiler.checkpoint('parse_fizzlers')
 
         tiling.gen_tile_temp()
         tiling.analyse_map(vmf, side_to_antline)
+        profiler.checkpoint('analyse_map')
 
         del side_to_antline
         # We have tiles, pass to our error display.
         errors.load_tiledefs(tiling.TILES.values(), brushLoc.POS)
 
         await texturing.setup(game, vmf, list(tiling.TILES.values()))
+        profiler.checkpoint('texturing_setup')
+        profiler.set_count('tiles', len(tiling.TILES))
+        profiler.set_count('instances_initial', len(vmf.by_class['func_instance']))
 
         conditions.check_all(vmf, coll, info)
+        profiler.checkpoint('check_all')
         add_extra_ents(vmf, info)
 
         tiling.generate_brushes(vmf)
+        profiler.checkpoint('generate_brushes')
         faithplate.gen_faithplates(vmf)
         change_overlays(vmf)
         fix_worldspawn(vmf)
@@ -1679,16 +1702,23 @@ async def main() -> None:
         # Ensure VRAD knows that the map is PeTI, it can't figure that out
         # from parameters.
         vmf.spawn['BEE2_is_peti'] = True
+        profiler.checkpoint('finalise')
+        profiler.set_count('instances', len(vmf.by_class['func_instance']))
+        profiler.set_count('entities', len(vmf.entities))
+        profiler.set_count('brushes', len(vmf.brushes) + sum(len(ent.solids) for ent in vmf.entities))
 
         # Save and run VBSP. If this leaks, this will raise UserError, and we'll compile again.
         if not skip_vbsp:
-            save(vmf, new_path)
-            run_vbsp(
-                vbsp_args=new_args,
-                path=path,
-                new_path=new_path,
-                maybe_missing_inst=await find_missing_instances(game, vmf),
-            )
+            with profiler.phase('save'):
+                save(vmf, new_path)
+            missing_inst = await find_missing_instances(game, vmf)
+            with profiler.phase('vbsp'):
+                run_vbsp(
+                    vbsp_args=new_args,
+                    path=path,
+                    new_path=new_path,
+                    maybe_missing_inst=missing_inst,
+                )
     except errors.UserError as error:
         # The user did something wrong, so the map is invalid.
         # In preview, compile a special map which displays the message.
@@ -1718,6 +1748,8 @@ async def main() -> None:
                 is_error_map=True,
             )
 
+    template_brush.close_bundle()
+    profiler.write_report('bee2/vbsp_profile.json')
     LOGGER.info("BEE2 VBSP hook finished!")
 
 
@@ -33,6 +33,7 @@ from postcomp import music, screenshot
 # Load our BSP transforms.
 # noinspection PyUnresolvedReferences
 from postcomp import coop_responses, filter, user_error
+import profiler
 import utils
 
 
@@ -78,6 +79,7 @@ def run_vrad(args: List[str]) -> None:
 
 async def main(argv: List[str]) -> None:
     """Main VRAD script."""
+    profiler.reset('vrad')
     LOGGER.info(
         "BEE{} VRAD hook initiallised, srctools v{}, Hammer Addons v{}",
         utils.BEE_VERSION, srctools.__version__, version_haddons,
@@ -149,6 +151,7 @@ async def main(argv: List[str]) -> None:
 
     LOGGER.info('Reading BSP')
     bsp_file = BSP(path)
+    profiler.checkpoint('read_bsp')
 
     # Hard to determine if the map is PeTI or not, so use VBSP's stashed info.
     if srctools.conv_bool(bsp_file.ents.spawn['BEE2_is_peti']):
@@ -194,6 +197,7 @@ async def main(argv: List[str]) -> None:
         LOGGER.info("Hammer map detected! Skipping all transforms.")
         run_vrad(full_args)
         return
+    profiler.set_count('entities', len(bsp_file.ents.entities))
 
     # Grab the currently mounted filesystems in P2.
     game = find_gameinfo(argv)
@@ -235,14 +239,19 @@ async def main(argv: List[str]) -> None:
     LOGGER.info('Reading particles....')
     packlist.load_particle_manifest(root_folder / 'bin/bee2/particle_cache.dmx')
 
+    profiler.checkpoint('load_resources')
+
     LOGGER.info('Loading transforms...')
     load_transforms()
 
     LOGGER.info('Checking for music:')
     music.generate(bsp_file.ents, packlist)
 
+    profiler.checkpoint('music')
+
     LOGGER.info('Run transformations...')
     await run_transformations(bsp_file.ents, fsys, packlist, bsp_file, game)
+    profiler.checkpoint('run_transformations')
 
     enable_packing = not is_preview or config.getboolean("General", "packfile_auto_enable", True)
     if enable_packing:
@@ -254,6 +263,7 @@ async def main(argv: List[str]) -> None:
 
         packlist.write_soundscript_manifest()
         packlist.write_particles_manifest(f'maps/{Path(path).stem}_particles.txt')
+        profiler.checkpoint('scan_packing')
     else:
         LOGGER.warning('Packing disabled!')
 
@@ -293,27 +303,32 @@ async def main(argv: List[str]) -> None:
             blacklist=pack_blacklist,
             dump_loc=dump_loc,
         )
+        packed = set(bsp_file.pakfile.namelist()) - existing
+        profiler.checkpoint('pack_into_zip')
+        profiler.set_count('packed_files', len(packed))
 
-        LOGGER.info('Packed files:\n{}', '\n'.join(
-            set(bsp_file.pakfile.namelist()) - existing
-        ))
+        LOGGER.info('Packed files:\n{}', '\n'.join(packed))
 
     LOGGER.info('Writing BSP...')
     bsp_file.save()
     LOGGER.info(' - BSP written!')
 
     screenshot.modify(config, game.path)
+    profiler.checkpoint('save')
 
     # VRAD only runs if light_args is not set to "NONE"
     if light_args == 'FAST':
         LOGGER.info("Forcing Cheap Lighting!")
-        run_vrad(fast_args)
+        with profiler.phase('vrad'):
+            run_vrad(fast_args)
     elif light_args == 'FULL':
         LOGGER.info("Publishing - Full lighting enabled! (or forced to do so)")
-        run_vrad(full_args)
+        with profiler.phase('vrad'):
+            run_vrad(full_args)
     else:
         LOGGER.info("Forcing to skip VRAD!")
 
+    profiler.write_report('bee2/vrad_profile.json')
     LOGGER.info("BEE2 VRAD hook finished!")
 
 if __name__ == '__main__':